@@ -0,0 +1,125 @@
+import asyncio
+import queue
+from threading import Thread
+
+from fpga_interface import FpgaInterface
+from port_tools.port import IoPort, ClockPort
+
+DEFAULT_MAX_IN_FLIGHT = 64
+
+_READ = "read"
+_WRITE = "write"
+_STEP = "step"
+
+
+class AsyncFpgaInterface(object):
+    """
+    asyncio front-end running USB transfers on a dedicated I/O thread
+
+    Requests are queued in submission order. The I/O thread takes every
+    request waiting in the queue, executes them as one transaction of the
+    FpgaInterface (so they are coalesced into block transfers without
+    reordering, and go through its shadow cache, instrumentation and
+    record()) and resolves their futures on the event loop. At most
+    max_in_flight requests are queued or executing at a time; further
+    calls wait.
+
+    The I/O thread holds fpga.lock while it executes requests, synchronous
+    calls on the FpgaInterface made meanwhile must hold it as well.
+    """
+
+    def __init__(
+        self, fpga: FpgaInterface, max_in_flight: int = DEFAULT_MAX_IN_FLIGHT
+    ) -> None:
+        self._fpga = fpga
+        self._max_in_flight = max_in_flight
+        self._requests = queue.SimpleQueue()
+        self._in_flight = None
+        self._loop = None
+        self._thread = Thread(target=self._process_requests, daemon=True)
+        self._thread.start()
+
+    @classmethod
+    def from_fpga_interface(
+        cls, fpga: FpgaInterface, max_in_flight: int = DEFAULT_MAX_IN_FLIGHT
+    ) -> "AsyncFpgaInterface":
+        return cls(fpga, max_in_flight)
+
+    async def __aenter__(self) -> "AsyncFpgaInterface":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.close()
+
+    async def read(self, port: IoPort) -> int:
+        return await self._submit(_READ, port, None)
+
+    async def write(self, port: IoPort, value: int) -> bool:
+        return await self._submit(_WRITE, port, value)
+
+    async def step(self, clock: ClockPort, cycles: int) -> bool:
+        return await self._submit(_STEP, clock, cycles)
+
+    async def close(self) -> None:
+        if self._thread.is_alive():
+            self._requests.put(None)
+            await asyncio.get_running_loop().run_in_executor(None, self._thread.join)
+
+    async def _submit(self, kind: str, port, value):
+        if self._loop is None:
+            self._loop = asyncio.get_running_loop()
+            self._in_flight = asyncio.Semaphore(self._max_in_flight)
+        async with self._in_flight:
+            future = self._loop.create_future()
+            self._requests.put((kind, port, value, future))
+            return await future
+
+    def _process_requests(self) -> None:
+        while True:
+            requests = [self._requests.get()]
+            while len(requests) < self._max_in_flight:
+                try:
+                    requests.append(self._requests.get_nowait())
+                except queue.Empty:
+                    break
+            stop = None in requests
+            requests = [request for request in requests if request is not None]
+            if requests:
+                self._execute(requests)
+            if stop:
+                return
+
+    def _execute(self, requests) -> None:
+        try:
+            with self._fpga.lock:
+                handles = self._flush(requests)
+        except Exception as error:
+            for *_, future in requests:
+                self._loop.call_soon_threadsafe(_set_exception, future, error)
+            return
+        for (kind, *_, future), handle in zip(requests, handles):
+            result = handle.value if kind == _READ else handle.success
+            self._loop.call_soon_threadsafe(_set_result, future, result)
+
+    def _flush(self, requests) -> list:
+        transaction = self._fpga.transaction()
+        handles = []
+        for kind, port, value, _ in requests:
+            if kind == _READ:
+                handles.append(transaction.read(port))
+            elif kind == _WRITE:
+                handles.append(transaction.write(port, value))
+            else:
+                handles.append(transaction.write_clock_cycles(port, value))
+        transaction.flush()
+        return handles
+
+
+def _set_result(future: asyncio.Future, result) -> None:
+    if not future.cancelled():
+        future.set_result(result)
+
+
+def _set_exception(future: asyncio.Future, error: Exception) -> None:
+    if not future.cancelled():
+        future.set_exception(error)
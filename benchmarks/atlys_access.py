@@ -0,0 +1,94 @@
+"""
+Microbenchmark of the AtlysInterface register access path
+
+The Digilent libraries are replaced by no-op functions, so the numbers show
+the host-side cost of a call (argument marshalling and buffer handling)
+rather than USB latency. The "legacy" path reproduces the previous
+implementation, which created fresh ctypes objects on every call.
+
+Usage: python -m benchmarks.atlys_access
+"""
+
+import ctypes
+import logging
+from unittest import mock
+
+from port_tools.port import IoPort
+from usb_interface.atlys_interface import AtlysInterface
+from .timing import calls_per_second
+
+CALLS = 100000
+
+
+class _NullFunction(object):
+    def __call__(self, *args):
+        return True
+
+
+class _NullLib(object):
+    def __getattr__(self, name):
+        function = _NullFunction()
+        setattr(self, name, function)
+        return function
+
+
+def create_null_atlys_interface() -> AtlysInterface:
+    logging.getLogger("AtlysLog").disabled = True
+    with mock.patch.object(ctypes, "CDLL", lambda path: _NullLib()):
+        return AtlysInterface()
+
+
+def legacy_write(interface: AtlysInterface, address: int, value: int) -> bool:
+    no_overlap = ctypes.c_bool(False)
+    c_address = ctypes.c_ubyte(address)
+    c_value = ctypes.c_ubyte(value)
+    return interface._call_func(
+        interface.depp_lib.DeppPutReg,
+        interface.interface_handle,
+        c_address,
+        c_value,
+        no_overlap,
+    )
+
+
+def legacy_read(interface: AtlysInterface, address: int) -> int:
+    no_overlap = ctypes.c_bool(False)
+    c_address = ctypes.c_ubyte(address)
+    c_readValue = ctypes.c_ubyte(0)
+    interface._call_func(
+        interface.depp_lib.DeppGetReg,
+        interface.interface_handle,
+        c_address,
+        ctypes.byref(c_readValue),
+        no_overlap,
+    )
+    return int(c_readValue.value)
+
+
+def run(calls: int = CALLS) -> dict:
+    interface = create_null_atlys_interface()
+    port = IoPort(name="NARROW", address=["1"], direction="input", bit_width=8)
+    wide_port = IoPort(
+        name="WIDE", address=["2", "3", "4", "5"], direction="input", bit_width=32
+    )
+    return {
+        "legacy_read": calls_per_second(lambda: legacy_read(interface, 1), calls),
+        "legacy_write": calls_per_second(
+            lambda: legacy_write(interface, 1, 0x5A), calls
+        ),
+        "read": calls_per_second(lambda: interface.read(port), calls),
+        "write": calls_per_second(lambda: interface.write(port, 0x5A), calls),
+        "wide_read": calls_per_second(lambda: interface.read(wide_port), calls),
+        "wide_write": calls_per_second(
+            lambda: interface.write(wide_port, 0x12345678), calls
+        ),
+    }
+
+
+def main():
+    for name, rate in run().items():
+        print(f"{name:>14}: {rate:12.0f} calls/s")
+
+
+if __name__ == "__main__":
+    main()
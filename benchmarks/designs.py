@@ -0,0 +1,79 @@
+import json
+from pathlib import Path
+
+from generation_tools.port_encoder import PortEncoder
+
+CLOCK_NAME = "CLK_DUT"
+# widths cycled through when creating synthetic ports
+PORT_WIDTHS = [1, 8, 16, 32]
+
+
+def write_synthetic_design(path: Path, port_count: int) -> Path:
+    """
+    Writes a Verilog top module with one clock and port_count data ports,
+    alternating inputs and outputs of mixed widths
+    """
+    declarations = [f"    input {CLOCK_NAME}"]
+    for i in range(port_count):
+        direction = "input" if i % 2 == 0 else "output"
+        width = PORT_WIDTHS[i % len(PORT_WIDTHS)]
+        size = f"[{width - 1}:0] " if width > 1 else ""
+        declarations.append(f"    {direction} {size}P{i}")
+    with open(path, "wt") as file:
+        file.write(f"module synthetic_{port_count} (\n")
+        file.write(",\n".join(declarations))
+        file.write("\n);\nendmodule\n")
+    return path
+
+
+def write_synthetic_netlist(
+    path: Path, port_count: int, cell_count: int, ansi: bool = True
+) -> Path:
+    """
+    Writes a flat gate-level style netlist: a top module with port_count
+    data ports (ANSI or non-ANSI header) followed by cell_count LUT
+    instances, about 150 bytes each
+    """
+    widths = [PORT_WIDTHS[i % len(PORT_WIDTHS)] for i in range(port_count)]
+    directions = ["input" if i % 2 == 0 else "output" for i in range(port_count)]
+    declarations = [
+        f"{direction} {f'[{width - 1}:0] ' if width > 1 else ''}P{i}"
+        for i, (direction, width) in enumerate(zip(directions, widths))
+    ]
+    with open(path, "wt") as file:
+        file.write("// synthetic netlist\n`timescale 1ns / 1ps\n")
+        file.write(f"module netlist_{port_count} (\n")
+        if ansi:
+            file.write(f"    input wire {CLOCK_NAME},\n    ")
+            file.write(",\n    ".join(declarations))
+            file.write("\n);\n")
+        else:
+            names = [CLOCK_NAME] + [f"P{i}" for i in range(port_count)]
+            file.write("    " + ",\n    ".join(names) + "\n);\n")
+            file.write(f"  input {CLOCK_NAME};\n")
+            file.writelines(f"  {declaration};\n" for declaration in declarations)
+        file.write(f"  wire [{cell_count - 1}:0] n;\n")
+        for i in range(cell_count):
+            file.write(
+                f'  (* KEEP = "TRUE" *) LUT4 #(.INIT(16\'h{i & 0xFFFF:04x})) '
+                + f"u{i} (.I0(n[{i - 1 if i else 0}]), .I1(P0[0]), .I2({CLOCK_NAME}), "
+                + f".I3(n[{i // 2}]), .O(n[{i}])); /* cell {i} */\n"
+            )
+        file.write("endmodule\n")
+    return path
+
+
+def write_synthetic_config(
+    directory: Path, port_count: int, fpga_interface: str = "simulated"
+) -> Path:
+    source_path = write_synthetic_design(
+        directory / f"synthetic_{port_count}.v", port_count
+    )
+    port_encoder = PortEncoder()
+    port_encoder.parse_to_file(source_path, [CLOCK_NAME], directory, fpga_interface)
+    return directory / (source_path.stem + "_config.json")
+
+
+def load_config(config_path: Path) -> dict:
+    with open(config_path) as file:
+        return json.load(file)
@@ -0,0 +1,85 @@
+"""
+Wall time of PortEncoder.parse and VerilogGenerator.create_top_module
+on synthetic designs, and of the Verilog parser (uncached and cached) on
+multi-megabyte netlists
+
+Usage: python -m benchmarks.generators (from the repository root, as the
+generator reads its templates from relative paths)
+"""
+
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+from generation_tools.port_encoder import PortEncoder
+from generation_tools.verilog_generator import VerilogGenerator
+from generation_tools.verilog_parser import parse_module
+from .designs import (
+    CLOCK_NAME,
+    write_synthetic_config,
+    write_synthetic_design,
+    write_synthetic_netlist,
+)
+from .timing import wall_time
+
+PORT_COUNTS = [10, 1000, 10000]
+INTERFACE = "atlys"
+NETLIST_PORT_COUNT = 1000
+# about 6 MB of cell instances
+NETLIST_CELL_COUNT = 40000
+
+
+def run(port_counts=PORT_COUNTS) -> dict:
+    results = {}
+    with TemporaryDirectory() as directory:
+        directory = Path(directory)
+        for port_count in port_counts:
+            source_path = write_synthetic_design(
+                directory / f"synthetic_{port_count}.v", port_count
+            )
+            config_path = write_synthetic_config(directory, port_count, INTERFACE)
+            results[f"parse_{port_count}"] = (
+                wall_time(lambda: PortEncoder().parse(source_path, [CLOCK_NAME])),
+                "s",
+            )
+            results[f"create_top_module_{port_count}"] = (
+                wall_time(
+                    lambda: VerilogGenerator().create_top_module(
+                        INTERFACE, source_path, config_path, directory
+                    )
+                ),
+                "s",
+            )
+        results.update(run_netlists(directory))
+    return results
+
+
+def run_netlists(directory: Path, cell_count: int = NETLIST_CELL_COUNT) -> dict:
+    results = {}
+    cache_dir = directory / "parse_cache"
+    for header in ["ansi", "non_ansi"]:
+        source_path = write_synthetic_netlist(
+            directory / f"netlist_{header}.v",
+            NETLIST_PORT_COUNT,
+            cell_count,
+            header == "ansi",
+        )
+        name = f"parse_netlist_{header}"
+        results[name] = (
+            wall_time(lambda: PortEncoder().parse(source_path, [CLOCK_NAME])),
+            "s",
+        )
+        # the first call fills the cache, wall_time() keeps the best run
+        results[f"{name}_cached"] = (
+            wall_time(lambda: parse_module(source_path, cache_dir)),
+            "s",
+        )
+    return results
+
+
+def main():
+    for name, (value, unit) in run().items():
+        print(f"{name:>24}: {value * 1000:10.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""
+Throughput of FpgaInterface operations against the simulated backend
+
+The simulated backend is configured without latency, so the figures are
+the host-side cost of each operation.
+
+Usage: python -m benchmarks.host_io
+"""
+
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+from fpga_interface import FpgaInterface
+from .designs import CLOCK_NAME, write_synthetic_config
+from .timing import calls_per_second
+
+CALLS = 20000
+BATCH_SIZE = 20
+
+
+def run(calls: int = CALLS) -> dict:
+    with TemporaryDirectory() as directory:
+        fpga = FpgaInterface(write_synthetic_config(Path(directory), 8))
+    ports = fpga.get_port_list()
+    narrow_input, narrow_output = ports.P1, ports.P5
+    wide_input, wide_output = ports.P3, ports.P7
+    clock = ports[CLOCK_NAME]
+
+    def batch_flush():
+        with fpga.batch() as batch:
+            for _ in range(BATCH_SIZE // 2):
+                batch.write(narrow_input, 0x5A)
+                batch.read(narrow_output)
+
+    return {
+        "read": (calls_per_second(lambda: fpga.read(narrow_output), calls), "ops/s"),
+        "write": (
+            calls_per_second(lambda: fpga.write(narrow_input, 0x5A), calls),
+            "ops/s",
+        ),
+        "wide_read": (calls_per_second(lambda: fpga.read(wide_output), calls), "ops/s"),
+        "wide_write": (
+            calls_per_second(lambda: fpga.write(wide_input, 0x12345678), calls),
+            "ops/s",
+        ),
+        "clock_step": (
+            calls_per_second(lambda: fpga.write_clock_cycles(clock, 100), calls),
+            "ops/s",
+        ),
+        f"batch_flush_{BATCH_SIZE}": (
+            calls_per_second(batch_flush, calls // BATCH_SIZE),
+            "flushes/s",
+        ),
+    }
+
+
+def main():
+    for name, (value, unit) in run().items():
+        print(f"{name:>16}: {value:12.0f} {unit}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Runs every benchmark and stores the results as JSON
+
+Usage (from the repository root):
+    python -m benchmarks.run_benchmarks -o results.json [-b previous.json]
+
+With a baseline file, every result that got worse by more than the
+threshold is reported and the exit code is non-zero.
+"""
+
+import argparse
+import json
+import platform
+import subprocess
+import sys
+from datetime import datetime, timezone
+
+from . import atlys_access, generators, host_io
+
+SUITES = {
+    "atlys_access": lambda: {
+        name: (value, "calls/s") for name, value in atlys_access.run().items()
+    },
+    "host_io": host_io.run,
+    "generators": generators.run,
+}
+# units where a smaller value is better
+LOWER_IS_BETTER_UNITS = ["s"]
+
+
+def get_commit() -> str:
+    res = subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True)
+    return res.stdout.strip() if res.returncode == 0 else None
+
+
+def run_suites(suite_names) -> dict:
+    results = {}
+    for suite_name in suite_names:
+        print(f"Running {suite_name}...")
+        for name, (value, unit) in SUITES[suite_name]().items():
+            results[f"{suite_name}.{name}"] = {"value": value, "unit": unit}
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "commit": get_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "results": results,
+    }
+
+
+def compare(report: dict, baseline: dict, threshold: float) -> list:
+    regressions = []
+    for name, result in report["results"].items():
+        previous = baseline["results"].get(name)
+        if previous is None or not previous["value"]:
+            continue
+        ratio = result["value"] / previous["value"]
+        if result["unit"] in LOWER_IS_BETTER_UNITS:
+            ratio = 1 / ratio if ratio else float("inf")
+        print(f"{name:>45}: {ratio:6.2f}x of baseline")
+        if ratio < 1 - threshold:
+            regressions.append(name)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmarks of the host I/O stack and code generators"
+    )
+    parser.add_argument("-o", "--output", help="Path of the JSON report to write")
+    parser.add_argument("-b", "--baseline", help="JSON report to compare against")
+    parser.add_argument(
+        "-s", "--suites", nargs="*", choices=list(SUITES), default=list(SUITES)
+    )
+    parser.add_argument(
+        "-t", "--threshold", type=float, default=0.1, help="Allowed relative slowdown"
+    )
+    args = parser.parse_args()
+
+    report = run_suites(args.suites)
+    for name, result in report["results"].items():
+        print(f"{name:>45}: {result['value']:14.6g} {result['unit']}")
+    if args.output:
+        with open(args.output, "wt") as file:
+            file.write(json.dumps(report, indent=4))
+
+    if args.baseline:
+        with open(args.baseline) as file:
+            regressions = compare(report, json.load(file), args.threshold)
+        if regressions:
+            print(f"Regressions: {' '.join(regressions)}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,20 @@
+from time import perf_counter
+from timeit import repeat
+from typing import Callable
+
+
+def calls_per_second(function: Callable, calls: int, repeats: int = 5) -> float:
+    return calls / min(repeat(function, number=calls, repeat=repeats))
+
+
+def wall_time(function: Callable, repeats: int = 3) -> float:
+    """
+    Best-of-N wall time of a single call, in seconds
+    """
+    best = None
+    for _ in range(repeats):
+        start = perf_counter()
+        function()
+        elapsed = perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
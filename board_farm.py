@@ -0,0 +1,159 @@
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+from queue import SimpleQueue
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Tuple
+
+from fpga_interface import FpgaInterface
+from usb_interface.atlys_interface import enumerate_devices
+
+# shards per board of a sharded vector workload, more shards balance uneven boards better
+DEFAULT_SHARDS_PER_BOARD = 4
+
+
+class BoardFarm(object):
+    """
+    Boards running the same design, each driven by its own FpgaInterface on
+    a worker thread of a shared pool
+
+    Boards are keyed by the device they were opened with, e.g. the Digilent
+    connection string. Workloads are spread with imap_unordered(): every
+    workload runs on whichever board is free next, so a workload must not
+    depend on state left behind by another one. Simulated boards are opened
+    the same way, the device names then only label them.
+    """
+
+    def __init__(self, boards: Dict[str, FpgaInterface]) -> None:
+        if not boards:
+            raise ValueError("A board farm needs at least one board")
+        self.boards = dict(boards)
+        self._executor = ThreadPoolExecutor(len(self.boards), "board")
+
+    @classmethod
+    def open(
+        cls, json_config_path: Path, devices: List[str] = None, **kwargs
+    ) -> "BoardFarm":
+        """
+        Opens (and so programs) a board per device, every connected Digilent
+        device by default; kwargs go to FpgaInterface
+
+        Boards are opened one after another, every AtlysInterface enumerates
+        the devices and the device manager enumeration is not thread-safe.
+        Boards already running the design are not reprogrammed, program()
+        programs all boards in parallel.
+        """
+        if devices is None:
+            devices = [device.connection_string for device in enumerate_devices()]
+        if not devices:
+            raise ValueError("No Digilent device found")
+        boards = {}
+        try:
+            for device in devices:
+                boards[device] = FpgaInterface(
+                    json_config_path, device=device, **kwargs
+                )
+        except BaseException:
+            # the boards opened so far would otherwise stay claimed
+            for fpga in boards.values():
+                fpga.close()
+            raise
+        return cls(boards)
+
+    def close(self) -> None:
+        """
+        Waits for running workloads, then closes every board
+        """
+        self._executor.shutdown()
+        for fpga in self.boards.values():
+            fpga.close()
+
+    def __enter__(self) -> "BoardFarm":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def program(self, bitfile_path: Path) -> Dict[str, bool]:
+        """
+        Programs the bitfile into every board in parallel, returns the
+        success of each board
+        """
+        return self.run(lambda fpga: fpga.program(bitfile_path))
+
+    def run(self, function: Callable[[FpgaInterface], Any]) -> Dict[str, Any]:
+        """
+        Calls function(fpga) on every board in parallel, returns the results
+        by board
+        """
+        futures = {
+            name: self._executor.submit(function, fpga)
+            for name, fpga in self.boards.items()
+        }
+        return {name: future.result() for name, future in futures.items()}
+
+    def imap_unordered(
+        self, function: Callable[[FpgaInterface, Any], Any], workloads: Iterable
+    ) -> Iterator[Tuple[int, str, Any]]:
+        """
+        Calls function(fpga, workload) for every workload on the next free
+        board, yields (workload index, board, result) as workloads finish
+        """
+        free_boards = SimpleQueue()
+        for name in self.boards:
+            free_boards.put(name)
+
+        def run_workload(index: int, workload):
+            name = free_boards.get()
+            try:
+                return index, name, function(self.boards[name], workload)
+            finally:
+                free_boards.put(name)
+
+        futures = [
+            self._executor.submit(run_workload, index, workload)
+            for index, workload in enumerate(workloads)
+        ]
+        try:
+            for future in as_completed(futures):
+                yield future.result()
+        finally:
+            for future in futures:
+                future.cancel()
+
+    def apply_vectors(
+        self,
+        inputs,
+        clock: str,
+        cycles_per_vector: int,
+        observe: List[str],
+        vectors_per_shard: int = None,
+    ):
+        """
+        Plays back a structured NumPy array of input vectors split in shards
+        across the boards, see FpgaInterface.apply_vectors(); ports are given
+        by name. Returns the observed outputs in vector order.
+        """
+        # NumPy is only required by vector playback, so it is imported on use
+        import numpy as np
+
+        if vectors_per_shard is None:
+            shards = len(self.boards) * DEFAULT_SHARDS_PER_BOARD
+            vectors_per_shard = max(-(-len(inputs) // shards), 1)
+
+        def apply_shard(fpga: FpgaInterface, start: int):
+            port_list = fpga.get_port_list()
+            stop = start + vectors_per_shard
+            return fpga.apply_vectors(
+                inputs[start:stop],
+                port_list[clock],
+                cycles_per_vector,
+                [port_list[name] for name in observe],
+            )
+
+        if not len(inputs):
+            # no transfers, the empty outputs only need the observed port dtypes
+            return apply_shard(next(iter(self.boards.values())), 0)
+        starts = range(0, len(inputs), vectors_per_shard)
+        outputs = [None] * len(starts)
+        for index, _, shard_outputs in self.imap_unordered(apply_shard, starts):
+            outputs[index] = shard_outputs
+        return np.concatenate(outputs)
@@ -0,0 +1,264 @@
+import argparse
+import json
+import os
+import socket
+from collections import deque
+from threading import Condition, Thread
+
+from fpga_interface import FpgaInterface
+from port_tools import port_defs
+from usb_interface.remote_interface import (
+    DEFAULT_BROKER_SOCKET_PATH,
+    READ_BLOCK_OP,
+    READ_SET_OP,
+    WRITE_BLOCK_OP,
+    WRITE_SET_OP,
+    encode_message,
+)
+from usb_interface.usb_interface import UsbInterface
+
+BLOCK_OPS = [READ_BLOCK_OP, WRITE_BLOCK_OP]
+BROKER_OPS = [READ_SET_OP, WRITE_SET_OP] + BLOCK_OPS
+
+
+class _Client(object):
+    def __init__(self, connection: socket.socket) -> None:
+        self.connection = connection
+        self.requests = deque()
+        self.connected = True
+
+    def respond(self, message: dict) -> None:
+        try:
+            self.connection.sendall(encode_message(message))
+        except OSError:
+            self.connected = False
+
+
+class DeviceBroker(object):
+    """
+    Owns a UsbInterface and serves register requests of many processes
+
+    Every client connection gets its own request queue. The scheduler
+    takes at most one request from each waiting client per round, visiting
+    clients round-robin, and executes the whole round with as few transfers
+    as possible: consecutive writes become one write_set() call and
+    consecutive reads one read_set() call. Requests still queued when their
+    client disconnects are dropped unexecuted, nobody could read the replies.
+    """
+
+    def __init__(self, usb_interface: UsbInterface, socket_path: str) -> None:
+        self._usb_interface = usb_interface
+        self._socket_path = str(socket_path)
+        self._clients = []
+        self._next_client = 0
+        self._condition = Condition()
+        self._running = False
+        self._server = None
+        self.requests_served = 0
+        self.transfers = 0
+
+    def start(self) -> None:
+        if os.path.exists(self._socket_path):
+            os.unlink(self._socket_path)
+        self._server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._server.bind(self._socket_path)
+        self._server.listen()
+        self._running = True
+        Thread(target=self._accept_clients, daemon=True).start()
+        Thread(target=self._schedule, daemon=True).start()
+
+    def serve_forever(self) -> None:
+        self.start()
+        with self._condition:
+            self._condition.wait_for(lambda: not self._running)
+
+    def close(self) -> None:
+        with self._condition:
+            self._running = False
+            self._condition.notify_all()
+        if self._server is not None:
+            self._server.close()
+            self._server = None
+        if os.path.exists(self._socket_path):
+            os.unlink(self._socket_path)
+
+    def _accept_clients(self) -> None:
+        while self._running:
+            try:
+                connection, _ = self._server.accept()
+            except OSError:
+                return
+            client = _Client(connection)
+            with self._condition:
+                self._clients.append(client)
+            Thread(target=self._receive_requests, args=(client,), daemon=True).start()
+
+    def _receive_requests(self, client: _Client) -> None:
+        with client.connection, client.connection.makefile("rb") as reader:
+            for line in reader:
+                with self._condition:
+                    client.requests.append(_parse_request(line))
+                    self._condition.notify_all()
+        with self._condition:
+            client.connected = False
+            client.requests.clear()
+            self._clients.remove(client)
+
+    def _schedule(self) -> None:
+        while True:
+            with self._condition:
+                self._condition.wait_for(
+                    lambda: not self._running
+                    or any(client.requests for client in self._clients)
+                )
+                if not self._running:
+                    return
+                batch = self._take_round()
+            self._execute(batch)
+
+    def _take_round(self):
+        batch = []
+        count = len(self._clients)
+        for i in range(count):
+            client = self._clients[(self._next_client + i) % count]
+            if client.requests:
+                batch.append((client, client.requests.popleft()))
+        self._next_client = (self._next_client + 1) % max(count, 1)
+        return batch
+
+    def _execute(self, batch) -> None:
+        runs = []
+        for client, request in batch:
+            if "error" in request:
+                client.respond(request)
+                continue
+            # block transfers keep their own run, they are not coalesced
+            if not runs or runs[-1][0] != request["op"] or request["op"] in BLOCK_OPS:
+                runs.append((request["op"], [], []))
+            op, registers, owners = runs[-1]
+            start = len(registers)
+            if op == WRITE_SET_OP:
+                registers.extend(tuple(pair) for pair in request["args"])
+            else:
+                registers.extend(request["args"])
+            owners.append((client, start, len(registers)))
+
+        for op, registers, owners in runs:
+            try:
+                results = self._transfer(op, registers, owners)
+            except Exception as error:
+                for client, *_ in owners:
+                    client.respond({"error": str(error)})
+                continue
+            self.transfers += 1
+            self.requests_served += len(owners)
+            for (client, *_), result in zip(owners, results):
+                client.respond({"result": result})
+
+    def _transfer(self, op, registers, owners):
+        if op == READ_BLOCK_OP:
+            start, count, increment = registers
+            data = self._usb_interface.read_block(start, count, increment)
+            return [bytes(data or b"").hex()]
+        if op == WRITE_BLOCK_OP:
+            start, data, increment = registers
+            result = self._usb_interface.write_block(
+                start, bytes.fromhex(data), increment
+            )
+            return [result is not False]
+        if op == WRITE_SET_OP:
+            result = self._usb_interface.write_set(registers) is not False
+            return [result] * len(owners)
+        values = self._usb_interface.read_set(registers)
+        return [
+            None if values is None else values[start:end] for _, start, end in owners
+        ]
+
+
+def _parse_request(line: bytes) -> dict:
+    """
+    Returns the request of a message line, or the error reply to an invalid one
+
+    Error replies are queued like requests, so that only the scheduler
+    thread sends on client sockets and replies keep the request order.
+    Arguments are validated here, so that the scheduler never coalesces a
+    malformed request with the requests of other clients.
+    """
+    try:
+        request = json.loads(line)
+    except ValueError as error:
+        return {"error": f"Malformed request: {error}"}
+    op = request.get("op") if isinstance(request, dict) else None
+    if op not in BROKER_OPS:
+        return {"error": f"Unknown operation {op}"}
+    if not _is_valid_args(op, request.get("args")):
+        return {"error": f"Invalid arguments of {op}"}
+    return request
+
+
+def _is_valid_args(op: str, args) -> bool:
+    if not isinstance(args, list):
+        return False
+    if op == READ_SET_OP:
+        return all(_is_register(address) for address in args)
+    if op == WRITE_SET_OP:
+        return all(
+            isinstance(pair, list)
+            and len(pair) == 2
+            and _is_register(pair[0])
+            and _is_register(pair[1], port_defs.DATA_MASK)
+            for pair in args
+        )
+    # block operations: start, count or hex-encoded data, increment
+    if len(args) != 3 or not _is_register(args[0]) or not isinstance(args[2], bool):
+        return False
+    if op == READ_BLOCK_OP:
+        return _is_register(args[1])
+    return isinstance(args[1], str) and _is_hex(args[1])
+
+
+def _is_register(value, maximum: int = None) -> bool:
+    return (
+        isinstance(value, int)
+        and not isinstance(value, bool)
+        and 0 <= value
+        and (maximum is None or value <= maximum)
+    )
+
+
+def _is_hex(data: str) -> bool:
+    try:
+        bytes.fromhex(data)
+    except ValueError:
+        return False
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Device broker sharing one FPGA board between processes"
+    )
+    parser.add_argument(
+        "-c", "--config", help="Path to JSON config of the design", required=True
+    )
+    parser.add_argument(
+        "-s",
+        "--socket_path",
+        help="Unix socket to listen on",
+        default=DEFAULT_BROKER_SOCKET_PATH,
+    )
+    args = parser.parse_args()
+
+    fpga = FpgaInterface(args.config)
+    broker = DeviceBroker(fpga.get_usb_interface(), args.socket_path)
+    print(f"Device broker listening on {args.socket_path}")
+    try:
+        broker.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        broker.close()
+
+
+if __name__ == "__main__":
+    main()
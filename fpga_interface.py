@@ -1,34 +1,160 @@
 import json
+from contextlib import contextmanager
 from pathlib import Path
+from threading import RLock
+from time import monotonic, sleep
+from typing import Callable, Dict, Iterator, List
 
+from port_tools import port_defs
 from usb_interface.usb_interface import UsbInterface
-from usb_interface.atlys_interface import AtlysInterface
+from usb_interface.atlys_interface import AtlysInterface, DEVICE_NAME
+from usb_interface.bank_select import BankSelect
+from usb_interface.free_running_clock import FreeRunningClock
+from usb_interface.instrumentation import (
+    InstrumentedInterface,
+    write_prometheus_textfile,
+)
+from usb_interface.remote_interface import RemoteInterface, DEFAULT_BROKER_SOCKET_PATH
+from usb_interface.shadow_cache import ShadowCache
+from usb_interface.simulated_interface import SimulatedInterface, LatencyModel
+from usb_interface.trace_recorder import TraceRecorder
+from usb_interface.transaction import Transaction
+from port_tools.units import ChangeDetector, Misr, StepGroup, VectorEngine, WaitUnit
 from port_tools.port_manager import PortManager, PortList, IoPort, ClockPort
 
 JSON_PORT_LIST_KEY = "ports"
 JSON_BITFILE_PATH_KEY = "bitfile_path"
 JSON_USB_INTERFACE_KEY = "fpga_interface"
 JSON_ATLYS_INTERFACE_KEY = "atlys"
-JSON_SUPPORTED_INTERFACE_KEYS = [JSON_ATLYS_INTERFACE_KEY]
+JSON_SIMULATED_INTERFACE_KEY = "simulated"
+JSON_REMOTE_INTERFACE_KEY = "remote"
+JSON_SUPPORTED_INTERFACE_KEYS = [
+    JSON_ATLYS_INTERFACE_KEY,
+    JSON_SIMULATED_INTERFACE_KEY,
+    JSON_REMOTE_INTERFACE_KEY,
+]
+JSON_SIMULATED_LATENCY_KEY = "simulated_latency"
+JSON_BROKER_SOCKET_KEY = "broker_socket"
+# seconds between polls of the wait unit status, doubled after every poll up to the maximum
+WAIT_POLL_INTERVAL = 0.001
+WAIT_MAX_POLL_INTERVAL = 0.05
+WAIT_HOST_TIMEOUT = 10.0
+
+
+def _load_build_id(json_build_id: dict):
+    build_id_port = IoPort(
+        name=port_defs.BUILD_ID_KEY,
+        address=json_build_id[port_defs.ADDRESS_KEY],
+        direction=port_defs.ALLOWED_DIRECTIONS[1],
+        bit_width=port_defs.BUILD_ID_SIZE * port_defs.DATA_WIDTH,
+    )
+    return int(json_build_id[port_defs.BUILD_ID_VALUE_KEY], 16), build_id_port
+
+
+def _load_bank_select(json_bank_select: dict) -> BankSelect:
+    return BankSelect(int(json_bank_select[port_defs.ADDRESS_KEY][0], 16) + 1)
+
+
+def _load_snapshot_port(json_snapshot: dict) -> IoPort:
+    return IoPort(
+        name=port_defs.SNAPSHOT_KEY,
+        address=json_snapshot[port_defs.ADDRESS_KEY],
+        direction=port_defs.ALLOWED_DIRECTIONS[0],
+        bit_width=port_defs.DATA_WIDTH,
+    )
+
+
+# optional units of the JSON config: FpgaInterface attribute, JSON key and loader of the unit, left None when absent
+UNIT_LOADERS = {
+    "_build_id": (port_defs.BUILD_ID_KEY, _load_build_id),
+    "_bank_select": (port_defs.BANK_SELECT_KEY, _load_bank_select),
+    "_snapshot_port": (port_defs.SNAPSHOT_KEY, _load_snapshot_port),
+    "_change_detector": (
+        port_defs.CHANGE_DETECTION_KEY,
+        lambda json_unit: ChangeDetector(**json_unit),
+    ),
+    "_wait_unit": (port_defs.WAIT_UNIT_KEY, lambda json_unit: WaitUnit(**json_unit)),
+    "_vector_engine": (
+        port_defs.VECTOR_ENGINE_KEY,
+        lambda json_unit: VectorEngine(**json_unit),
+    ),
+    "_misr": (port_defs.MISR_KEY, lambda json_unit: Misr(**json_unit)),
+    "_step_group": (port_defs.STEP_GROUP_KEY, lambda json_unit: StepGroup(**json_unit)),
+}
 
 
 class FpgaInterface(object):
-    def __init__(self, json_config_path: Path) -> None:
+    def __init__(
+        self,
+        json_config_path: Path,
+        shadow_cache: bool = False,
+        instrument: bool = False,
+        device: str = None,
+    ) -> None:
+        # Digilent device name or connection string, used by the atlys interface
+        self._device = device or DEVICE_NAME
+        self._shadow_cache = ShadowCache() if shadow_cache else None
+        # set to a host_tools.access_profile.AccessProfile to record batched transfers
+        self.access_profile = None
+        self._subscribers = {}
+        self._polled_ports = set()
+        self._free_running_clocks = {}
+        # held by AsyncFpgaInterface while it flushes, hold it to use this interface from another thread meanwhile
+        self.lock = RLock()
         with open(json_config_path) as json_file:
             raw_json = json.load(json_file)
             if JSON_PORT_LIST_KEY not in raw_json:
                 raise ValueError(
                     f'Provided JSON configuration does not contain "{JSON_PORT_LIST_KEY}" object'
                 )
-            self._port_manager = PortManager(raw_json[JSON_PORT_LIST_KEY])
+            self._port_manager = PortManager(raw_json)
+            self._load_units(raw_json)
+            self._main_clock_hz = raw_json.get(port_defs.MAIN_CLOCK_HZ_KEY)
             self._usb_interface = self._get_usb_interface(
                 raw_json.get(JSON_USB_INTERFACE_KEY),
                 raw_json.get(JSON_BITFILE_PATH_KEY),
+                raw_json,
             )
+        # the backend is wrapped only when instrumented, so that disabled instrumentation costs nothing
+        self._instrumentation = None
+        if instrument:
+            self._instrumentation = InstrumentedInterface(
+                self._usb_interface, self.get_port_list()
+            )
+            self._usb_interface = self._instrumentation
 
-    def _get_usb_interface(self, json_interface_config, json_bitfile_path: Path):
+    def _get_usb_interface(
+        self, json_interface_config, json_bitfile_path: Path, raw_json: dict
+    ):
         if json_interface_config == JSON_ATLYS_INTERFACE_KEY:
-            return AtlysInterface(json_bitfile_path)
+            return AtlysInterface(
+                json_bitfile_path,
+                *(self._build_id or (None, None)),
+                auto_increment=raw_json.get(port_defs.AUTO_INCREMENT_KEY, False),
+                bank_select=self._bank_select,
+                device=self._device,
+            )
+        if json_interface_config == JSON_SIMULATED_INTERFACE_KEY:
+            build_id, build_id_port = self._build_id or (None, None)
+            return SimulatedInterface(
+                self.get_port_list(),
+                LatencyModel(**raw_json.get(JSON_SIMULATED_LATENCY_KEY, {})),
+                build_id=build_id,
+                build_id_port=build_id_port,
+                auto_increment=raw_json.get(port_defs.AUTO_INCREMENT_KEY, False),
+                snapshot_port=self._snapshot_port,
+                change_detector=self._change_detector,
+                wait_unit=self._wait_unit,
+                vector_engine=self._vector_engine,
+                misr=self._misr,
+                step_group=self._step_group,
+                main_clock_hz=self._main_clock_hz,
+                bank_select=self._bank_select,
+            )
+        if json_interface_config == JSON_REMOTE_INTERFACE_KEY:
+            return RemoteInterface(
+                raw_json.get(JSON_BROKER_SOCKET_KEY, DEFAULT_BROKER_SOCKET_PATH)
+            )
 
         print(
             "No fpga_interface specified or unknown fpga_interface in JSON config, using dummy one"
@@ -38,14 +164,504 @@ class FpgaInterface(object):
         )
         return UsbInterface()
 
+    def _load_units(self, raw_json: dict) -> None:
+        for attribute, (key, loader) in UNIT_LOADERS.items():
+            json_unit = raw_json.get(key)
+            setattr(self, attribute, None if json_unit is None else loader(json_unit))
+
     def get_port_list(self) -> PortList:
         return self._port_manager.get_port_list()
 
+    def get_usb_interface(self) -> UsbInterface:
+        """
+        Returns the backend, operations issued on it directly are not instrumented
+        """
+        if self._instrumentation is not None:
+            return self._instrumentation.backend
+        return self._usb_interface
+
+    def program(self, bitfile_path: Path) -> bool:
+        """
+        Programs the bitfile into the FPGA, the shadow cache is invalidated
+        """
+        self.invalidate_cache()
+        return self.get_usb_interface().program(bitfile_path)
+
+    def close(self) -> None:
+        """
+        Releases the device of the backend, the interface can't be used afterwards
+        """
+        self.get_usb_interface().close()
+
+    def stats(self) -> dict:
+        """
+        Returns transaction and register counts per operation and per port and
+        latency percentiles per operation, see InstrumentedInterface.stats()
+        """
+        return self._get_instrumentation().stats()
+
+    def reset_stats(self) -> None:
+        self._get_instrumentation().reset()
+
+    def write_metrics(self, path: Path) -> None:
+        """
+        Writes the instrumentation metrics to a Prometheus textfile
+        """
+        write_prometheus_textfile(self._get_instrumentation(), path)
+
+    def add_profiler_hook(self, hook: Callable[[str, int, int], None]) -> None:
+        """
+        Calls hook(operation, registers, elapsed_ns) after every operation
+        """
+        self._get_instrumentation().hooks.append(hook)
+
+    def _get_instrumentation(self) -> InstrumentedInterface:
+        if self._instrumentation is None:
+            raise ValueError(
+                "Instrumentation is disabled, create the interface with instrument=True"
+            )
+        return self._instrumentation
+
     def read(self, port: IoPort) -> int:
+        if self._is_cached(port):
+            value = self._shadow_cache.get(port)
+            if value is not None:
+                return value
         return self._usb_interface.read(port)
 
     def write(self, port: IoPort, value: int) -> bool:
-        return self._usb_interface.write(port, value)
+        if not self._is_cached(port):
+            return self._usb_interface.write(port, value)
+        if self._shadow_cache.is_redundant(port, value):
+            return True
+        success = self._usb_interface.write(port, value)
+        if success is False:
+            self._shadow_cache.invalidate(port)
+        else:
+            self._shadow_cache.update(port, value)
+        return success
+
+    def write_masked(
+        self, port: IoPort, value: int, mask: int, base: int = None
+    ) -> bool:
+        """
+        Read-modify-write of the bits selected by mask
+
+        The other bits keep base, by default the shadow cache value of the
+        port, so updating a sub-field of a host-driven port costs a single
+        write. Input registers can't be read back, the output mux returns
+        another signal at their address, so a port without base and cached
+        value raises ValueError.
+        """
+        if base is None and self._is_cached(port):
+            base = self._shadow_cache.get(port)
+        if base is None:
+            raise ValueError(
+                f"Value of port {port.name} is unknown, write it in full first or pass base"
+            )
+        return self.write(port, (base & ~mask) | (value & mask))
+
+    def invalidate_cache(self, port: IoPort = None) -> None:
+        if self._shadow_cache is not None:
+            self._shadow_cache.invalidate(port)
+
+    def cache_stats(self) -> dict:
+        return self._shadow_cache.stats() if self._shadow_cache is not None else {}
+
+    def read_block(
+        self, start: int, count: int, increment: bool = True, out=None
+    ) -> memoryview:
+        return self._usb_interface.read_block(start, count, increment, out)
+
+    def write_block(self, start: int, data, increment: bool = True) -> bool:
+        # raw register writes bypass the port-level shadow cache
+        self.invalidate_cache()
+        return self._usb_interface.write_block(start, data, increment)
+
+    def snapshot(self) -> Dict[str, int]:
+        """
+        Latches every output port at once and reads the frozen copies back
+        with one transfer, so wide values can't tear while the DUT runs
+        """
+        if self._snapshot_port is None:
+            raise ValueError(
+                "Design has no snapshot register bank, generate it with --snapshot"
+            )
+        ports = [
+            port
+            for port in self.get_port_list()
+            if isinstance(port, IoPort) and port.snapshot_address
+        ]
+        addresses = [address for port in ports for address in port.snapshot_address]
+        self._usb_interface.write_set([(self._snapshot_port.address[0], 1)])
+        values = self._usb_interface.read_set(addresses)
+        if values is None:
+            return {}
+        snapshot = {}
+        start = 0
+        for port in ports:
+            end = start + len(port.snapshot_address)
+            snapshot[port.name] = port.decode(values[start:end])
+            start = end
+        return snapshot
+
+    def poll_changes(self) -> Dict[str, int]:
+        """
+        Returns output ports changed since the previous poll and passes them
+        to subscribed callbacks
+
+        Only registers flagged in the change bitmap are fetched; ports not
+        polled before are read in full once to learn their value.
+        """
+        detector = self._change_detector
+        if detector is None:
+            raise ValueError(
+                "Design has no change detection, generate it with --change_detection"
+            )
+        self._usb_interface.write_set([(detector.address, 1)])
+        bitmap = self._usb_interface.read_set(detector.bitmap_address)
+        if bitmap is None:
+            return {}
+        changed_registers = set(detector.get_changed_registers(bitmap))
+        ports = [
+            port
+            for port in self.get_port_list()
+            if isinstance(port, IoPort)
+            and port.direction != port_defs.ALLOWED_DIRECTIONS[0]
+            and port.address[0] in detector.registers
+            and (
+                port.name not in self._polled_ports
+                or changed_registers.intersection(port.address)
+            )
+        ]
+        if not ports:
+            return {}
+        values = self._usb_interface.read_set(
+            [address for port in ports for address in port.address]
+        )
+        if values is None:
+            return {}
+        changes = {}
+        start = 0
+        for port in ports:
+            end = start + len(port.address)
+            changes[port.name] = port.decode(values[start:end])
+            start = end
+            self._polled_ports.add(port.name)
+        for port in ports:
+            for callback in self._subscribers.get(port.name, []):
+                callback(port, changes[port.name])
+        return changes
+
+    def subscribe(self, port: IoPort, callback: Callable[[IoPort, int], None]) -> None:
+        """
+        Registers callback(port, value), called by poll_changes() when port changes
+        """
+        self._subscribers.setdefault(port.name, []).append(callback)
+
+    def unsubscribe(
+        self, port: IoPort, callback: Callable[[IoPort, int], None]
+    ) -> None:
+        self._subscribers.get(port.name, []).remove(callback)
+
+    def wait_for(
+        self,
+        port: IoPort,
+        mask: int,
+        value: int,
+        timeout: int = None,
+        clock: ClockPort = None,
+        cycles: int = 0,
+        poll_interval: float = WAIT_POLL_INTERVAL,
+        host_timeout: float = WAIT_HOST_TIMEOUT,
+    ) -> bool:
+        """
+        Arms the on-chip wait unit and polls its status until port & mask
+        equals value & mask (True) or timeout interface clock cycles pass (False)
+
+        Clocks issued with clock and cycles start right after arming, so the
+        condition can't be missed. On a match the clock generators halt with
+        the DUT in the matching state until resume_clocks() is called.
+
+        The poll interval doubles up to WAIT_MAX_POLL_INTERVAL. Once
+        host_timeout seconds pass without a match or a timeout of the unit,
+        it is released and False is returned. With host_timeout None the
+        host waits for the unit alone, forever if timeout is None as well.
+        """
+        unit = self._wait_unit
+        if unit is None:
+            raise ValueError("Design has no wait unit, generate it with --wait_unit")
+        self._check_wait_port(port)
+        self._check_wait_args(mask, value, timeout)
+        if clock is not None and cycles > clock.max_cycles:
+            raise ValueError(
+                f"At most {clock.max_cycles} cycles of {clock.name} can be issued at once"
+            )
+        self._usb_interface.write_set(
+            unit.get_arm_registers(port, mask, value, timeout or 0)
+        )
+        if clock is not None and cycles:
+            self.write_clock_cycles(clock, cycles)
+        deadline = None if host_timeout is None else monotonic() + host_timeout
+        while True:
+            status = self._usb_interface.read_set([unit.status_address])
+            if not status:
+                return False
+            if status[0] & port_defs.WAIT_STATUS_HIT:
+                return True
+            if not status[0] & port_defs.WAIT_STATUS_WAITING:
+                return False
+            if deadline is not None and monotonic() >= deadline:
+                # disarmed, so the clocks can't halt once the host stopped waiting
+                self.resume_clocks()
+                return False
+            sleep(poll_interval)
+            poll_interval = min(poll_interval * 2, WAIT_MAX_POLL_INTERVAL)
+
+    def _check_wait_args(self, mask: int, value: int, timeout: int) -> None:
+        data_bits = port_defs.DATA_WIDTH * port_defs.WAIT_DATA_SIZE
+        if mask >> data_bits or value >> data_bits:
+            raise ValueError(
+                f"The wait unit compares the lowest {port_defs.WAIT_DATA_SIZE} registers only"
+            )
+        if timeout is not None and (
+            timeout >> (port_defs.DATA_WIDTH * port_defs.WAIT_TIMEOUT_SIZE)
+        ):
+            raise ValueError(
+                f"The wait unit timeout is {port_defs.WAIT_TIMEOUT_SIZE} registers wide"
+            )
+
+    def _check_wait_port(self, port: IoPort) -> None:
+        if not isinstance(port, IoPort) or port.direction == (
+            port_defs.ALLOWED_DIRECTIONS[0]
+        ):
+            raise ValueError(f"Port {port.name} is not driven by the DUT")
+        # the select register holds the output address of the port
+        if port.address[0] > port_defs.DATA_MASK:
+            raise ValueError(
+                f"Port {port.name} is not in the first register bank, the wait unit can't select it"
+            )
+
+    def resume_clocks(self) -> bool:
+        """
+        Releases clock generators halted by the wait unit, pending pulses resume
+        """
+        if self._wait_unit is None:
+            raise ValueError("Design has no wait unit, generate it with --wait_unit")
+        return self._usb_interface.write_set(
+            [(self._wait_unit.address, port_defs.WAIT_RELEASE)]
+        )
 
     def write_clock_cycles(self, port: ClockPort, cycles: int) -> bool:
         return self._usb_interface.write_clock_cycles(port, cycles)
+
+    def step(self, cycles: Dict[ClockPort, int]) -> bool:
+        """
+        Issues cycles[port] pulses of every given clock with one write_set()
+
+        Clocks of the step group (--step_group) given the same count are fired
+        by one write of its select register and start in the same cycle, each
+        further distinct count costs another count and select write. Other
+        clocks are written as by write_clock_cycles(), in the same transfer.
+        """
+        group = self._step_group
+        grouped_counts = {}
+        address_value_pairs = []
+        for port, count in cycles.items():
+            grouped = group is not None and port.name in group.clocks
+            max_cycles = (
+                min(port.max_cycles, group.max_cycles) if grouped else port.max_cycles
+            )
+            if count > max_cycles:
+                raise ValueError(
+                    f"At most {max_cycles} cycles of {port.name} can be issued at once"
+                )
+            if not count:
+                continue
+            if grouped:
+                grouped_counts.setdefault(count, []).append(port.name)
+            else:
+                address_value_pairs.extend(zip(port.address, port.encode(count)))
+        for count, clock_names in grouped_counts.items():
+            address_value_pairs.extend(group.get_step_registers(clock_names, count))
+        if not address_value_pairs:
+            return True
+        return self._usb_interface.write_set(address_value_pairs)
+
+    def clock(self, port: ClockPort) -> FreeRunningClock:
+        """
+        Returns the control of the free-running divider of port (--free_running)
+        """
+        free_running_clock = self._free_running_clocks.get(port.name)
+        if free_running_clock is None:
+            free_running_clock = FreeRunningClock(
+                lambda: self._usb_interface, port, self._main_clock_hz
+            )
+            self._free_running_clocks[port.name] = free_running_clock
+        return free_running_clock
+
+    def is_clock_busy(self, port: ClockPort) -> bool:
+        if port.busy_address is None:
+            raise ValueError(f"Clock port {port.name} has no busy status register")
+        status = self._usb_interface.read_set([port.busy_address])
+        return bool(status and status[0] >> port.busy_bit & 1)
+
+    def run_cycles(
+        self, port: ClockPort, cycles: int, wait: bool = True, poll_interval: float = 0
+    ) -> bool:
+        """
+        Issues cycles clock pulses, with one command per counter capacity
+
+        The generator starts counting in the cycle after the write of its
+        last counter register, so busy polls only check its progress.
+        Counts above port.max_cycles are split into commands issued after the
+        previous one completed, which requires the busy status register.
+        """
+        if cycles > port.max_cycles and port.busy_address is None:
+            raise ValueError(
+                f"Clock port {port.name} has no busy status register, "
+                + f"at most {port.max_cycles} cycles can be issued"
+            )
+        success = True
+        while cycles > 0:
+            command_cycles = min(cycles, port.max_cycles)
+            success = (
+                self.write_clock_cycles(port, command_cycles) is not False and success
+            )
+            cycles -= command_cycles
+            if (wait or cycles) and port.busy_address is not None:
+                while self.is_clock_busy(port):
+                    sleep(poll_interval)
+        return success
+
+    def apply_vectors(
+        self,
+        inputs,
+        clock: ClockPort,
+        cycles_per_vector: int,
+        observe: List[IoPort],
+    ):
+        """
+        Plays back a structured NumPy array of input vectors, see
+        host_tools.vector_playback.apply_vectors()
+        """
+        # NumPy is only required by vector playback, so it is imported on use
+        from host_tools.vector_playback import apply_vectors
+
+        port_list = self.get_port_list()
+        # the driven ports keep the values of the last vector
+        for name in inputs.dtype.names:
+            self.invalidate_cache(port_list[name])
+        return apply_vectors(
+            self._usb_interface, port_list, inputs, clock, cycles_per_vector, observe
+        )
+
+    def run_on_chip(
+        self,
+        vectors,
+        observe: List[IoPort] = None,
+        cycles_per_vector: int = 1,
+        **kwargs,
+    ):
+        """
+        Runs a structured NumPy array of input vectors on the on-chip vector
+        engine, see host_tools.vector_playback.run_on_chip()
+        """
+        if self._vector_engine is None:
+            raise ValueError(
+                "Design has no vector engine, generate it with --vector_depth"
+            )
+        from host_tools.vector_playback import run_on_chip
+
+        return run_on_chip(
+            self._usb_interface,
+            self.get_port_list(),
+            self._vector_engine,
+            vectors,
+            observe,
+            cycles_per_vector,
+            **kwargs,
+        )
+
+    def reset_signature(self) -> bool:
+        """
+        Resets the MISR to its seed, the next clock edge compacts outputs again
+        """
+        return self._usb_interface.write_set([(self._get_design_misr().address, 1)])
+
+    def read_signature(self) -> int:
+        """
+        Returns the signature compacted since the last reset_signature()
+        """
+        misr = self._get_design_misr()
+        values = self._usb_interface.read_set(misr.signature_address)
+        return None if values is None else int.from_bytes(bytes(values), "little")
+
+    def golden_signature(self, outputs) -> int:
+        """
+        Returns the expected signature of a structured NumPy array of output
+        values, see host_tools.signature.golden_signature()
+        """
+        from host_tools.signature import golden_signature
+
+        return golden_signature(self.get_port_list(), self._get_design_misr(), outputs)
+
+    @contextmanager
+    def record(self, path: Path) -> Iterator[TraceRecorder]:
+        """
+        Appends every register access issued through this interface inside
+        the with-block to a binary trace, see replay()
+        """
+        # registers whose write fires clock pulses, recorded as such
+        clock_addresses = [
+            port.address[-1]
+            for port in self.get_port_list()
+            if isinstance(port, ClockPort)
+        ]
+        if self._step_group is not None:
+            clock_addresses.append(self._step_group.address[-1])
+        recorder = TraceRecorder(self._usb_interface, path, clock_addresses)
+        self._usb_interface = recorder
+        try:
+            yield recorder
+        finally:
+            self._usb_interface = recorder.backend
+            recorder.close()
+
+    def replay(self, path: Path, **kwargs):
+        """
+        Replays a trace written by record() at full speed and diffs the
+        observed reads against the recorded ones, see
+        host_tools.trace_replay.replay_trace()
+        """
+        from host_tools.trace_replay import replay_trace
+
+        # replayed register writes bypass the port-level shadow cache
+        self.invalidate_cache()
+        return replay_trace(self._usb_interface, path, **kwargs)
+
+    def _get_design_misr(self) -> Misr:
+        if self._misr is None:
+            raise ValueError("Design has no MISR, generate it with --misr_ports")
+        return self._misr
+
+    def transaction(self) -> Transaction:
+        return Transaction(self._usb_interface, self._shadow_cache, self.access_profile)
+
+    @contextmanager
+    def batch(self) -> Iterator[Transaction]:
+        """
+        Queues operations issued on the yielded Transaction and flushes them
+        as block transfers when the with-block exits without an exception,
+        otherwise they are dropped
+        """
+        transaction = self.transaction()
+        try:
+            yield transaction
+        except BaseException:
+            transaction.abort()
+            raise
+        transaction.flush()
+
+    def _is_cached(self, port: IoPort) -> bool:
+        return self._shadow_cache is not None and self._shadow_cache.is_cacheable(port)
@@ -1,13 +1,44 @@
 import argparse
+from hashlib import sha256
 from pathlib import Path
 from os import makedirs
 from shutil import copy
 
-from generation_tools.port_encoder import PortEncoder
+from generation_tools.port_encoder import PortEncoder, load_port_groups
 from generation_tools.verilog_generator import VerilogGenerator
+from port_tools import port_defs
 from sys import argv
 
 SUPPORTED_INTERFACES = ['atlys']
+# inputs beside the design and HDL sources: a change in the generators regenerates the outputs and changes the build ID
+GENERATOR_SOURCE_PATHS = [Path("./generate_interface.py"), Path("./generation_tools/port_encoder.py"), Path("./generation_tools/verilog_generator.py"), Path("./generation_tools/verilog_parser.py")]
+GENERATION_STAMP_FILE_NAME = ".generation_stamp"
+DEFAULT_CACHE_DIR = Path("./.generation_cache")
+# arguments not changing the generated design
+NON_DESIGN_ARGS = ["source_path", "output_path", "access_profile", "cache_dir", "no_cache"]
+HDL_SOURCE_PATHS = [Path("./generation_tools/hdl/top_template.txt"), Path("./generation_tools/hdl/pulsegen_with_counter.v"), Path("./generation_tools/hdl/inout_writer.v"), Path("./generation_tools/hdl/wait_unit.v"), Path("./generation_tools/hdl/vector_sequencer.v"), Path("./generation_tools/hdl/misr.v"), Path("./generation_tools/hdl/clock_divider.v")]
+
+def compute_design_digest(source_path: Path, interface_path: Path, args):
+    """
+    Hashes the DUT source, HDL templates, generator sources and arguments,
+    the build ID embedded into the generated top module and the generation
+    stamp are taken from this digest
+    """
+    # paths only locate the inputs, their contents are hashed below
+    design_args = {key: value for key, value in vars(args).items() if key not in NON_DESIGN_ARGS}
+    digest = sha256(repr(sorted(design_args.items())).encode())
+    profile_paths = [Path(args.access_profile)] if args.access_profile is not None else []
+    for path in [source_path, interface_path] + HDL_SOURCE_PATHS + GENERATOR_SOURCE_PATHS + profile_paths:
+        digest.update(path.read_bytes())
+    return digest
+
+def compute_build_id(design_digest) -> int:
+    return int.from_bytes(design_digest.digest()[:port_defs.BUILD_ID_SIZE], "little")
+
+def is_up_to_date(output_path: Path, source_path: Path, stamp: str) -> bool:
+    stamp_path = output_path / GENERATION_STAMP_FILE_NAME
+    generated_paths = [output_path / (source_path.stem + "_config.json"), output_path / f"top_{source_path.stem}.v"]
+    return stamp_path.exists() and stamp_path.read_text() == stamp and all(path.exists() for path in generated_paths)
 
 def main():
     parser = argparse.ArgumentParser(description="Generator for JSON config and top Verilog interface module")
@@ -17,24 +48,69 @@ def main():
     parser.add_argument("-o", "--output_path", help="Path where generated files should be saved", default=Path())
     parser.add_argument("--inout_enables", help="List signal names that drive tri-state buffers of inout signals (in order as defined in Verilog source)", nargs="*")
     parser.add_argument("--inout_active", help="List of signal levels indicating that inout_enable signals are allowing for driving tri-state buffer (active low / active high; in order as defined for --inout_enables)", nargs="*", choices=["0", "1"])
+    parser.add_argument("--clock_counter_width", help="Width in bits of clock generator counters, i.e. the most clock cycles issued by one command", type=int, choices=[8, 16, 24, 32], default=8)
+    parser.add_argument("--burst", help="Enable auto-increment burst transfers in the interface (limits each direction to 128 registers)", action="store_true")
+    parser.add_argument("--port_groups", help="Groups of ports accessed together, placed at consecutive addresses (comma separated port names per group, e.g. A,B,C D,E)", nargs="*", default=[])
+    parser.add_argument("--access_profile", help="Path to access profile recorded by the host (AccessProfile.save()), its frequent transfers are placed like --port_groups", default=None)
+    parser.add_argument("--step_group", help="Add a step group firing the listed clock generators (all clock signals when none is listed) with one write, used by FpgaInterface.step()", nargs="*", default=None)
+    parser.add_argument("--free_running", help="Add a programmable divider running the listed clock signals (all clock signals when none is listed) continuously, used by FpgaInterface.clock()", nargs="*", default=None)
+    parser.add_argument("--snapshot", help="Add a snapshot register bank latching all outputs at once, read by FpgaInterface.snapshot()", action="store_true")
+    parser.add_argument("--change_detection", help="Add a bitmap of output registers changed since the last poll, used by FpgaInterface.poll_changes()", action="store_true")
+    parser.add_argument("--wait_unit", help="Add a unit halting the clocks once an output matches a masked value, used by FpgaInterface.wait_for()", action="store_true")
+    parser.add_argument("--vector_depth", help="Depth of the on-chip stimulus and response block RAMs used by FpgaInterface.run_on_chip() (power of two, 0 disables them)", type=int, default=0)
+    parser.add_argument("--vector_clock", help="Clock signal advanced by the on-chip vector sequencer (first clock signal by default)", default=None)
+    parser.add_argument("--vector_inputs", help="Input ports driven from the stimulus RAM, i.e. its width (all inputs by default)", nargs="*", default=None)
+    parser.add_argument("--vector_outputs", help="Output ports captured into the response RAM, i.e. its width (all outputs by default)", nargs="*", default=None)
+    parser.add_argument("--misr_ports", help="Add a signature register (MISR) compacting the listed output ports (all outputs when no port is listed), see host_tools.signature", nargs="*", default=None)
+    parser.add_argument("--misr_clock", help="Clock signal on whose edges the MISR compacts outputs (first clock signal by default)", default=None)
+    parser.add_argument("--no_build_id", help="Do not embed the build ID register used to skip reprogramming of an FPGA already running this design", action="store_true")
+    parser.add_argument("--cache_dir", help="Directory of the parse cache, keyed by the hash of the parsed source", default=DEFAULT_CACHE_DIR)
+    parser.add_argument("--no_cache", help="Parse the source and regenerate all files even if the source, HDL templates and arguments did not change", action="store_true")
 
     args = parser.parse_args()
+    if args.vector_depth and args.vector_depth & (args.vector_depth - 1) or args.vector_depth < 0:
+        parser.error("--vector_depth must be a power of two")
 
     source_path = Path(args.source_path)
     output_path = Path(args.output_path) / (source_path.stem + "_gen")
     makedirs(output_path, mode=777, exist_ok=True)
+    used_interface_path = Path(f"./generation_tools/hdl/interfaces/{args.interface}/interface_{args.interface}.v")
+    design_digest = compute_design_digest(source_path, used_interface_path, args)
+    stamp = design_digest.hexdigest()
+    if not args.no_cache and is_up_to_date(output_path, source_path, stamp):
+        print(f"{output_path} is up to date, nothing to generate (use --no_cache to regenerate)")
+        return
+    build_id = None if args.no_build_id else compute_build_id(design_digest)
+    cache_dir = None if args.no_cache else Path(args.cache_dir)
+    port_groups = [group.split(",") for group in args.port_groups]
+    vector_engine = None
+    misr = None
+    if args.misr_ports is not None:
+        misr = {"ports": args.misr_ports, "clock": args.misr_clock}
+    if args.vector_depth:
+        vector_engine = {"depth": args.vector_depth, "clock": args.vector_clock, "inputs": args.vector_inputs, "outputs": args.vector_outputs}
+    if args.access_profile is not None:
+        port_groups += load_port_groups(Path(args.access_profile))
     port_encoder = PortEncoder()
-    port_encoder.parse_to_file(source_path, args.clock_signals, output_path, args.interface.lower(), args.inout_enables, args.inout_active)
+    port_encoder.parse_to_file(source_path, args.clock_signals, output_path, args.interface.lower(), args.inout_enables, args.inout_active, build_id, args.clock_counter_width, args.burst, port_groups, args.snapshot, args.change_detection, args.wait_unit, vector_engine, misr, args.step_group, args.free_running, cache_dir)
     code_generator = VerilogGenerator()
     config_path = output_path / (source_path.stem + "_config.json")
     code_generator.create_top_module(args.interface, source_path, config_path, output_path)
-    used_interface_path = Path(f"./generation_tools/hdl/interfaces/{args.interface}/interface_{args.interface}.v")
     copy(used_interface_path, output_path)
     pulsegen_path = Path("./generation_tools/hdl/pulsegen_with_counter.v")
     copy(pulsegen_path, output_path)
+    if args.wait_unit:
+        copy(Path("./generation_tools/hdl/wait_unit.v"), output_path)
+    if args.vector_depth:
+        copy(Path("./generation_tools/hdl/vector_sequencer.v"), output_path)
+    if args.free_running is not None:
+        copy(Path("./generation_tools/hdl/clock_divider.v"), output_path)
+    if args.misr_ports is not None:
+        copy(Path("./generation_tools/hdl/misr.v"), output_path)
     if args.inout_enables:
         inout_writer_path = Path("./generation_tools/hdl/inout_writer.v")
         copy(inout_writer_path, output_path)
+    (output_path / GENERATION_STAMP_FILE_NAME).write_text(stamp)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
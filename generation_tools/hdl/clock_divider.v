@@ -0,0 +1,46 @@
+// module running a DUT clock continuously at MAIN_CLK / (DIVIDER + 1) and counting its cycles
+
+module clock_divider #(
+    parameter DIVIDER_WIDTH = 32,
+    parameter CYCLES_WIDTH = 48
+) (
+    input MAIN_CLK,
+    input RUN,
+    input HALT,
+    input [DIVIDER_WIDTH - 1:0] DIVIDER,
+    output CLK,
+    output reg [CYCLES_WIDTH - 1:0] CYCLES = 0
+);
+
+reg [DIVIDER_WIDTH - 1:0] phase = 0;
+reg divided = 1'b0;
+reg running = 1'b0;
+wire active = RUN && !HALT;
+wire [DIVIDER_WIDTH - 1:0] next_phase = (phase >= DIVIDER) ? 0 : phase + 1;
+
+always @(posedge MAIN_CLK)
+begin
+    running <= RUN;
+    if (RUN && !running) begin
+        // the cycle count restarts with every start
+        phase <= 0;
+        divided <= 1'b0;
+        CYCLES <= 0;
+    end
+    else if (active) begin
+        phase <= next_phase;
+        // high for the first half of every period, a new cycle starts at phase 0
+        divided <= next_phase < ((DIVIDER + 1) >> 1);
+        if (next_phase == 0) begin
+            CYCLES <= CYCLES + 1;
+        end
+    end
+    else begin
+        divided <= 1'b0;
+    end
+end
+
+// without division, MAIN_CLK itself is gated, as cnt_pulsegen does
+assign CLK = (DIVIDER == 0) ? (active && running ? MAIN_CLK : 1'b0) : divided;
+
+endmodule
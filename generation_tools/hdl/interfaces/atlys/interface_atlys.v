@@ -9,9 +9,14 @@ module epp (
     input nWRITE,
     output WAIT,
     output reg [7:0] ADDR,
-    output reg [7:0] DATA_RX
+    output reg [7:0] DATA_RX,
+    output reg WR_STB,
+    output reg RD_STB
 );
 
+// when set, ADDR[7] selects auto-increment of ADDR[6:0] after every data cycle
+parameter AUTO_INC = 0;
+
 parameter idle = 2'b00;
 parameter read = 2'b01;
 parameter write = 2'b10;
@@ -19,24 +24,43 @@ parameter write = 2'b10;
 reg [7:0] data_bus;
 reg [1:0] state;
 reg [1:0] next_state;
+reg data_write;
+reg data_read;
 
 initial 
 begin
     state <= 2'b00;
     next_state <= 2'b00;
+    data_write <= 1'b0;
+    data_read <= 1'b0;
+    WR_STB <= 1'b0;
+    RD_STB <= 1'b0;
 end
 
 always @(posedge CLK)
 begin
     state = next_state;
+    // strobes last one CLK cycle after a data cycle completes
+    WR_STB <= 1'b0;
+    RD_STB <= 1'b0;
+    if (AUTO_INC && ADDR[7] && (WR_STB || RD_STB)) begin
+        ADDR[6:0] <= ADDR[6:0] + 1;
+    end
     case(state)
         idle:
             begin
                 data_bus <= 8'hxx;
+                WR_STB <= data_write;
+                RD_STB <= data_read;
+                data_write <= 1'b0;
+                data_read <= 1'b0;
             end
         read:
             begin
                 data_bus <= DATA_TX;
+                if (!nDSTB) begin
+                    data_read <= 1'b1;
+                end
             end
         write:
             begin
@@ -45,6 +69,7 @@ begin
                 end
                 else if (!nDSTB) begin
                     DATA_RX <= DB;
+                    data_write <= 1'b1;
                 end
             end
 		  default: begin
@@ -1,6 +1,8 @@
 FPGA_INTERFACES = ["atlys"]
 # After adding a new interface, its main CLK name is required in here:
 INTERFACE_CLK_SIGNAL_NAMES = ["CLK"]
+# ... and its frequency in Hz
+INTERFACE_CLK_FREQUENCIES = [100000000]
 
 DATA_WIDTH = 8
 INPUT_KEYWORD = "input"
@@ -10,4 +12,11 @@ INPUT_MUX_NAME = "inputs"
 OUTPUT_MUX_NAME = "outputs"
 DATA_OUTPUT_PORT_NAME = "DATA_TX"
 DATA_INPUT_PORT_NAME = "DATA_RX"
-ADDRESS_PORT_NAME = "ADDR"
\ No newline at end of file
+ADDRESS_PORT_NAME = "ADDR"
+WRITE_STROBE_PORT_NAME = "WR_STB"
+READ_STROBE_PORT_NAME = "RD_STB"
+# ports of interface module connected inside the generated top module
+INTERNAL_INTERFACE_PORT_NAMES = [ADDRESS_PORT_NAME, DATA_INPUT_PORT_NAME, DATA_OUTPUT_PORT_NAME, WRITE_STROBE_PORT_NAME, READ_STROBE_PORT_NAME]
+# burst mode: ADDR MSB requests auto-increment of the remaining address bits
+AUTO_INCREMENT_PARAMETER = "AUTO_INC"
+AUTO_INCREMENT_ADDRESS_WIDTH = 7
@@ -0,0 +1,39 @@
+// module compacting DUT outputs into a signature, a multiple-input signature register (MISR)
+
+module misr #(
+    parameter DATA_WIDTH = 8,
+    parameter WIDTH = 32,
+    parameter POLYNOMIAL = 32'h04c11db7,
+    parameter SEED = 32'hffffffff
+) (
+    input CLK,
+    input RESET,
+    input [DATA_WIDTH - 1:0] DATA,
+    output reg [WIDTH - 1:0] SIGNATURE = SEED
+);
+
+// data wider than the signature is folded by XOR-ing its WIDTH-bit chunks
+localparam CHUNKS = (DATA_WIDTH + WIDTH - 1) / WIDTH;
+wire [CHUNKS * WIDTH - 1:0] data_padded = DATA;
+reg [WIDTH - 1:0] folded;
+integer i;
+
+always @(*)
+begin
+    folded = 0;
+    for (i = 0; i < CHUNKS; i = i + 1) begin
+        folded = folded ^ data_padded[i * WIDTH +: WIDTH];
+    end
+end
+
+always @(posedge CLK or posedge RESET)
+begin
+    if (RESET) begin
+        SIGNATURE <= SEED;
+    end
+    else begin
+        SIGNATURE <= {SIGNATURE[WIDTH - 2:0], 1'b0} ^ (SIGNATURE[WIDTH - 1] ? POLYNOMIAL : 0) ^ folded;
+    end
+end
+
+endmodule
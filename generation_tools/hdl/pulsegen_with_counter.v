@@ -1,24 +1,29 @@
 // module for generating N pulses to CLK
 
-module cnt_pulsegen (
+module cnt_pulsegen #(
+    parameter CNT_WIDTH = 8
+) (
     input MAIN_CLK,
-    input [7:0] CNT,
+    input [CNT_WIDTH - 1:0] CNT,
     input TRG,
-    output CLK
+    input HALT,
+    output CLK,
+    output BUSY
 );
 
-reg [8:0] cnt;
+reg [CNT_WIDTH:0] cnt;
 
 always @(posedge MAIN_CLK)
 begin
     if (TRG) begin
         cnt <= CNT + 1;
     end
-    else if (cnt > 0) begin
+    else if (cnt > 0 && !HALT) begin
         cnt <= cnt - 1;
     end 
 end
 
-assign CLK = TRG ? 1'b0 : ((cnt > 0) ? MAIN_CLK : 1'b0);
+assign CLK = (TRG || HALT) ? 1'b0 : ((cnt > 0) ? MAIN_CLK : 1'b0);
+assign BUSY = TRG || (cnt > 0);
 
-endmodule
\ No newline at end of file
+endmodule
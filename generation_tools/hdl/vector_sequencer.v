@@ -0,0 +1,136 @@
+// module applying stimulus vectors from block RAM at fabric speed and capturing the responses
+
+module vector_sequencer #(
+    parameter ADDR_WIDTH = 10,
+    parameter IN_BYTES = 1,
+    parameter OUT_BYTES = 1,
+    parameter CYCLES_WIDTH = 16
+) (
+    input MAIN_CLK,
+    input RESET,
+    input START,
+    input STIM_WR,
+    input [7:0] DATA_IN,
+    input RESP_RD,
+    output [7:0] DATA_OUT,
+    input [ADDR_WIDTH:0] COUNT,
+    input [CYCLES_WIDTH - 1:0] CYCLES,
+    input [8 * OUT_BYTES - 1:0] RESPONSE,
+    output reg [8 * IN_BYTES - 1:0] STIMULUS,
+    output ACTIVE,
+    output CLK_EN,
+    output [7:0] STATUS
+);
+
+localparam [7:0] LAST_IN_BYTE = IN_BYTES - 1;
+localparam [7:0] LAST_OUT_BYTE = OUT_BYTES - 1;
+localparam IDLE = 3'd0, LOAD = 3'd1, APPLY = 3'd2, SETUP = 3'd3, CLOCK = 3'd4, SETTLE = 3'd5, CAPTURE = 3'd6;
+
+reg [8 * IN_BYTES - 1:0] stim_mem [0:(1 << ADDR_WIDTH) - 1];
+reg [8 * OUT_BYTES - 1:0] resp_mem [0:(1 << ADDR_WIDTH) - 1];
+
+// host writes: bytes are shifted into a word, least significant byte first
+reg [8 * IN_BYTES - 1:0] stim_word;
+wire [8 * IN_BYTES - 1:0] data_in_word = DATA_IN;
+wire [8 * IN_BYTES - 1:0] stim_next = (stim_word >> 8) | (data_in_word << (8 * (IN_BYTES - 1)));
+reg [ADDR_WIDTH:0] stim_ptr;
+reg [7:0] stim_byte;
+
+always @(posedge MAIN_CLK)
+begin
+    if (RESET) begin
+        stim_ptr <= 0;
+        stim_byte <= 0;
+    end
+    else if (STIM_WR) begin
+        stim_word <= stim_next;
+        if (stim_byte == LAST_IN_BYTE) begin
+            stim_mem[stim_ptr[ADDR_WIDTH - 1:0]] <= stim_next;
+            stim_ptr <= stim_ptr + 1;
+            stim_byte <= 0;
+        end
+        else begin
+            stim_byte <= stim_byte + 1;
+        end
+    end
+end
+
+// host reads: every read of the data register advances to the next response byte
+reg [8 * OUT_BYTES - 1:0] resp_word;
+reg [ADDR_WIDTH:0] resp_ptr;
+reg [7:0] resp_byte;
+wire [8 * OUT_BYTES - 1:0] resp_shifted = resp_word >> (8 * resp_byte);
+
+always @(posedge MAIN_CLK)
+begin
+    resp_word <= resp_mem[resp_ptr[ADDR_WIDTH - 1:0]];
+    if (RESET) begin
+        resp_ptr <= 0;
+        resp_byte <= 0;
+    end
+    else if (RESP_RD) begin
+        if (resp_byte == LAST_OUT_BYTE) begin
+            resp_ptr <= resp_ptr + 1;
+            resp_byte <= 0;
+        end
+        else begin
+            resp_byte <= resp_byte + 1;
+        end
+    end
+end
+
+assign DATA_OUT = resp_shifted[7:0];
+
+// sequencer: the stimulus is stable for a cycle before the first clock edge
+// and the response is captured a cycle after the last one
+reg [2:0] state;
+reg [ADDR_WIDTH:0] index;
+reg [CYCLES_WIDTH - 1:0] cycles_left;
+reg [8 * IN_BYTES - 1:0] stim_read;
+reg done;
+
+always @(posedge MAIN_CLK)
+begin
+    stim_read <= stim_mem[index[ADDR_WIDTH - 1:0]];
+    case (state)
+        IDLE: begin
+            if (START) begin
+                index <= 0;
+                done <= COUNT == 0;
+                state <= (COUNT == 0) ? IDLE : LOAD;
+            end
+        end
+        LOAD: state <= APPLY;
+        APPLY: begin
+            STIMULUS <= stim_read;
+            cycles_left <= CYCLES;
+            state <= SETUP;
+        end
+        SETUP: state <= (cycles_left == 0) ? SETTLE : CLOCK;
+        CLOCK: begin
+            cycles_left <= cycles_left - 1;
+            if (cycles_left == 1) begin
+                state <= SETTLE;
+            end
+        end
+        SETTLE: state <= CAPTURE;
+        CAPTURE: begin
+            resp_mem[index[ADDR_WIDTH - 1:0]] <= RESPONSE;
+            index <= index + 1;
+            if (index + 1 == COUNT) begin
+                done <= 1'b1;
+                state <= IDLE;
+            end
+            else begin
+                state <= LOAD;
+            end
+        end
+        default: state <= IDLE;
+    endcase
+end
+
+assign CLK_EN = state == CLOCK;
+assign ACTIVE = state != IDLE;
+assign STATUS = {6'b0, done, ACTIVE};
+
+endmodule
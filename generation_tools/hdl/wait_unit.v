@@ -0,0 +1,55 @@
+// module comparing a DUT output with a masked value, halting clock generators on a match
+
+module wait_unit #(
+    parameter DATA_WIDTH = 32,
+    parameter TIMEOUT_WIDTH = 32
+) (
+    input MAIN_CLK,
+    input ARM,
+    input RELEASE,
+    input [DATA_WIDTH - 1:0] DATA,
+    input [DATA_WIDTH - 1:0] MASK,
+    input [DATA_WIDTH - 1:0] VALUE,
+    input [TIMEOUT_WIDTH - 1:0] TIMEOUT,
+    output HALT,
+    output [7:0] STATUS
+);
+
+reg waiting, hit, timed_out;
+reg [TIMEOUT_WIDTH - 1:0] cycles;
+wire match = (DATA & MASK) == (VALUE & MASK);
+
+always @(posedge MAIN_CLK)
+begin
+    if (ARM) begin
+        waiting <= 1'b1;
+        hit <= 1'b0;
+        timed_out <= 1'b0;
+        cycles <= TIMEOUT;
+    end
+    else if (RELEASE) begin
+        waiting <= 1'b0;
+        hit <= 1'b0;
+    end
+    else if (waiting) begin
+        if (match) begin
+            waiting <= 1'b0;
+            hit <= 1'b1;
+        end
+        else if (TIMEOUT != 0) begin
+            if (cycles <= 1) begin
+                waiting <= 1'b0;
+                timed_out <= 1'b1;
+            end
+            else begin
+                cycles <= cycles - 1;
+            end
+        end
+    end
+end
+
+// the match halts the clocks in the cycle it appears, before the next edge
+assign HALT = hit || (waiting && match);
+assign STATUS = {5'b0, timed_out, hit, waiting};
+
+endmodule
@@ -1,17 +1,11 @@
 import json
-import re
 from math import ceil
 from pathlib import Path
 from typing import List
 
 import generation_tools.hdl.interfaces.interface_defs as defs
-
-PARAMETER_KEYWORD = "parameter"
-REG_KEYWORD = "reg"
-FUNCTION_KEYWORD = "function"
-ENDFUNCTION_KEYWORD = "endfunction"
-TASK_KEYWORD = "task"
-ENDTASK_KEYWORD = "endtask"
+from generation_tools.verilog_parser import parse_module
+from port_tools import port_defs
 
 class PortEncoder(json.JSONEncoder):
     def __init__(self):
@@ -22,78 +16,272 @@ class PortEncoder(json.JSONEncoder):
         self.verilog_params = {}
         self.clk_port_names = List[str]
         self.inout_params = []
+        self.register_counts = {}
+        self.clock_counter_width = defs.DATA_WIDTH
+        self.port_groups = []
+        # the last register of every bank is reserved for the bank select register
+        self.bank_size = 1 << defs.DATA_WIDTH
 
-    def parse(self, file_path: Path, clock_ports: List[str], fpga_interface: str=None):
-        self.clk_port_names = clock_ports
-        skip_line = False
+    def parse(self, file_path: Path, clock_ports: List[str], fpga_interface: str=None, cache_dir: Path = None):
+        """
+        Reads the ports of the first module of file_path, see
+        verilog_parser.parse_module() for cache_dir
+        """
+        self.clk_port_names = clock_ports or []
 
         if fpga_interface is not None:
             self.json_body["fpga_interface"] = fpga_interface
 
-        with open(file_path, "rt") as file:
-            for line in file:
-                keywords = line.split()
-                if keywords and "//" not in keywords[0]:
-                    if skip_line and not any(keyword in keywords for keyword in [ENDFUNCTION_KEYWORD, ENDTASK_KEYWORD]):
-                        continue
-                    else:
-                        skip_line = False
-                        
-                    if PARAMETER_KEYWORD == keywords[0]:
-                        param_value = re.findall(r"([0-9]+)[;,]*", " ".join(keywords))
-                        self.verilog_params[keywords[1]] = int(param_value[0])
-                    elif any(keyword in keywords for keyword in [FUNCTION_KEYWORD, TASK_KEYWORD]):
-                        skip_line = True
-                        continue
-                    elif defs.INPUT_KEYWORD in keywords[0] or defs.OUTPUT_KEYWORD in keywords[0] or defs.INOUT_KEYWORD in keywords[0]:
-                        self._parse_port_definition(keywords)
-        
+        module = parse_module(file_path, cache_dir)
+        self.verilog_params = module.parameters
+        for port in module.ports:
+            self._add_parsed_port(port)
+
+        self._allocate_port_addresses()
         self.json_body["ports"] = self.port_list
     
-    def parse_to_file(self, file_path: Path, clock_ports: List[str], output_path: Path, fpga_interface: str=None, inout_enables: List[str] = [], inout_active: List[str] = []):
+    def parse_to_file(self, file_path: Path, clock_ports: List[str], output_path: Path, fpga_interface: str=None, inout_enables: List[str] = [], inout_active: List[str] = [], build_id: int = None, clock_counter_width: int = defs.DATA_WIDTH, auto_increment: bool = False, port_groups: List[List[str]] = [], snapshot: bool = False, change_detection: bool = False, wait_unit: bool = False, vector_engine: dict = None, misr: dict = None, step_group: List[str] = None, free_running: List[str] = None, cache_dir: Path = None):
+        self.add_inout_params(inout_enables, inout_active)
+        self.clock_counter_width = clock_counter_width
+        if auto_increment:
+            self.json_body[port_defs.AUTO_INCREMENT_KEY] = True
+            self.bank_size = 1 << defs.AUTO_INCREMENT_ADDRESS_WIDTH
+        self.port_groups = port_groups
+        self.parse(file_path, clock_ports, fpga_interface, cache_dir)
+        self.add_clock_status()
+        self._add_units(fpga_interface, step_group, free_running, snapshot, change_detection, wait_unit, vector_engine, misr)
+        if build_id is not None:
+            self.add_build_id(build_id)
+        self.add_bank_select()
+        config_file_name = file_path.stem + "_config.json"
+        with open(output_path / config_file_name, "wt") as file:
+            file.write(json.dumps(self.json_body, indent=4))
+
+    def _add_units(self, fpga_interface, step_group, free_running, snapshot, change_detection, wait_unit, vector_engine, misr):
+        if step_group is not None:
+            self.add_step_group(step_group)
+        if free_running is not None:
+            self.add_free_running(free_running, fpga_interface)
+        if snapshot:
+            self.add_snapshot()
+        if change_detection:
+            self.add_change_detection()
+        if wait_unit:
+            self.add_wait_unit()
+        if vector_engine is not None:
+            self.add_vector_engine(**vector_engine)
+        if misr is not None:
+            self.add_misr(**misr)
+
+    def add_inout_params(self, inout_enables: List[str], inout_active: List[str]):
         if inout_enables:
             if len(inout_enables) != len(inout_active):
                 print("PortEncoder::parse_to_file(): Number of inout_enables does not match inout_active\n")
             for i in range(len(inout_enables)):
                 self.inout_params.append((inout_enables[i], inout_active[i]))
-        self.parse(file_path, clock_ports, fpga_interface)
-        config_file_name = file_path.stem + "_config.json"
-        with open(output_path / config_file_name, "wt") as file:
-            file.write(json.dumps(self.json_body, indent=4))
+
+    def add_clock_status(self):
+        """
+        Reserves output registers with one "busy" bit per clock generator,
+        set while the generator still has pulses to emit
+        """
+        clock_ports = [port for port in self.port_list if port["clock_port"]]
+        for i, port in enumerate(clock_ports):
+            if i % defs.DATA_WIDTH == 0:
+                status_address = self._allocate_output_addresses(1)[0]
+            port[port_defs.BUSY_ADDRESS_KEY] = status_address
+            port[port_defs.BUSY_BIT_KEY] = i % defs.DATA_WIDTH
+
+    def add_step_group(self, clocks: List[str] = None):
+        """
+        Reserves the shared count registers of a step group followed by its
+        select registers, one bit per clock generator in the listed order (all
+        clocks by default). Writing the last select register fires every
+        selected generator in the same cycle.
+        """
+        clock_names = [port["name"] for port in self.port_list if port["clock_port"]]
+        clocks = clock_names if not clocks else clocks
+        for name in clocks:
+            if name not in clock_names:
+                print(f"PortEncoder::add_step_group(): {name} is not a clock port, ignoring it")
+        clocks = [name for name in clocks if name in clock_names]
+        if not clocks:
+            print("PortEncoder::add_step_group(): No clock ports to group, step group will not be generated")
+            return
+
+        self.json_body[port_defs.STEP_GROUP_KEY] = {
+            port_defs.STEP_GROUP_CLOCKS_KEY: clocks,
+            port_defs.STEP_GROUP_COUNT_ADDRESS_KEY: self._allocate_input_addresses(ceil(self.clock_counter_width / defs.DATA_WIDTH)),
+            port_defs.ADDRESS_KEY: self._allocate_input_addresses(ceil(len(clocks) / defs.DATA_WIDTH)),
+        }
+
+    def add_free_running(self, clocks: List[str] = None, fpga_interface: str = None):
+        """
+        Reserves the registers of a free-running divider for every listed clock
+        (all clocks by default): divider, run control and the cycle count
+        latched one cycle after every write to the run register
+        """
+        clock_ports = {port["name"]: port for port in self.port_list if port["clock_port"]}
+        clocks = list(clock_ports) if not clocks else clocks
+        if fpga_interface not in defs.FPGA_INTERFACES:
+            print(f"PortEncoder::add_free_running(): Main clock frequency of {fpga_interface} interface is unknown, free-running clocks will not be generated")
+            return
+        self.json_body[port_defs.MAIN_CLOCK_HZ_KEY] = defs.INTERFACE_CLK_FREQUENCIES[defs.FPGA_INTERFACES.index(fpga_interface)]
+        for name in clocks:
+            if name not in clock_ports:
+                print(f"PortEncoder::add_free_running(): {name} is not a clock port, ignoring it")
+                continue
+            port = clock_ports[name]
+            port[port_defs.DIVIDER_ADDRESS_KEY] = self._allocate_input_addresses(port_defs.DIVIDER_SIZE)
+            port[port_defs.RUN_ADDRESS_KEY] = self._allocate_input_addresses(1)
+            port[port_defs.CYCLE_COUNT_ADDRESS_KEY] = self._allocate_output_addresses(port_defs.CYCLE_COUNT_SIZE)
+
+    def add_snapshot(self):
+        """
+        Reserves a copy of every DUT-driven output register, latched at once
+        by writing the snapshot control register, so that all outputs are
+        read coherently with one burst over consecutive addresses
+        """
+        self.json_body[port_defs.SNAPSHOT_KEY] = {
+            port_defs.ADDRESS_KEY: self._allocate_input_addresses(1),
+        }
+        for port in self.port_list:
+            if not port["clock_port"] and port["direction"] in [defs.OUTPUT_KEYWORD, defs.INOUT_KEYWORD]:
+                port[port_defs.SNAPSHOT_ADDRESS_KEY] = self._allocate_output_addresses(len(port["address"]))
+
+    def add_change_detection(self):
+        """
+        Reserves the change bitmap with one bit per DUT-driven output register,
+        in the order listed under "registers", and its control register
+        """
+        registers = [address for port in self.port_list if not port["clock_port"] and port["direction"] in [defs.OUTPUT_KEYWORD, defs.INOUT_KEYWORD] for address in port["address"]]
+        self.json_body[port_defs.CHANGE_DETECTION_KEY] = {
+            port_defs.ADDRESS_KEY: self._allocate_input_addresses(1),
+            port_defs.CHANGE_BITMAP_ADDRESS_KEY: self._allocate_output_addresses(ceil(len(registers) / defs.DATA_WIDTH)),
+            port_defs.CHANGE_REGISTERS_KEY: registers,
+        }
+
+    def add_wait_unit(self):
+        """
+        Reserves the wait unit registers: select (output address of the
+        compared port), mask, value and timeout are consecutive and followed
+        by the control register, so arming takes a single block write
+        """
+        self.json_body[port_defs.WAIT_UNIT_KEY] = {
+            port_defs.WAIT_SELECT_ADDRESS_KEY: self._allocate_input_addresses(1),
+            port_defs.WAIT_MASK_ADDRESS_KEY: self._allocate_input_addresses(port_defs.WAIT_DATA_SIZE),
+            port_defs.WAIT_VALUE_ADDRESS_KEY: self._allocate_input_addresses(port_defs.WAIT_DATA_SIZE),
+            port_defs.WAIT_TIMEOUT_ADDRESS_KEY: self._allocate_input_addresses(port_defs.WAIT_TIMEOUT_SIZE),
+            port_defs.ADDRESS_KEY: self._allocate_input_addresses(1),
+            port_defs.WAIT_STATUS_ADDRESS_KEY: self._allocate_output_addresses(1),
+        }
+
+    def add_vector_engine(self, depth: int, clock: str = None, inputs: List[str] = None, outputs: List[str] = None):
+        """
+        Reserves the registers of the on-chip vector engine. Stimulus words
+        hold the registers of the vector input ports and response words
+        those of the observed output ports, in the listed order. Both block
+        RAMs are accessed through a single data register each.
+        """
+        clock_names = [port["name"] for port in self.port_list if port["clock_port"]]
+        if clock is None and clock_names:
+            clock = clock_names[0]
+        if clock not in clock_names:
+            print(f"PortEncoder::add_vector_engine(): {clock} is not a clock port, vector engine will not be generated")
+            return
+        input_names = [port["name"] for port in self.port_list if not port["clock_port"] and port["direction"] == defs.INPUT_KEYWORD]
+        output_names = [port["name"] for port in self.port_list if not port["clock_port"] and port["direction"] != defs.INPUT_KEYWORD]
+        inputs = input_names if inputs is None else inputs
+        outputs = output_names if outputs is None else outputs
+        for name in [name for name in inputs if name not in input_names] + [name for name in outputs if name not in output_names]:
+            print(f"PortEncoder::add_vector_engine(): {name} is not a DUT input or output port, ignoring it")
+        inputs = [name for name in inputs if name in input_names]
+        outputs = [name for name in outputs if name in output_names]
+        if not inputs or not outputs:
+            print("PortEncoder::add_vector_engine(): Vector engine needs at least one input and one output port, it will not be generated")
+            return
+
+        self.json_body[port_defs.VECTOR_ENGINE_KEY] = {
+            port_defs.VECTOR_DEPTH_KEY: depth,
+            port_defs.VECTOR_CLOCK_KEY: clock,
+            port_defs.VECTOR_INPUTS_KEY: inputs,
+            port_defs.VECTOR_OUTPUTS_KEY: outputs,
+            port_defs.VECTOR_CYCLES_ADDRESS_KEY: self._allocate_input_addresses(port_defs.VECTOR_CYCLES_SIZE),
+            # vector counts go up to depth included
+            port_defs.VECTOR_COUNT_ADDRESS_KEY: self._allocate_input_addresses(ceil(depth.bit_length() / defs.DATA_WIDTH)),
+            port_defs.ADDRESS_KEY: self._allocate_input_addresses(1),
+            port_defs.VECTOR_STIMULUS_ADDRESS_KEY: self._allocate_input_addresses(1),
+            port_defs.VECTOR_RESPONSE_ADDRESS_KEY: self._allocate_output_addresses(1),
+            port_defs.VECTOR_STATUS_ADDRESS_KEY: self._allocate_output_addresses(1),
+        }
+
+    def add_misr(self, ports: List[str] = None, clock: str = None):
+        """
+        Reserves the signature registers of a MISR compacting the registers of
+        the listed output ports (all of them by default) on every edge of clock,
+        and its reset register
+        """
+        clock_names = [port["name"] for port in self.port_list if port["clock_port"]]
+        if clock is None and clock_names:
+            clock = clock_names[0]
+        if clock not in clock_names:
+            print(f"PortEncoder::add_misr(): {clock} is not a clock port, MISR will not be generated")
+            return
+        output_names = [port["name"] for port in self.port_list if not port["clock_port"] and port["direction"] != defs.INPUT_KEYWORD]
+        ports = output_names if not ports else ports
+        for name in ports:
+            if name not in output_names:
+                print(f"PortEncoder::add_misr(): {name} is not a DUT output port, ignoring it")
+        ports = [name for name in ports if name in output_names]
+        if not ports:
+            print("PortEncoder::add_misr(): No output ports to compact, MISR will not be generated")
+            return
+
+        self.json_body[port_defs.MISR_KEY] = {
+            port_defs.MISR_CLOCK_KEY: clock,
+            port_defs.MISR_PORTS_KEY: ports,
+            port_defs.MISR_POLYNOMIAL_KEY: f"{port_defs.MISR_POLYNOMIAL:08x}",
+            port_defs.MISR_SEED_KEY: f"{port_defs.MISR_SEED:08x}",
+            port_defs.ADDRESS_KEY: self._allocate_input_addresses(1),
+            port_defs.MISR_SIGNATURE_ADDRESS_KEY: self._allocate_output_addresses(port_defs.MISR_WIDTH // defs.DATA_WIDTH),
+        }
+
+    def add_bank_select(self):
+        """
+        Records the bank select register and the bank of every port once the
+        register map overflows the first bank. Addresses stay linear, bank
+        times bank size plus the address within the bank.
+        """
+        if max(self.next_input_address, self.next_output_address) < self.bank_size:
+            return
+        bank_count = ceil(max(self.next_input_address, self.next_output_address) / self.bank_size)
+        if bank_count > 1 << port_defs.BANK_SELECT_WIDTH:
+            print(f"PortEncoder::add_bank_select(): Register map needs {bank_count} banks, only {1 << port_defs.BANK_SELECT_WIDTH} can be selected")
+        self.json_body[port_defs.BANK_SELECT_KEY] = {
+            port_defs.ADDRESS_KEY: [f"{self.bank_size - 1:x}"],
+        }
+        for port in self.port_list:
+            port[port_defs.BANK_KEY] = int(port["address"][0], 16) // self.bank_size
+
+    def add_build_id(self, build_id: int):
+        """
+        Reserves output registers holding a constant ID of the generated design,
+        read back by the host to tell whether the FPGA already runs this build
+        """
+        self.json_body[port_defs.BUILD_ID_KEY] = {
+            port_defs.BUILD_ID_VALUE_KEY: f"{build_id:0{2 * port_defs.BUILD_ID_SIZE}x}",
+            port_defs.ADDRESS_KEY: self._allocate_output_addresses(port_defs.BUILD_ID_SIZE),
+        }
 
     def get_encoded_port_list(self):
         return self.port_list
 
-    def _extract_signal_names(self, params: List[str]) -> List[str]:
-        s = " ".join(params)
-        names = re.findall(r"([^;, ]+)", s)
-        return names
-
-    def _parse_port_definition(self, params: List[str]):
-        # remove potential 'reg' keyword that may be present at outputs
-        if REG_KEYWORD in params:
-            params.pop(params.index(REG_KEYWORD))
-        # if defined port is a vector, extract its width
-        if '[' and ']' in params[1]:
-            vector_range = "".join(char for char in params[1] if char not in '[]').split(':')
-            msb = self.verilog_params[vector_range[0]] if vector_range[0] in self.verilog_params else int(vector_range[0])
-            lsb = self.verilog_params[vector_range[1]] if vector_range[1] in self.verilog_params else int(vector_range[1])
-            bit_width = msb - lsb + 1
-            names = self._extract_signal_names(params[2:])
-        else:
-            bit_width = 1
-            names = self._extract_signal_names(params[1:])
-        
-        for name in names:
-            is_clock_port = True if name in self.clk_port_names else False
-            if self.inout_params and params[0] == defs.INOUT_KEYWORD:
-                enable_signal = self.inout_params[0][0]
-                enable_signal_active = self.inout_params[0][1] 
-                self.inout_params.pop(0)
-            else:
-                enable_signal = None
-                enable_signal_active = None
-            self._create_port(name=name, is_clock_port=is_clock_port, bit_width=bit_width, direction=params[0], enable_signal=enable_signal, enable_signal_active=enable_signal_active)
+    def _add_parsed_port(self, port):
+        enable_signal = None
+        enable_signal_active = None
+        if self.inout_params and port.direction == defs.INOUT_KEYWORD:
+            enable_signal, enable_signal_active = self.inout_params.pop(0)
+        self._create_port(name=port.name, is_clock_port=port.name in self.clk_port_names, bit_width=port.bit_width, direction=port.direction, enable_signal=enable_signal, enable_signal_active=enable_signal_active)
 
     def _create_port(self, **kwargs):
         bit_width = kwargs.get("bit_width", 1)
@@ -106,15 +294,108 @@ class PortEncoder(json.JSONEncoder):
         if direction == defs.INOUT_KEYWORD:
             port["enable_signal"] = kwargs.get("enable_signal")
             port["enable_signal_active"] = kwargs.get("enable_signal_active")
-        port["address"] = []
-        for i in range(ceil(bit_width / defs.DATA_WIDTH)):
-            if direction == defs.OUTPUT_KEYWORD:
-                next_address = self.next_output_address
-                self.next_output_address += 1
+        register_count = ceil(bit_width / defs.DATA_WIDTH)
+        if port["clock_port"]:
+            # clock generator counter, triggered by writing its last register
+            port[port_defs.COUNTER_WIDTH_KEY] = self.clock_counter_width
+            register_count = ceil(self.clock_counter_width / defs.DATA_WIDTH)
+        # addresses are allocated once all ports are known, see _allocate_port_addresses()
+        self.register_counts[port["name"]] = register_count
+
+        self.port_list.append(port)
+
+    def _allocate_port_addresses(self):
+        """
+        Allocates registers in declaration order or, with port groups, places
+        the ports of each group next to each other so that they are covered
+        by one block transfer. Groups and the remaining ports then start at
+        a multiple of their widest port's register count rounded up to a
+        power of two; ports inside a group are packed without gaps.
+        """
+        ports_by_name = {port["name"]: port for port in self.port_list}
+        ordered_ports = []
+        groups = []
+        for group in self.port_groups:
+            known_names = [name for name in group if name in ports_by_name and ports_by_name[name] not in ordered_ports]
+            for name in group:
+                if name not in ports_by_name:
+                    print(f"PortEncoder::_allocate_port_addresses(): Port {name} of group {' '.join(group)} is not defined, ignoring it")
+            group_ports = [ports_by_name[name] for name in known_names]
+            if group_ports:
+                groups.append([port["name"] for port in group_ports])
+                ordered_ports.extend(group_ports)
+
+        if groups:
+            self.json_body[port_defs.PORT_GROUPS_KEY] = groups
+            for group in groups:
+                group_ports = [ports_by_name[name] for name in group]
+                # widest ports first, so the aligned start also aligns power-of-two sized ports after it
+                self._allocate_group([port for port in group_ports if port["direction"] != defs.OUTPUT_KEYWORD], self._allocate_input_addresses)
+                self._allocate_group([port for port in group_ports if port["direction"] == defs.OUTPUT_KEYWORD], self._allocate_output_addresses)
+
+        for port in self.port_list:
+            if port in ordered_ports:
+                continue
+            allocate = self._allocate_output_addresses if port["direction"] == defs.OUTPUT_KEYWORD else self._allocate_input_addresses
+            if groups:
+                self._allocate_group([port], allocate)
             else:
-                next_address = self.next_input_address
-                self.next_input_address += 1
+                port["address"] = allocate(self.register_counts[port["name"]])
+
+    def _allocate_group(self, group_ports, allocate):
+        if not group_ports:
+            return
+        group_ports = sorted(group_ports, key=lambda port: self.register_counts[port["name"]], reverse=True)
+        alignment = 1 << (self.register_counts[group_ports[0]["name"]] - 1).bit_length()
+        next_address = self.next_output_address if allocate == self._allocate_output_addresses else self.next_input_address
+        padding = -next_address % alignment
+        if padding:
+            allocate(padding)
+        for port in group_ports:
+            port["address"] = allocate(self.register_counts[port["name"]])
+
+    def _allocate_input_addresses(self, count: int) -> List[str]:
+        addresses, self.next_input_address = self._allocate_addresses(self.next_input_address, count)
+        return addresses
+
+    def _allocate_output_addresses(self, count: int) -> List[str]:
+        addresses, self.next_output_address = self._allocate_addresses(self.next_output_address, count)
+        return addresses
+
+    def _allocate_addresses(self, next_address: int, count: int):
+        """
+        Returns count addresses from next_address on, skipping the bank select
+        register at the end of every bank, and the next free address. Ports
+        fitting into one bank do not straddle two, so that they are accessed
+        without switching banks.
+        """
+        bank_top = self.bank_size - 1
+        if next_address % self.bank_size + count > bank_top and count <= bank_top:
+            next_address += -next_address % self.bank_size
+        addresses = []
+        while len(addresses) < count:
+            if next_address % self.bank_size != bank_top:
+                addresses.append(f"{next_address:x}")
+            next_address += 1
+        return addresses, next_address
+
+
+def load_port_groups(access_profile_path: Path) -> List[List[str]]:
+    """
+    Derives port groups from an access profile recorded by the host: the most
+    frequent transfers claim their ports first, ports already placed in a group
+    are not moved to a later one
+    """
+    with open(access_profile_path) as file:
+        transfers = json.load(file)[port_defs.ACCESS_PROFILE_TRANSFERS_KEY]
 
-            port["address"].append(f"{next_address:x}")
+    transfers = sorted(transfers, key=lambda transfer: (transfer[port_defs.ACCESS_PROFILE_COUNT_KEY], len(transfer[port_defs.ACCESS_PROFILE_PORTS_KEY])), reverse=True)
+    grouped_names = set()
+    groups = []
+    for transfer in transfers:
+        group = [name for name in transfer[port_defs.ACCESS_PROFILE_PORTS_KEY] if name not in grouped_names]
+        if len(group) > 1:
+            groups.append(group)
+            grouped_names.update(group)
 
-        self.port_list.append(port)
\ No newline at end of file
+    return groups
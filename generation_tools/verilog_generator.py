@@ -1,14 +1,27 @@
 import json
-import re
 
 from pathlib import Path
 import generation_tools.hdl.interfaces.interface_defs as defs
+from port_tools import port_defs
 from port_tools.port_manager import PortManager
 from port_tools.port import ClockPort
 from generation_tools.port_encoder import PortEncoder
+from generation_tools.verilog_parser import MODULE_KEYWORD, VerilogTokenizer
 
 TOP_TEMPLATE_PATH = Path("./generation_tools/hdl/top_template.txt")
 CNT_PULSE_GEN_MODULE_NAME = "cnt_pulsegen"
+SNAPSHOT_BANK_NAME = "OUTPUT_SNAPSHOT"
+CHANGE_DETECTOR_PREFIX = "CHANGE"
+WAIT_UNIT_MODULE_NAME = "wait_unit"
+WAIT_UNIT_PREFIX = "WAIT"
+VECTOR_SEQUENCER_MODULE_NAME = "vector_sequencer"
+VECTOR_ENGINE_PREFIX = "VEC"
+MISR_MODULE_NAME = "misr"
+MISR_PREFIX = "MISR"
+STEP_GROUP_PREFIX = "STEP"
+CLOCK_DIVIDER_MODULE_NAME = "clock_divider"
+BANK_SELECT_NAME = "BANK"
+BANK_ADDRESS_NAME = "BANK_ADDR"
 
 class VerilogGenerator():
     def create_top_module(self, interface_schema: str, verilog_module_path: Path, json_path: Path, output_path: Path):
@@ -23,28 +36,48 @@ class VerilogGenerator():
             raw_json = json.load(file)
             self.dut_port_manager = PortManager(raw_json)
 
+        auto_increment = raw_json.get(port_defs.AUTO_INCREMENT_KEY, False)
+        for interface_port in self.interface_port_list:
+            if interface_port['clock_port']:
+                top_clk_port_name = interface_port['name']
+                break
+        bank_select = raw_json.get(port_defs.BANK_SELECT_KEY)
+        bank_select_definition = self._set_address_select(auto_increment, bank_select, top_clk_port_name)
+
+        wait_unit = raw_json.get(port_defs.WAIT_UNIT_KEY)
+        # clock generators pause while the wait unit holds its halt signal
+        self.halt_signal = f"{WAIT_UNIT_PREFIX}_HALT" if wait_unit is not None else "1'b0"
+
+        vector_engine = raw_json.get(port_defs.VECTOR_ENGINE_KEY)
+        self.vector_clock = vector_engine[port_defs.VECTOR_CLOCK_KEY] if vector_engine is not None else None
+        self.vector_inputs = self._get_vector_stimulus_ranges(vector_engine) if vector_engine is not None else {}
+
+        step_group = raw_json.get(port_defs.STEP_GROUP_KEY)
+        # bit of the step group select register firing each grouped clock generator
+        self.step_group_bits = {name: i for i, name in enumerate(step_group[port_defs.STEP_GROUP_CLOCKS_KEY])} if step_group is not None else {}
+
         top_module_name = self._get_module_name(verilog_module_path)
         dut_ports = self.dut_port_manager.get_port_list()
         port_declarations = self._get_port_declarations(self.interface_port_list)
         interface_module_name = self._get_module_name(target_interface_path)
         interface_connections = self._get_port_connections(self.interface_port_list)
-        dut_input_count = 0
-        dut_output_count = 0
+        input_top_address = 0
+        output_top_address = 0
         clk_generators = []
         inout_port_enables = {}
         for port in dut_ports:
+            # mux sizes follow the highest register address, as wide ports span several registers
             if isinstance(port, ClockPort):
-                for interface_port in self.interface_port_list:
-                    if interface_port['clock_port']:
-                        top_clk_port_name = interface_port['name']
-                        break
                 clk_generators.append(self._create_clk_generator(port, top_clk_port_name))
-                dut_input_count += 1
+                input_top_address = max(input_top_address, *port.address, *port.divider_address)
+                output_top_address = max([output_top_address, *port.cycle_count_address])
             elif defs.INPUT_KEYWORD == port.direction:
-                dut_input_count += 1
+                input_top_address = max(input_top_address, *port.address)
             elif defs.OUTPUT_KEYWORD == port.direction:
-                dut_output_count += 1
+                output_top_address = max(output_top_address, *port.address)
             elif defs.INOUT_KEYWORD == port.direction:
+                input_top_address = max(input_top_address, *port.address)
+                output_top_address = max(output_top_address, *port.address)
                 inout_port_enables[port.enable_signal] = port.name
 
         if inout_port_enables:
@@ -55,6 +88,72 @@ class VerilogGenerator():
 
         dut_connections, support_wires = self._create_dut_connections(dut_ports)
 
+        clk_ports = [port for port in dut_ports if isinstance(port, ClockPort)]
+        clk_generators.append(self._create_clk_status_registers(clk_ports))
+        for clk_port in clk_ports:
+            if clk_port.busy_address is not None:
+                output_top_address = max(output_top_address, clk_port.busy_address)
+
+        build_id = raw_json.get(port_defs.BUILD_ID_KEY)
+        if build_id is not None:
+            build_id_address = [int(address, 16) for address in build_id[port_defs.ADDRESS_KEY]]
+            support_wires.append(self._create_build_id_register(int(build_id[port_defs.BUILD_ID_VALUE_KEY], 16), build_id_address))
+            output_top_address = max(output_top_address, *build_id_address)
+
+        snapshot = raw_json.get(port_defs.SNAPSHOT_KEY)
+        if snapshot is not None:
+            snapshot_address = int(snapshot[port_defs.ADDRESS_KEY][0], 16)
+            snapshot_ports = [port for port in dut_ports if not isinstance(port, ClockPort) and port.snapshot_address]
+            support_wires.append(self._create_snapshot_bank(snapshot_ports, snapshot_address, top_clk_port_name))
+            input_top_address = max(input_top_address, snapshot_address)
+            for port in snapshot_ports:
+                output_top_address = max(output_top_address, *port.snapshot_address)
+
+        change_detection = raw_json.get(port_defs.CHANGE_DETECTION_KEY)
+        if change_detection is not None:
+            control_address = int(change_detection[port_defs.ADDRESS_KEY][0], 16)
+            bitmap_address = [int(address, 16) for address in change_detection[port_defs.CHANGE_BITMAP_ADDRESS_KEY]]
+            registers = [int(address, 16) for address in change_detection[port_defs.CHANGE_REGISTERS_KEY]]
+            if registers:
+                support_wires.append(self._create_change_detector(registers, bitmap_address, control_address, top_clk_port_name))
+                input_top_address = max(input_top_address, control_address)
+                output_top_address = max(output_top_address, *bitmap_address)
+
+        if step_group is not None:
+            step_addresses = {key: [int(address, 16) for address in step_group[key]] for key in [port_defs.ADDRESS_KEY, port_defs.STEP_GROUP_COUNT_ADDRESS_KEY]}
+            # declared ahead of the clock generators it triggers
+            clk_generators.insert(0, self._create_step_group(step_addresses, top_clk_port_name))
+            input_top_address = max(input_top_address, *step_addresses[port_defs.ADDRESS_KEY], *step_addresses[port_defs.STEP_GROUP_COUNT_ADDRESS_KEY])
+
+        if wait_unit is not None:
+            wait_addresses = {key: [int(address, 16) for address in addresses] for key, addresses in wait_unit.items()}
+            # declared ahead of the clock generators connected to its halt signal
+            clk_generators.insert(0, self._create_wait_unit(wait_addresses, dut_ports, top_clk_port_name))
+            input_top_address = max(input_top_address, *wait_addresses[port_defs.ADDRESS_KEY])
+            output_top_address = max(output_top_address, *wait_addresses[port_defs.WAIT_STATUS_ADDRESS_KEY])
+
+        if vector_engine is not None:
+            vector_addresses = {key: [int(address, 16) for address in vector_engine[key]] for key in vector_engine if key.endswith(port_defs.ADDRESS_KEY)}
+            # declared ahead of the clock generator it drives and the DUT inputs it overrides
+            clk_generators.insert(0, self._create_vector_engine(vector_engine, vector_addresses, top_clk_port_name))
+            input_top_address = max(input_top_address, *vector_addresses[port_defs.VECTOR_STIMULUS_ADDRESS_KEY], *vector_addresses[port_defs.ADDRESS_KEY])
+            output_top_address = max(output_top_address, *vector_addresses[port_defs.VECTOR_RESPONSE_ADDRESS_KEY], *vector_addresses[port_defs.VECTOR_STATUS_ADDRESS_KEY])
+
+        misr = raw_json.get(port_defs.MISR_KEY)
+        if misr is not None:
+            reset_address = int(misr[port_defs.ADDRESS_KEY][0], 16)
+            signature_address = [int(address, 16) for address in misr[port_defs.MISR_SIGNATURE_ADDRESS_KEY]]
+            support_wires.append(self._create_misr(misr, reset_address, signature_address, top_clk_port_name))
+            input_top_address = max(input_top_address, reset_address)
+            output_top_address = max(output_top_address, *signature_address)
+
+        if max(input_top_address, output_top_address) >= 1 << self.address_width:
+            print(f"VerilogGenerator(): Only {1 << self.address_width} registers per direction can be addressed, the register map does not fit")
+        # declared ahead of everything comparing the banked address
+        clk_generators.insert(0, bank_select_definition)
+        if auto_increment:
+            interface_module_name += f" #(.{defs.AUTO_INCREMENT_PARAMETER}(1))"
+
         with open(TOP_TEMPLATE_PATH) as template:
             template_str = template.read()
 
@@ -64,24 +163,27 @@ class VerilogGenerator():
             "".join(port_declarations),
             defs.DATA_WIDTH - 1,
             " ".join([defs.DATA_INPUT_PORT_NAME + ",", defs.DATA_OUTPUT_PORT_NAME + ",", defs.ADDRESS_PORT_NAME]),
+            ", ".join([defs.WRITE_STROBE_PORT_NAME, defs.READ_STROBE_PORT_NAME]),
             defs.DATA_WIDTH - 1,
             defs.INPUT_MUX_NAME,
-            dut_input_count,
+            input_top_address,
             defs.DATA_WIDTH - 1,
             defs.OUTPUT_MUX_NAME,
-            dut_output_count,
+            output_top_address,
             interface_module_name,
             "".join(interface_connections),
             "".join(clk_generators),
             "".join(support_wires),
             top_module_name,
             dut_connections,
+            top_clk_port_name,
+            defs.WRITE_STROBE_PORT_NAME,
             defs.INPUT_MUX_NAME,
-            defs.ADDRESS_PORT_NAME,
+            self.address_select,
             defs.DATA_INPUT_PORT_NAME,
             defs.DATA_OUTPUT_PORT_NAME,
             defs.OUTPUT_MUX_NAME,
-            defs.ADDRESS_PORT_NAME
+            self.address_select
         )
 
         output_file_name = "".join(["top_", verilog_module_path.stem, ".v"])
@@ -89,6 +191,32 @@ class VerilogGenerator():
             file.write(template_str)
 
     
+    def _set_address_select(self, auto_increment, bank_select, top_clk_port_name):
+        if auto_increment:
+            # the MSB of ADDR is the auto-increment flag, registers are selected by the remaining bits
+            self.address_width = defs.AUTO_INCREMENT_ADDRESS_WIDTH
+            self.address_select = f"{defs.ADDRESS_PORT_NAME}[{self.address_width - 1}:0]"
+        else:
+            self.address_width = defs.DATA_WIDTH
+            self.address_select = defs.ADDRESS_PORT_NAME
+        if bank_select is None:
+            return ""
+
+        # registers are selected by the bank select register followed by the address within the bank
+        select_address = int(bank_select[port_defs.ADDRESS_KEY][0], 16)
+        address_width = self.address_width + port_defs.BANK_SELECT_WIDTH
+        bank_definition = f"// Bank select, writing register {select_address:x} of any bank selects the bank of all other registers\n"
+        bank_definition += f"reg [{port_defs.BANK_SELECT_WIDTH - 1}:0] {BANK_SELECT_NAME} = 0;\n"
+        bank_definition += f"wire [{address_width - 1}:0] {BANK_ADDRESS_NAME} = {{{BANK_SELECT_NAME}, {self.address_select}}};\n"
+        bank_definition += f"always @(posedge {top_clk_port_name})\n"
+        bank_definition += f"    if ({defs.WRITE_STROBE_PORT_NAME} && {self.address_select} == {self.address_width}'h{select_address:x})\n"
+        bank_definition += f"        {BANK_SELECT_NAME} <= {defs.DATA_INPUT_PORT_NAME};\n"
+        self.address_width = address_width
+        self.address_select = BANK_ADDRESS_NAME
+
+        return bank_definition
+
+
     def _get_interface_port_list(self, interface_path):
         interface_port_encoder = PortEncoder()
         interface_port_encoder.parse(interface_path, defs.INTERFACE_CLK_SIGNAL_NAMES, interface_path.parent.name)
@@ -109,7 +237,7 @@ class VerilogGenerator():
         port_declarations = []
         for port in port_list:
             size_str = ""
-            if port['name'] not in [defs.ADDRESS_PORT_NAME, defs.DATA_INPUT_PORT_NAME, defs.DATA_OUTPUT_PORT_NAME]:
+            if port['name'] not in defs.INTERNAL_INTERFACE_PORT_NAMES:
                 if port['bit_width'] > 1:
                     size_str = "".join(['[', str(port['bit_width'] - 1), ':', '0', ']', ' '])
 
@@ -121,29 +249,278 @@ class VerilogGenerator():
 
 
     def _get_module_name(self, file_path: Path):
-        module_name = None
         with open(file_path, "rt") as file:
-            for line in file:
-                match = re.findall(r"^\s*module ([a-zA-Z0-9_-]+)", line)
-                if match:
-                    module_name = match[0]
-                    break
+            tokens = iter(VerilogTokenizer(file))
+            for token in tokens:
+                if token == MODULE_KEYWORD:
+                    return next(tokens, None)
 
-        return module_name
+        return None
     
 
     def _create_clk_generator(self, clk_port, top_clk_port_name):
         trg_wire_name = "_".join([clk_port.name, "GEN", "TRG"])
+        # counter spans all clock registers, writing the last one triggers the generator
+        counter = ", ".join(f"{defs.INPUT_MUX_NAME}[{address}]" for address in reversed(clk_port.address))
+        generator_clock = f"{clk_port.name}_WIRE"
+        other_clocks = []
+        if clk_port.name == self.vector_clock:
+            # the vector sequencer clocks the DUT as well, during its runs
+            other_clocks.append(f"({VECTOR_ENGINE_PREFIX}_CLK_EN ? {top_clk_port_name} : 1'b0)")
+        if clk_port.run_address is not None:
+            other_clocks.append(f"{clk_port.name}_FREE_CLK")
         generator_definition = ""
-        generator_definition += f"wire {trg_wire_name}, {clk_port.name}_WIRE;\n"
-        generator_definition += f"assign {trg_wire_name} = {defs.ADDRESS_PORT_NAME} == {defs.DATA_WIDTH}'h{clk_port.address[0]};\n"
-        generator_definition += f"{CNT_PULSE_GEN_MODULE_NAME} {clk_port.name}_GEN (\n"
-        generator_definition += f"\t.MAIN_CLK({top_clk_port_name}),\n\t.CNT({defs.INPUT_MUX_NAME}[{clk_port.address[0]}]),\n"
-        generator_definition += f"\t.TRG({trg_wire_name}),\n\t.CLK({clk_port.name}_WIRE)\n"
+        if clk_port.run_address is not None:
+            generator_definition += self._create_clock_divider(clk_port, top_clk_port_name)
+        generator_definition += f"wire {trg_wire_name}, {clk_port.name}_WIRE, {clk_port.name}_BUSY;\n"
+        if other_clocks:
+            generator_clock = f"{clk_port.name}_GEN_CLK"
+            generator_definition += f"wire {generator_clock};\n"
+            generator_definition += f"assign {clk_port.name}_WIRE = {' | '.join([generator_clock] + other_clocks)};\n"
+        # delayed by one cycle, so that the generator loads the counter registers just written
+        generator_definition += f"reg {clk_port.name}_GEN_WR;\n"
+        generator_definition += f"always @(posedge {top_clk_port_name})\n"
+        generator_definition += f"    {clk_port.name}_GEN_WR <= {defs.WRITE_STROBE_PORT_NAME} && {self.address_select} == {self.address_width}'h{clk_port.address[-1]:x};\n"
+        trigger = f"{clk_port.name}_GEN_WR"
+        counter = f"{{{counter}}}"
+        if clk_port.name in self.step_group_bits:
+            # the step group loads its shared count into every selected generator at once
+            step_trigger = f"{STEP_GROUP_PREFIX}_TRG && {STEP_GROUP_PREFIX}_SELECT[{self.step_group_bits[clk_port.name]}]"
+            trigger = f"{trigger} || ({step_trigger})"
+            counter = f"{STEP_GROUP_PREFIX}_TRG ? {STEP_GROUP_PREFIX}_COUNT : {counter}"
+        generator_definition += f"assign {trg_wire_name} = {trigger};\n"
+        generator_definition += f"{CNT_PULSE_GEN_MODULE_NAME} #(\n\t.CNT_WIDTH({defs.DATA_WIDTH * len(clk_port.address)})\n) {clk_port.name}_GEN (\n"
+        generator_definition += f"\t.MAIN_CLK({top_clk_port_name}),\n\t.CNT({counter}),\n"
+        generator_definition += f"\t.TRG({trg_wire_name}),\n\t.HALT({self.halt_signal}),\n\t.CLK({generator_clock}),\n\t.BUSY({clk_port.name}_BUSY)\n"
         generator_definition += ");\n"
 
         return generator_definition
-    
+
+
+    def _create_clock_divider(self, clk_port, top_clk_port_name):
+        prefix = clk_port.name
+        cycles_width = defs.DATA_WIDTH * len(clk_port.cycle_count_address)
+        divider = ", ".join(f"{defs.INPUT_MUX_NAME}[{address}]" for address in reversed(clk_port.divider_address))
+        cycle_count = ", ".join(f"{defs.OUTPUT_MUX_NAME}[{address}]" for address in reversed(clk_port.cycle_count_address))
+        divider_definition = f"// {clk_port.name} free-running while bit 0 of register {clk_port.run_address:x} is set, cycle count latched by writing it\n"
+        divider_definition += f"wire {prefix}_FREE_CLK;\n"
+        divider_definition += f"wire [{cycles_width - 1}:0] {prefix}_CYCLES;\n"
+        divider_definition += f"reg [{cycles_width - 1}:0] {prefix}_CYCLES_LATCHED;\n"
+        divider_definition += f"reg {prefix}_CYCLES_LATCH;\n"
+        # latched one cycle after the write, once the divider has seen the new run bit
+        divider_definition += f"always @(posedge {top_clk_port_name}) begin\n"
+        divider_definition += f"    {prefix}_CYCLES_LATCH <= {defs.WRITE_STROBE_PORT_NAME} && {self.address_select} == {self.address_width}'h{clk_port.run_address:x};\n"
+        divider_definition += f"    if ({prefix}_CYCLES_LATCH)\n        {prefix}_CYCLES_LATCHED <= {prefix}_CYCLES;\nend\n"
+        divider_definition += f"{CLOCK_DIVIDER_MODULE_NAME} #(\n\t.DIVIDER_WIDTH({defs.DATA_WIDTH * len(clk_port.divider_address)}),\n\t.CYCLES_WIDTH({cycles_width})\n) {prefix}_DIV (\n"
+        divider_definition += f"\t.MAIN_CLK({top_clk_port_name}),\n\t.RUN({defs.INPUT_MUX_NAME}[{clk_port.run_address}][0]),\n\t.HALT({self.halt_signal}),\n"
+        divider_definition += f"\t.DIVIDER({{{divider}}}),\n\t.CLK({prefix}_FREE_CLK),\n\t.CYCLES({prefix}_CYCLES)\n);\n"
+        divider_definition += f"assign {{{cycle_count}}} = {prefix}_CYCLES_LATCHED;\n"
+
+        return divider_definition
+
+
+    def _create_step_group(self, step_addresses, top_clk_port_name):
+        prefix = STEP_GROUP_PREFIX
+        select_address = step_addresses[port_defs.ADDRESS_KEY]
+        count_address = step_addresses[port_defs.STEP_GROUP_COUNT_ADDRESS_KEY]
+        select = ", ".join(f"{defs.INPUT_MUX_NAME}[{address}]" for address in reversed(select_address))
+        count = ", ".join(f"{defs.INPUT_MUX_NAME}[{address}]" for address in reversed(count_address))
+        step_definition = f"// Step group, writing register {select_address[-1]:x} fires the selected clock generators\n"
+        step_definition += f"wire [{defs.DATA_WIDTH * len(select_address) - 1}:0] {prefix}_SELECT = {{{select}}};\n"
+        step_definition += f"wire [{defs.DATA_WIDTH * len(count_address) - 1}:0] {prefix}_COUNT = {{{count}}};\n"
+        # delayed by one cycle, so that the generators load the register values just written
+        step_definition += f"reg {prefix}_TRG;\n"
+        step_definition += f"always @(posedge {top_clk_port_name})\n"
+        step_definition += f"    {prefix}_TRG <= {defs.WRITE_STROBE_PORT_NAME} && {self.address_select} == {self.address_width}'h{select_address[-1]:x};\n"
+
+        return step_definition
+
+
+    def _create_clk_status_registers(self, clk_ports):
+        status_bits = {}
+        for clk_port in clk_ports:
+            if clk_port.busy_address is not None:
+                status_bits.setdefault(clk_port.busy_address, {})[clk_port.busy_bit] = f"{clk_port.name}_BUSY"
+
+        status_definition = ""
+        for address, bits in status_bits.items():
+            register_bits = ", ".join(bits.get(bit, "1'b0") for bit in reversed(range(defs.DATA_WIDTH)))
+            status_definition += f"assign {defs.OUTPUT_MUX_NAME}[{address}] = {{{register_bits}}};\n"
+
+        return status_definition
+
+
+    def _create_snapshot_bank(self, snapshot_ports, snapshot_address, top_clk_port_name):
+        register_pairs = [(address, snapshot) for port in snapshot_ports for address, snapshot in zip(port.address, port.snapshot_address)]
+        snapshot_definition = f"// Output snapshot, latched by writing register {snapshot_address:x}\n"
+        snapshot_definition += f"reg [{defs.DATA_WIDTH - 1}:0] {SNAPSHOT_BANK_NAME} [{len(register_pairs) - 1}:0];\n"
+        snapshot_definition += f"always @(posedge {top_clk_port_name})\n"
+        snapshot_definition += f"    if ({defs.WRITE_STROBE_PORT_NAME} && {self.address_select} == {self.address_width}'h{snapshot_address:x}) begin\n"
+        for i, (address, _) in enumerate(register_pairs):
+            snapshot_definition += f"        {SNAPSHOT_BANK_NAME}[{i}] <= {defs.OUTPUT_MUX_NAME}[{address}];\n"
+        snapshot_definition += "    end\n"
+        for i, (_, snapshot) in enumerate(register_pairs):
+            snapshot_definition += f"assign {defs.OUTPUT_MUX_NAME}[{snapshot}] = {SNAPSHOT_BANK_NAME}[{i}];\n"
+
+        return snapshot_definition
+
+
+    def _create_change_detector(self, registers, bitmap_address, control_address, top_clk_port_name):
+        prefix = CHANGE_DETECTOR_PREFIX
+        bitmap_width = defs.DATA_WIDTH * len(bitmap_address)
+        change_definition = f"// Change detection, bitmap latched and cleared by writing register {control_address:x}\n"
+        change_definition += f"reg [{defs.DATA_WIDTH - 1}:0] {prefix}_PREV [{len(registers) - 1}:0];\n"
+        change_definition += f"reg [{bitmap_width - 1}:0] {prefix}_STICKY, {prefix}_LATCHED;\n"
+        change_definition += f"wire [{bitmap_width - 1}:0] {prefix}_NEW;\n"
+        for i, address in enumerate(registers):
+            change_definition += f"assign {prefix}_NEW[{i}] = |({defs.OUTPUT_MUX_NAME}[{address}] ^ {prefix}_PREV[{i}]);\n"
+        if len(registers) < bitmap_width:
+            change_definition += f"assign {prefix}_NEW[{bitmap_width - 1}:{len(registers)}] = 0;\n"
+        change_definition += f"always @(posedge {top_clk_port_name})\nbegin\n"
+        for i, address in enumerate(registers):
+            change_definition += f"    {prefix}_PREV[{i}] <= {defs.OUTPUT_MUX_NAME}[{address}];\n"
+        change_definition += f"    if ({defs.WRITE_STROBE_PORT_NAME} && {self.address_select} == {self.address_width}'h{control_address:x}) begin\n"
+        change_definition += f"        {prefix}_LATCHED <= {prefix}_STICKY | {prefix}_NEW;\n"
+        change_definition += f"        {prefix}_STICKY <= 0;\n"
+        change_definition += "    end else begin\n"
+        change_definition += f"        {prefix}_STICKY <= {prefix}_STICKY | {prefix}_NEW;\n"
+        change_definition += "    end\nend\n"
+        for i, address in enumerate(bitmap_address):
+            change_definition += f"assign {defs.OUTPUT_MUX_NAME}[{address}] = {prefix}_LATCHED[{defs.DATA_WIDTH * (i + 1) - 1}:{defs.DATA_WIDTH * i}];\n"
+
+        return change_definition
+
+
+    def _create_wait_unit(self, wait_addresses, dut_ports, top_clk_port_name):
+        prefix = WAIT_UNIT_PREFIX
+        data_width = defs.DATA_WIDTH * port_defs.WAIT_DATA_SIZE
+        control_address = wait_addresses[port_defs.ADDRESS_KEY][0]
+        select_register = f"{defs.INPUT_MUX_NAME}[{wait_addresses[port_defs.WAIT_SELECT_ADDRESS_KEY][0]}]"
+        control_write = f"{defs.WRITE_STROBE_PORT_NAME} && {self.address_select} == {self.address_width}'h{control_address:x}"
+
+        def concatenate(mux_name, addresses):
+            return "{" + ", ".join(f"{mux_name}[{address}]" for address in reversed(addresses)) + "}"
+
+        wait_definition = f"// Wait unit, armed by writing {port_defs.WAIT_ARM} and released by writing {port_defs.WAIT_RELEASE} to register {control_address:x}\n"
+        wait_definition += f"reg [{data_width - 1}:0] {prefix}_DATA;\n"
+        wait_definition += f"wire {prefix}_HALT;\n"
+        wait_definition += f"always @(*)\n    case ({select_register})\n"
+        selectable_addresses = []
+        for port in dut_ports:
+            # compared ports are selected by the output address of their lowest register
+            if not isinstance(port, ClockPort) and port.direction != defs.INPUT_KEYWORD and port.address[0] not in selectable_addresses:
+                if port.address[0] >= 1 << defs.DATA_WIDTH:
+                    print(f"VerilogGenerator(): Port {port.name} is not in the first register bank, the wait unit can't select it")
+                    continue
+                selectable_addresses.append(port.address[0])
+                data_registers = port.address[:port_defs.WAIT_DATA_SIZE]
+                data = concatenate(defs.OUTPUT_MUX_NAME, data_registers)
+                padding_width = data_width - defs.DATA_WIDTH * len(data_registers)
+                if padding_width:
+                    data = f"{{{padding_width}'b0, {data[1:]}"
+                wait_definition += f"        {defs.DATA_WIDTH}'h{port.address[0]:x}: {prefix}_DATA = {data};\n"
+        wait_definition += f"        default: {prefix}_DATA = 0;\n    endcase\n"
+        wait_definition += f"{WAIT_UNIT_MODULE_NAME} #(\n\t.DATA_WIDTH({data_width}),\n\t.TIMEOUT_WIDTH({defs.DATA_WIDTH * port_defs.WAIT_TIMEOUT_SIZE})\n) {prefix}_UNIT (\n"
+        wait_definition += f"\t.MAIN_CLK({top_clk_port_name}),\n"
+        wait_definition += f"\t.ARM({control_write} && {defs.DATA_INPUT_PORT_NAME}[{port_defs.WAIT_ARM.bit_length() - 1}]),\n"
+        wait_definition += f"\t.RELEASE({control_write} && {defs.DATA_INPUT_PORT_NAME}[{port_defs.WAIT_RELEASE.bit_length() - 1}]),\n"
+        wait_definition += f"\t.DATA({prefix}_DATA),\n"
+        wait_definition += f"\t.MASK({concatenate(defs.INPUT_MUX_NAME, wait_addresses[port_defs.WAIT_MASK_ADDRESS_KEY])}),\n"
+        wait_definition += f"\t.VALUE({concatenate(defs.INPUT_MUX_NAME, wait_addresses[port_defs.WAIT_VALUE_ADDRESS_KEY])}),\n"
+        wait_definition += f"\t.TIMEOUT({concatenate(defs.INPUT_MUX_NAME, wait_addresses[port_defs.WAIT_TIMEOUT_ADDRESS_KEY])}),\n"
+        wait_definition += f"\t.HALT({prefix}_HALT),\n"
+        wait_definition += f"\t.STATUS({defs.OUTPUT_MUX_NAME}[{wait_addresses[port_defs.WAIT_STATUS_ADDRESS_KEY][0]}])\n"
+        wait_definition += ");\n"
+
+        return wait_definition
+
+
+    def _get_vector_stimulus_ranges(self, vector_engine):
+        stimulus_ranges = {}
+        offset = 0
+        for name in vector_engine[port_defs.VECTOR_INPUTS_KEY]:
+            port = self.dut_port_manager.get_port_list()[name]
+            stimulus_ranges[name] = f"{offset + port.bit_width - 1}:{offset}"
+            offset += defs.DATA_WIDTH * len(port.address)
+
+        return stimulus_ranges
+
+
+    def _create_vector_engine(self, vector_engine, vector_addresses, top_clk_port_name):
+        prefix = VECTOR_ENGINE_PREFIX
+        port_list = self.dut_port_manager.get_port_list()
+        input_bytes = sum(len(port_list[name].address) for name in vector_engine[port_defs.VECTOR_INPUTS_KEY])
+        response_registers = [address for name in vector_engine[port_defs.VECTOR_OUTPUTS_KEY] for address in port_list[name].address]
+        address_width = (vector_engine[port_defs.VECTOR_DEPTH_KEY] - 1).bit_length()
+        count_registers = vector_addresses[port_defs.VECTOR_COUNT_ADDRESS_KEY]
+        control_address = vector_addresses[port_defs.ADDRESS_KEY][0]
+        stimulus_address = vector_addresses[port_defs.VECTOR_STIMULUS_ADDRESS_KEY][0]
+        response_address = vector_addresses[port_defs.VECTOR_RESPONSE_ADDRESS_KEY][0]
+        control_write = f"{defs.WRITE_STROBE_PORT_NAME} && {self.address_select} == {self.address_width}'h{control_address:x}"
+
+        def concatenate(mux_name, addresses):
+            return "{" + ", ".join(f"{mux_name}[{address}]" for address in reversed(addresses)) + "}"
+
+        vector_definition = f"// Vector engine, writing {port_defs.VECTOR_START} to register {control_address:x} starts a run and {port_defs.VECTOR_RESET} rewinds the data registers\n"
+        vector_definition += f"wire {prefix}_ACTIVE, {prefix}_CLK_EN;\n"
+        vector_definition += f"wire [{defs.DATA_WIDTH * input_bytes - 1}:0] {prefix}_STIMULUS;\n"
+        vector_definition += f"wire [{defs.DATA_WIDTH * len(response_registers) - 1}:0] {prefix}_RESPONSE;\n"
+        vector_definition += f"wire [{defs.DATA_WIDTH * len(count_registers) - 1}:0] {prefix}_COUNT;\n"
+        vector_definition += f"assign {prefix}_RESPONSE = {concatenate(defs.OUTPUT_MUX_NAME, response_registers)};\n"
+        vector_definition += f"assign {prefix}_COUNT = {concatenate(defs.INPUT_MUX_NAME, count_registers)};\n"
+        vector_definition += f"{VECTOR_SEQUENCER_MODULE_NAME} #(\n\t.ADDR_WIDTH({address_width}),\n\t.IN_BYTES({input_bytes}),\n"
+        vector_definition += f"\t.OUT_BYTES({len(response_registers)}),\n\t.CYCLES_WIDTH({defs.DATA_WIDTH * port_defs.VECTOR_CYCLES_SIZE})\n) {prefix}_SEQUENCER (\n"
+        vector_definition += f"\t.MAIN_CLK({top_clk_port_name}),\n"
+        vector_definition += f"\t.RESET({control_write} && {defs.DATA_INPUT_PORT_NAME}[{port_defs.VECTOR_RESET.bit_length() - 1}]),\n"
+        vector_definition += f"\t.START({control_write} && {defs.DATA_INPUT_PORT_NAME}[{port_defs.VECTOR_START.bit_length() - 1}]),\n"
+        vector_definition += f"\t.STIM_WR({defs.WRITE_STROBE_PORT_NAME} && {self.address_select} == {self.address_width}'h{stimulus_address:x}),\n"
+        vector_definition += f"\t.DATA_IN({defs.DATA_INPUT_PORT_NAME}),\n"
+        vector_definition += f"\t.RESP_RD({defs.READ_STROBE_PORT_NAME} && {self.address_select} == {self.address_width}'h{response_address:x}),\n"
+        vector_definition += f"\t.DATA_OUT({defs.OUTPUT_MUX_NAME}[{response_address}]),\n"
+        vector_definition += f"\t.COUNT({prefix}_COUNT[{address_width}:0]),\n"
+        vector_definition += f"\t.CYCLES({concatenate(defs.INPUT_MUX_NAME, vector_addresses[port_defs.VECTOR_CYCLES_ADDRESS_KEY])}),\n"
+        vector_definition += f"\t.RESPONSE({prefix}_RESPONSE),\n"
+        vector_definition += f"\t.STIMULUS({prefix}_STIMULUS),\n"
+        vector_definition += f"\t.ACTIVE({prefix}_ACTIVE),\n"
+        vector_definition += f"\t.CLK_EN({prefix}_CLK_EN),\n"
+        vector_definition += f"\t.STATUS({defs.OUTPUT_MUX_NAME}[{vector_addresses[port_defs.VECTOR_STATUS_ADDRESS_KEY][0]}])\n"
+        vector_definition += ");\n"
+
+        return vector_definition
+
+
+    def _create_misr(self, misr, reset_address, signature_address, top_clk_port_name):
+        prefix = MISR_PREFIX
+        port_list = self.dut_port_manager.get_port_list()
+        data_registers = [address for name in misr[port_defs.MISR_PORTS_KEY] for address in port_list[name].address]
+        data = "{" + ", ".join(f"{defs.OUTPUT_MUX_NAME}[{address}]" for address in reversed(data_registers)) + "}"
+        signature = "{" + ", ".join(f"{defs.OUTPUT_MUX_NAME}[{address}]" for address in reversed(signature_address)) + "}"
+        misr_definition = f"// Signature register compacting outputs on {misr[port_defs.MISR_CLOCK_KEY]} edges, reset by writing register {reset_address:x}\n"
+        misr_definition += f"reg {prefix}_RESET;\n"
+        misr_definition += f"wire [{port_defs.MISR_WIDTH - 1}:0] {prefix}_SIGNATURE;\n"
+        # registered, as it resets the MISR asynchronously to its clock
+        misr_definition += f"always @(posedge {top_clk_port_name})\n"
+        misr_definition += f"    {prefix}_RESET <= {defs.WRITE_STROBE_PORT_NAME} && {self.address_select} == {self.address_width}'h{reset_address:x};\n"
+        misr_definition += f"{MISR_MODULE_NAME} #(\n\t.DATA_WIDTH({defs.DATA_WIDTH * len(data_registers)}),\n\t.WIDTH({port_defs.MISR_WIDTH}),\n"
+        misr_definition += f"\t.POLYNOMIAL({port_defs.MISR_WIDTH}'h{misr[port_defs.MISR_POLYNOMIAL_KEY]}),\n\t.SEED({port_defs.MISR_WIDTH}'h{misr[port_defs.MISR_SEED_KEY]})\n) {prefix} (\n"
+        misr_definition += f"\t.CLK({misr[port_defs.MISR_CLOCK_KEY]}_WIRE),\n"
+        misr_definition += f"\t.RESET({prefix}_RESET),\n"
+        misr_definition += f"\t.DATA({data}),\n"
+        misr_definition += f"\t.SIGNATURE({prefix}_SIGNATURE)\n"
+        misr_definition += ");\n"
+        misr_definition += f"assign {signature} = {prefix}_SIGNATURE;\n"
+
+        return misr_definition
+
+
+    def _create_build_id_register(self, build_id, address_list):
+        build_id_definition = "// Build ID\n"
+        for i, address in enumerate(address_list):
+            register_value = (build_id >> (defs.DATA_WIDTH * i)) & ((1 << defs.DATA_WIDTH) - 1)
+            build_id_definition += f"assign {defs.OUTPUT_MUX_NAME}[{address}] = {defs.DATA_WIDTH}'h{register_value:02x};\n"
+
+        return build_id_definition
+
 
     def _create_dut_connections(self, port_list):
         dut_connections = ""
@@ -178,13 +555,22 @@ class VerilogGenerator():
                     support_declarations.append(declarations)
                 else:
                     mux_name = defs.OUTPUT_MUX_NAME if port.direction == defs.OUTPUT_KEYWORD else defs.INPUT_MUX_NAME
-                    if len(port.address) > 1:
+                    if port.name in self.vector_inputs:
+                        # driven from the stimulus word while a vector run is active
+                        concatenation = "{" + ", ".join(f"{mux_name}[{address}]" for address in reversed(port.address)) + "}"
                         wire_def = f"wire [{port.bit_width - 1}:0] {port.name}_WIRE;\n"
+                        wire_def += f"assign {port.name}_WIRE = {VECTOR_ENGINE_PREFIX}_ACTIVE ? {VECTOR_ENGINE_PREFIX}_STIMULUS[{self.vector_inputs[port.name]}] : {concatenation};\n"
                         connection = f"{port.name}_WIRE"
-                        wire_def += f"assign {port.name}_WIRE = {{"
-                        for address in reversed(port.address):
-                            wire_def += f"{mux_name}[{address}]"
-                            wire_def += ", " if address != port.address[0] else "};\n"
+                        support_declarations.append(wire_def)
+                    elif len(port.address) > 1:
+                        wire_def = f"wire [{port.bit_width - 1}:0] {port.name}_WIRE;\n"
+                        connection = f"{port.name}_WIRE"
+                        concatenation = "{" + ", ".join(f"{mux_name}[{address}]" for address in reversed(port.address)) + "}"
+                        # DUT outputs drive the mux registers, host-written inputs drive the DUT
+                        if port.direction == defs.OUTPUT_KEYWORD:
+                            wire_def += f"assign {concatenation} = {port.name}_WIRE;\n"
+                        else:
+                            wire_def += f"assign {port.name}_WIRE = {concatenation};\n"
                         support_declarations.append(wire_def)
                     else:
                         connection = f"{mux_name}{port.address}"
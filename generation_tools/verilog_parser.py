@@ -0,0 +1,535 @@
+import hashlib
+import json
+import os
+import re
+from collections import namedtuple
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List
+
+import generation_tools.hdl.interfaces.interface_defs as defs
+
+# bump whenever the parse result format changes, so stale cache entries are ignored
+PARSE_CACHE_VERSION = 1
+HASH_CHUNK_SIZE = 1 << 20
+
+MODULE_KEYWORD = "module"
+ENDMODULE_KEYWORD = "endmodule"
+PARAMETER_KEYWORDS = ["parameter", "localparam"]
+DIRECTION_KEYWORDS = [defs.INPUT_KEYWORD, defs.OUTPUT_KEYWORD, defs.INOUT_KEYWORD]
+# skipped bodies, their declarations are not ports of the module
+SKIPPED_BLOCKS = {"function": "endfunction", "task": "endtask"}
+# net and variable types allowed between the direction and the range of a port
+NET_TYPES = {"wire", "reg", "logic", "tri", "tri0", "tri1", "wand", "wor", "supply0", "supply1", "uwire", "var", "bit"}
+# types of a fixed width, e.g. "output integer COUNT"
+SIZED_TYPES = {"integer": 32, "int": 32, "shortint": 16, "longint": 64, "byte": 8, "time": 64}
+SIGNING_KEYWORDS = ["signed", "unsigned"]
+PARAMETER_TYPES = {"integer", "int", "real", "realtime", "time", "logic", "bit", "reg", "signed", "unsigned"}
+# compiler directives taking the rest of their line
+LINE_DIRECTIVES = {"`timescale", "`define", "`undef", "`include", "`default_nettype", "`resetall", "`celldefine", "`endcelldefine", "`ifdef", "`ifndef", "`elsif", "`else", "`endif", "`line", "`pragma"}
+
+# skipped text matches with an empty token group, unknown characters become single tokens
+TOKEN_PATTERN = re.compile(r"""
+    \s+
+    | //.*
+    | \(\*(?!\)).*?\*\)
+    | (
+        "(?:\\.|[^"\\])*"
+        | `\w+
+        | (?:[0-9][0-9_]*\s*)?'[sS]?[bBoOdDhH]\s*[0-9a-fA-FxXzZ?_]+
+        | [0-9][0-9_]*(?:\.[0-9_]+)?(?:[eE][+-]?[0-9]+)?
+        | [a-zA-Z_][a-zA-Z0-9_$]* | \$[a-zA-Z0-9_$]+ | \\\S+
+        | <<< | >>> | === | !== | \*\* | << | >> | <= | >= | == | != | && | \|\| | \+: | -: | ~& | ~\| | ~\^ | \^~
+        | .
+    )
+""", re.VERBOSE)
+BODY_KEYWORD_PATTERN = re.compile(r"\b(?:input|output|inout|parameter|localparam|function|endfunction|task|endtask|endmodule)\b")
+
+VerilogPort = namedtuple("VerilogPort", ["name", "direction", "bit_width", "signed"])
+VerilogModule = namedtuple("VerilogModule", ["name", "parameters", "ports"])
+
+
+def is_body_line_relevant(line: str) -> bool:
+    """
+    Returns whether a line of a module body may hold a declaration, the end
+    of a skipped block or the start of a block comment continuing below
+    """
+    start = line.rfind("/*")
+    if start >= 0 and line.find("*/", start + 2) < 0:
+        return True
+    # substring tests rule out most lines before the slower word match
+    if "put" in line or "inout" in line or "param" in line or "function" in line or "task" in line or "endmodule" in line:
+        return BODY_KEYWORD_PATTERN.search(line) is not None
+    return False
+
+
+class VerilogTokenizer():
+    """
+    Splits Verilog source lines into tokens lazily, dropping whitespace,
+    comments (block comments may span lines), attributes and compiler
+    directives such as `timescale; macro uses are kept as tokens
+
+    While line_filter is set, lines for which it returns False are
+    skipped, which lets the parser scan large module bodies quickly.
+    """
+    def __init__(self, lines: Iterable[str]):
+        self.lines = lines
+        self.line_number = 0
+        self.line_filter: Callable[[str], bool] = None
+
+    def __iter__(self) -> Iterator[str]:
+        for tokens in self.token_lines():
+            yield from tokens
+
+    def token_lines(self) -> Iterator[List[str]]:
+        """
+        Yields the tokens of every line holding any
+        """
+        in_comment = False
+        for line in self.lines:
+            self.line_number += 1
+            if in_comment:
+                end = line.find("*/")
+                if end < 0:
+                    continue
+                line = line[end + 2:]
+                in_comment = False
+            elif self.line_filter is not None and not self.line_filter(line):
+                continue
+            tokens = []
+            while True:
+                start = line.find("/*")
+                if start < 0 or "//" in line[:start]:
+                    tokens += self._split(line)
+                    break
+                tokens += self._split(line[:start])
+                end = line.find("*/", start + 2)
+                if end < 0:
+                    in_comment = True
+                    break
+                line = line[end + 2:]
+            if tokens:
+                yield tokens
+
+    def _split(self, text: str) -> List[str]:
+        tokens = [token for token in TOKEN_PATTERN.findall(text) if token]
+        if "`" in text:
+            for i, token in enumerate(tokens):
+                if token in LINE_DIRECTIVES:
+                    return tokens[:i]
+        return tokens
+
+
+class _TokenStream():
+    def __init__(self, tokenizer: VerilogTokenizer, file_name: str):
+        self.tokenizer = tokenizer
+        self.file_name = file_name
+        self._lines = tokenizer.token_lines()
+        # rest of the current line, reversed to pop tokens off its end
+        self._line = []
+        self.token = None
+        self._next_line()
+
+    def advance(self) -> str:
+        token = self.token
+        if self._line:
+            self.token = self._line.pop()
+        else:
+            self._next_line()
+        return token
+
+    def _next_line(self):
+        tokens = next(self._lines, None)
+        if tokens is None:
+            self.token = None
+            return
+        tokens.reverse()
+        self.token = tokens.pop()
+        self._line = tokens
+
+    def peek(self) -> str:
+        """
+        Returns the token after the current one if it is on the same line
+        """
+        return self._line[-1] if self._line else None
+
+    def accept(self, token: str) -> bool:
+        if self.token == token:
+            self.advance()
+            return True
+        return False
+
+    def expect(self, token: str):
+        if not self.accept(token):
+            self.error(f"expected '{token}'")
+
+    def expect_name(self) -> str:
+        if self.token is None or not _is_name(self.token):
+            self.error("expected an identifier")
+        return self.advance()
+
+    def skip_to(self, *tokens: str):
+        while self.token is not None and self.token not in tokens:
+            self.advance()
+
+    def error(self, message: str):
+        found = "end of file" if self.token is None else f"'{self.token}'"
+        raise ValueError(f"{self.file_name}:{self.tokenizer.line_number}: {message}, found {found}")
+
+
+def _is_name(token: str) -> bool:
+    return token[0].isalpha() or token[0] in "_\\"
+
+
+# binding power of binary operators, ** binds right to left
+BINARY_PRECEDENCE = {
+    "**": 12,
+    "*": 11, "/": 11, "%": 11,
+    "+": 10, "-": 10,
+    "<<": 9, ">>": 9, "<<<": 9, ">>>": 9,
+    "<": 8, "<=": 8, ">": 8, ">=": 8,
+    "==": 7, "!=": 7, "===": 7, "!==": 7,
+    "&": 6, "~&": 6,
+    "^": 5, "^~": 5, "~^": 5,
+    "|": 4, "~|": 4,
+    "&&": 3,
+    "||": 2,
+}
+TERNARY_PRECEDENCE = 1
+# tokens ending a constant expression, e.g. of a range
+EXPRESSION_ENDS = {":", "]", ",", ";", ")"}
+
+
+def _divide(a: int, b: int) -> int:
+    # Verilog division truncates toward zero
+    quotient = abs(a) // abs(b)
+    return quotient if (a < 0) == (b < 0) else -quotient
+
+
+BINARY_OPERATORS = {
+    "**": lambda a, b: a ** b,
+    "*": lambda a, b: a * b,
+    "/": _divide,
+    "%": lambda a, b: a - b * _divide(a, b),
+    "+": lambda a, b: a + b,
+    "-": lambda a, b: a - b,
+    "<<": lambda a, b: a << b,
+    ">>": lambda a, b: a >> b,
+    "<<<": lambda a, b: a << b,
+    ">>>": lambda a, b: a >> b,
+    "<": lambda a, b: int(a < b),
+    "<=": lambda a, b: int(a <= b),
+    ">": lambda a, b: int(a > b),
+    ">=": lambda a, b: int(a >= b),
+    "==": lambda a, b: int(a == b),
+    "!=": lambda a, b: int(a != b),
+    "===": lambda a, b: int(a == b),
+    "!==": lambda a, b: int(a != b),
+    "&": lambda a, b: a & b,
+    "~&": lambda a, b: ~(a & b),
+    "^": lambda a, b: a ^ b,
+    "^~": lambda a, b: ~(a ^ b),
+    "~^": lambda a, b: ~(a ^ b),
+    "|": lambda a, b: a | b,
+    "~|": lambda a, b: ~(a | b),
+    "&&": lambda a, b: int(bool(a) and bool(b)),
+    "||": lambda a, b: int(bool(a) or bool(b)),
+}
+UNARY_OPERATORS = {
+    "+": lambda a: a,
+    "-": lambda a: -a,
+    "!": lambda a: int(not a),
+    "~": lambda a: ~a,
+}
+SYSTEM_FUNCTIONS = {
+    "$clog2": lambda a: (a - 1).bit_length() if a > 0 else 0,
+    "$signed": lambda a: a,
+    "$unsigned": lambda a: a,
+}
+NUMBER_BASES = {"b": 2, "o": 8, "d": 10, "h": 16}
+
+
+def parse_number(token: str) -> int:
+    """
+    Returns the value of a decimal or based (e.g. 8'hFF) Verilog literal
+    """
+    token = token.replace("_", "").replace(" ", "").replace("\t", "")
+    if "'" not in token:
+        return int(token)
+    _, value = token.split("'")
+    value = value.lstrip("sS")
+    return int(value[1:], NUMBER_BASES[value[0].lower()])
+
+
+class ExpressionEvaluator():
+    """
+    Evaluates constant integer expressions of parameters and ranges by
+    precedence climbing over a token stream
+    """
+    def __init__(self, stream: _TokenStream, parameters: Dict[str, int]):
+        self.stream = stream
+        self.parameters = parameters
+
+    def evaluate(self, min_precedence: int = TERNARY_PRECEDENCE) -> int:
+        token = self.stream.token
+        # fast path for plain numbers such as the bounds of [7:0]
+        if token is not None and token.isdigit() and self.stream.peek() in EXPRESSION_ENDS:
+            self.stream.advance()
+            return int(token)
+        value = self._evaluate_operand()
+        while True:
+            operator = self.stream.token
+            if operator == "?" and min_precedence <= TERNARY_PRECEDENCE:
+                self.stream.advance()
+                if_true = self.evaluate()
+                self.stream.expect(":")
+                if_false = self.evaluate()
+                value = if_true if value else if_false
+                continue
+            precedence = BINARY_PRECEDENCE.get(operator)
+            if precedence is None or precedence < min_precedence:
+                return value
+            self.stream.advance()
+            # ** is right associative, every other operator left associative
+            right = self.evaluate(precedence if operator == "**" else precedence + 1)
+            try:
+                value = BINARY_OPERATORS[operator](value, right)
+            except ZeroDivisionError:
+                self.stream.error("division by zero in constant expression")
+
+    def _evaluate_operand(self) -> int:
+        token = self.stream.token
+        if token is None:
+            self.stream.error("expected an expression")
+        if token in UNARY_OPERATORS:
+            self.stream.advance()
+            return UNARY_OPERATORS[token](self._evaluate_operand())
+        if token == "(":
+            self.stream.advance()
+            value = self.evaluate()
+            self.stream.expect(")")
+            return value
+        if token in SYSTEM_FUNCTIONS:
+            self.stream.advance()
+            self.stream.expect("(")
+            value = SYSTEM_FUNCTIONS[token](self.evaluate())
+            self.stream.expect(")")
+            return value
+        if token[0].isdigit() or token[0] == "'":
+            try:
+                value = parse_number(token)
+            except (KeyError, ValueError):
+                self.stream.error("unsupported number literal")
+            self.stream.advance()
+            return value
+        if token in self.parameters:
+            self.stream.advance()
+            return self.parameters[token]
+        self.stream.error("unknown parameter or unsupported constant expression")
+
+
+class VerilogParser():
+    """
+    Extracts the parameters and ports of the first module of a Verilog file
+
+    Both ANSI headers (directions in the port list, e.g. input wire signed
+    [WIDTH-1:0] A) and non-ANSI ones (directions declared in the module
+    body) are supported. The file is tokenized while it is read; with an
+    ANSI header, reading stops at the end of the header, so large netlists
+    are not scanned past their top module header.
+    """
+    def parse(self, file_path: Path) -> VerilogModule:
+        with open(file_path, "rt") as file:
+            self.stream = _TokenStream(VerilogTokenizer(file), str(file_path))
+            self.parameters = {}
+            self.evaluator = ExpressionEvaluator(self.stream, self.parameters)
+            self.stream.skip_to(MODULE_KEYWORD)
+            if self.stream.token is None:
+                raise ValueError(f"{file_path}: no module found")
+            self.stream.advance()
+            name = self.stream.expect_name()
+            if self.stream.accept("#"):
+                self._parse_parameter_ports()
+            ports, header_names = self._parse_port_list()
+            if ports is None:
+                ports = self._parse_body_declarations(header_names)
+        return VerilogModule(name, dict(self.parameters), ports)
+
+    def _parse_parameter_ports(self):
+        self.stream.expect("(")
+        if self.stream.accept(")"):
+            return
+        while True:
+            if self.stream.token in PARAMETER_KEYWORDS:
+                self.stream.advance()
+            self._parse_parameter_assignment()
+            if self.stream.accept(")"):
+                return
+            self.stream.expect(",")
+
+    def _parse_parameter_assignment(self):
+        while self.stream.token in PARAMETER_TYPES:
+            self.stream.advance()
+        while self.stream.token == "[":
+            self._parse_range()
+        name = self.stream.expect_name()
+        self.stream.expect("=")
+        self.parameters[name] = self.evaluator.evaluate()
+
+    def _parse_parameter_declaration(self):
+        self._parse_parameter_assignment()
+        while self.stream.accept(","):
+            name = self.stream.expect_name()
+            self.stream.expect("=")
+            self.parameters[name] = self.evaluator.evaluate()
+        self.stream.expect(";")
+
+    def _parse_range(self) -> int:
+        """
+        Returns the number of bits of a [msb:lsb] range
+        """
+        self.stream.expect("[")
+        msb = self.evaluator.evaluate()
+        if self.stream.accept("+:") or self.stream.accept("-:"):
+            width = self.evaluator.evaluate()
+        else:
+            self.stream.expect(":")
+            width = abs(msb - self.evaluator.evaluate()) + 1
+        self.stream.expect("]")
+        return width
+
+    def _parse_data_type(self):
+        """
+        Returns bit width and signedness of the type following a direction
+        """
+        bit_width = 1
+        signed = False
+        while self.stream.token in NET_TYPES:
+            self.stream.advance()
+        if self.stream.token in SIZED_TYPES:
+            bit_width = SIZED_TYPES[self.stream.advance()]
+            signed = True
+        if self.stream.token in SIGNING_KEYWORDS:
+            signed = self.stream.advance() == SIGNING_KEYWORDS[0]
+        if self.stream.token == "[":
+            bit_width = 1
+            while self.stream.token == "[":
+                bit_width *= self._parse_range()
+        return bit_width, signed
+
+    def _skip_declarator_tail(self):
+        # unpacked dimensions and default values do not change the port width
+        while self.stream.token == "[":
+            self.stream.skip_to("]")
+            self.stream.advance()
+        if self.stream.accept("="):
+            self._skip_expression()
+
+    def _skip_expression(self):
+        depth = 0
+        while self.stream.token is not None:
+            if depth == 0 and self.stream.token in [",", ";", ")"]:
+                return
+            if self.stream.token in ["(", "[", "{"]:
+                depth += 1
+            elif self.stream.token in [")", "]", "}"]:
+                depth -= 1
+            self.stream.advance()
+
+    def _parse_port_list(self):
+        """
+        Returns the ports of an ANSI header (None for a non-ANSI one) and the
+        port names of a non-ANSI header in declaration order
+        """
+        header_names = []
+        ports = []
+        if self.stream.accept("("):
+            port_type = None
+            while not self.stream.accept(")"):
+                if self.stream.token in DIRECTION_KEYWORDS:
+                    direction = self.stream.advance()
+                    port_type = (direction, *self._parse_data_type())
+                name = self.stream.expect_name()
+                if port_type is None:
+                    header_names.append(name)
+                else:
+                    # ports without a direction share the declaration of the previous one
+                    ports.append(VerilogPort(name, *port_type))
+                    self._skip_declarator_tail()
+                if self.stream.token != ")":
+                    self.stream.expect(",")
+        self.stream.expect(";")
+        if header_names and ports:
+            self.stream.error("mixed ANSI and non-ANSI port declarations")
+        return (None, header_names) if header_names else (ports, header_names)
+
+    def _parse_port_declaration(self, direction: str, declared: Dict[str, VerilogPort]):
+        port_type = (direction, *self._parse_data_type())
+        while True:
+            name = self.stream.expect_name()
+            declared[name] = VerilogPort(name, *port_type)
+            self._skip_declarator_tail()
+            if not self.stream.accept(","):
+                break
+        self.stream.expect(";")
+
+    def _parse_body_declarations(self, header_names: List[str]) -> List[VerilogPort]:
+        declared = {}
+        tokenizer = self.stream.tokenizer
+        tokenizer.line_filter = is_body_line_relevant
+        while self.stream.token is not None and self.stream.token != ENDMODULE_KEYWORD:
+            token = self.stream.token
+            if token in SKIPPED_BLOCKS:
+                self.stream.skip_to(SKIPPED_BLOCKS[token])
+            elif token in PARAMETER_KEYWORDS or token in DIRECTION_KEYWORDS:
+                # declarations may continue on lines the filter would skip
+                tokenizer.line_filter = None
+                self.stream.advance()
+                if token in PARAMETER_KEYWORDS:
+                    self._parse_parameter_declaration()
+                else:
+                    self._parse_port_declaration(token, declared)
+                tokenizer.line_filter = is_body_line_relevant
+                continue
+            self.stream.advance()
+        tokenizer.line_filter = None
+        ports = []
+        for name in header_names:
+            if name in declared:
+                ports.append(declared[name])
+            else:
+                print(f"VerilogParser::parse(): Port {name} has no direction declaration, ignoring it")
+        return ports
+
+
+def hash_file(file_path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as file:
+        for chunk in iter(lambda: file.read(HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def parse_module(file_path: Path, cache_dir: Path = None) -> VerilogModule:
+    """
+    Parses the first module of file_path; with cache_dir, parse results are
+    stored there keyed by the hash of the file contents, so an unchanged
+    file is never parsed twice
+    """
+    if cache_dir is None:
+        return VerilogParser().parse(file_path)
+    cache_path = Path(cache_dir) / f"{hash_file(file_path)}.json"
+    try:
+        with open(cache_path, "rt") as file:
+            cached = json.load(file)
+        if cached["version"] == PARSE_CACHE_VERSION:
+            return VerilogModule(cached["name"], cached["parameters"], [VerilogPort(*port) for port in cached["ports"]])
+    except (OSError, ValueError, KeyError, TypeError):
+        pass
+    module = VerilogParser().parse(file_path)
+    os.makedirs(cache_dir, exist_ok=True)
+    # written aside and renamed, so concurrent runs never read a partial entry
+    temporary_path = cache_path.with_suffix(f".{os.getpid()}.tmp")
+    with open(temporary_path, "wt") as file:
+        json.dump({"version": PARSE_CACHE_VERSION, "name": module.name, "parameters": module.parameters, "ports": module.ports}, file)
+    os.replace(temporary_path, cache_path)
+    return module
@@ -0,0 +1,36 @@
+import json
+from collections import Counter
+from pathlib import Path
+from typing import Iterable
+
+from port_tools import port_defs
+
+
+class AccessProfile(object):
+    """
+    Counts which ports are transferred together in flushed transactions
+
+    Saved profiles are read back by generate_interface.py --access_profile,
+    which places the ports of frequent transfers at consecutive addresses.
+    """
+
+    def __init__(self) -> None:
+        self.transfers = Counter()
+
+    def record(self, port_names: Iterable[str]) -> None:
+        names = tuple(dict.fromkeys(port_names))
+        if names:
+            self.transfers[names] += 1
+
+    def save(self, file_path: Path) -> None:
+        transfers = [
+            {
+                port_defs.ACCESS_PROFILE_PORTS_KEY: list(names),
+                port_defs.ACCESS_PROFILE_COUNT_KEY: count,
+            }
+            for names, count in self.transfers.most_common()
+        ]
+        with open(file_path, "wt") as file:
+            json.dump(
+                {port_defs.ACCESS_PROFILE_TRANSFERS_KEY: transfers}, file, indent=4
+            )
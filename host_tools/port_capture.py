@@ -0,0 +1,216 @@
+from collections import namedtuple
+from pathlib import Path
+from threading import Event
+from time import perf_counter, sleep
+from typing import List
+
+import numpy as np
+
+from fpga_interface import FpgaInterface
+from port_tools import port_defs
+from port_tools.port import IoPort
+from .register_arrays import get_port_dtype, decode_registers
+
+TIMESTAMP_FIELD = "timestamp"
+DEFAULT_CAPACITY = 1 << 16
+# remaining wait above which the sampling loop sleeps instead of spinning
+MIN_SLEEP_TIME = 0.002
+# VCD identifiers are written with the printable ASCII characters
+VCD_IDENTIFIER_FIRST = 33
+VCD_IDENTIFIER_BASE = 94
+
+CaptureReport = namedtuple(
+    "CaptureReport",
+    [
+        "sample_count",
+        "duration",
+        "sample_rate",
+        "dropped_samples",
+        "overwritten_samples",
+    ],
+)
+
+
+class PortCapture(object):
+    """
+    Samples IoPorts in a tight loop into a preallocated ring buffer
+
+    Every transfer reads samples_per_transfer consecutive samples of all
+    ports with a single read_set() call; their timestamps are spread evenly
+    over the duration of the transfer. The buffer is a structured array with
+    a "timestamp" field (seconds from the start of the first run) and one
+    field per port; with file_path it is an .npy file mapped into memory, so
+    captures can be larger than RAM. When the buffer is full the oldest
+    samples are overwritten.
+    """
+
+    def __init__(
+        self,
+        fpga: FpgaInterface,
+        ports: List[IoPort],
+        capacity: int = DEFAULT_CAPACITY,
+        file_path: Path = None,
+        samples_per_transfer: int = 1,
+    ) -> None:
+        self._usb_interface = fpga.get_usb_interface()
+        self.ports = list(ports)
+        self.capacity = capacity
+        self.samples_per_transfer = samples_per_transfer
+        dtype = np.dtype(
+            [(TIMESTAMP_FIELD, np.float64)]
+            + [(port.name, get_port_dtype(port)) for port in self.ports]
+        )
+        if file_path is None:
+            self.buffer = np.zeros(capacity, dtype=dtype)
+        else:
+            self.buffer = np.lib.format.open_memmap(
+                file_path, mode="w+", dtype=dtype, shape=(capacity,)
+            )
+        self._addresses = [address for port in self.ports for address in port.address]
+        self._transfer_addresses = self._addresses * samples_per_transfer
+        self._port_columns = []
+        column = 0
+        for port in self.ports:
+            self._port_columns.append((port, column, column + len(port.address)))
+            column += len(port.address)
+        self._stop_event = Event()
+        self._start = None
+        self.sample_count = 0
+        self.dropped_samples = 0
+
+    def stop(self) -> None:
+        self._stop_event.set()
+
+    def run(
+        self, duration: float = None, sample_count: int = None, rate_hz: float = None
+    ) -> CaptureReport:
+        """
+        Captures until duration seconds pass, sample_count samples are taken
+        or stop() is called
+
+        With rate_hz, transfers are paced to that sample rate and every
+        sampling slot missed because the loop fell behind counts as dropped.
+        Counts of the report cover this run only, overwritten_samples
+        included.
+        """
+        self._stop_event.clear()
+        period = self.samples_per_transfer / rate_hz if rate_hz else None
+        target_count = (
+            None if sample_count is None else self.sample_count + sample_count
+        )
+        start = perf_counter()
+        if self._start is None:
+            self._start = start
+        first_sample = self.sample_count
+        dropped_before = self.dropped_samples
+        next_transfer = start
+        while not self._stop_event.is_set():
+            now = perf_counter()
+            if duration is not None and now - start >= duration:
+                break
+            if target_count is not None and self.sample_count >= target_count:
+                break
+            if period is not None:
+                if now < next_transfer:
+                    if next_transfer - now > MIN_SLEEP_TIME:
+                        sleep(next_transfer - now - MIN_SLEEP_TIME)
+                    continue
+                missed = int((now - next_transfer) / period)
+                self.dropped_samples += missed * self.samples_per_transfer
+                next_transfer += (missed + 1) * period
+            self._sample()
+        duration = perf_counter() - start
+        sample_count = self.sample_count - first_sample
+        # only the samples this run pushed out of the buffer
+        overwritten_samples = max(0, self.sample_count - self.capacity) - max(
+            0, first_sample - self.capacity
+        )
+        return CaptureReport(
+            sample_count=sample_count,
+            duration=duration,
+            sample_rate=sample_count / duration if duration else 0.0,
+            dropped_samples=self.dropped_samples - dropped_before,
+            overwritten_samples=overwritten_samples,
+        )
+
+    def samples(self) -> np.ndarray:
+        """
+        Returns retained samples in chronological order
+        """
+        if self.sample_count <= self.capacity:
+            return self.buffer[: self.sample_count]
+        split = self.sample_count % self.capacity
+        return np.concatenate((self.buffer[split:], self.buffer[:split]))
+
+    def flush(self) -> None:
+        if isinstance(self.buffer, np.memmap):
+            self.buffer.flush()
+
+    def _sample(self) -> None:
+        transfer_start = perf_counter() - self._start
+        values = self._usb_interface.read_set(self._transfer_addresses)
+        transfer_end = perf_counter() - self._start
+        count = self.samples_per_transfer
+        if values is None:
+            values = [0] * len(self._transfer_addresses)
+        registers = np.asarray(values, dtype=np.uint64).reshape(count, -1)
+        indexes = (self.sample_count + np.arange(count)) % self.capacity
+        self.buffer[TIMESTAMP_FIELD][indexes] = np.linspace(
+            transfer_start, transfer_end, count, endpoint=False
+        )
+        for port, first_column, end_column in self._port_columns:
+            self.buffer[port.name][indexes] = decode_registers(
+                port, registers[:, first_column:end_column]
+            )
+        self.sample_count += count
+
+    def export_vcd(self, file_path: Path, timescale_ns: int = 1) -> None:
+        """
+        Writes retained samples as a Value Change Dump, one variable per port
+        """
+        samples = self.samples()
+        identifiers = {
+            port.name: get_vcd_identifier(i) for i, port in enumerate(self.ports)
+        }
+        with open(file_path, "wt") as file:
+            file.write(
+                f"$timescale {timescale_ns}ns $end\n$scope module capture $end\n"
+            )
+            for port in self.ports:
+                width = port.bit_width or len(port.address) * port_defs.DATA_WIDTH
+                file.write(
+                    f"$var wire {width} {identifiers[port.name]} {port.name} $end\n"
+                )
+            file.write("$upscope $end\n$enddefinitions $end\n")
+            if not len(samples):
+                return
+            times = np.rint(
+                (samples[TIMESTAMP_FIELD] - samples[TIMESTAMP_FIELD][0])
+                * 1e9
+                / timescale_ns
+            ).astype(np.int64)
+            previous = {}
+            for i, sample in enumerate(samples):
+                changes = []
+                for port in self.ports:
+                    value = int(sample[port.name])
+                    if previous.get(port.name) != value:
+                        previous[port.name] = value
+                        changes.append(f"b{value:b} {identifiers[port.name]}\n")
+                if changes:
+                    file.write(f"#{times[i]}\n")
+                    file.writelines(changes)
+
+
+def get_vcd_identifier(index: int) -> str:
+    """
+    Returns the VCD identifier of the variable at index: "!" to "~", then
+    two characters and so on, like base-94 digits
+    """
+    identifier = chr(VCD_IDENTIFIER_FIRST + index % VCD_IDENTIFIER_BASE)
+    index //= VCD_IDENTIFIER_BASE
+    while index:
+        index -= 1
+        identifier += chr(VCD_IDENTIFIER_FIRST + index % VCD_IDENTIFIER_BASE)
+        index //= VCD_IDENTIFIER_BASE
+    return identifier
@@ -0,0 +1,37 @@
+import numpy as np
+
+from port_tools import port_defs
+from port_tools.port import Port
+
+
+def get_port_dtype(port: Port):
+    """
+    Returns the smallest unsigned NumPy type holding every register of port
+    """
+    byte_count = len(port.address)
+    for dtype in [np.uint8, np.uint16, np.uint32, np.uint64]:
+        if byte_count <= np.dtype(dtype).itemsize:
+            return dtype
+    raise ValueError(f"Port {port.name} is wider than 64 bits")
+
+
+def get_byte_shifts(port: Port) -> np.ndarray:
+    return np.arange(len(port.address), dtype=np.uint64) * port_defs.DATA_WIDTH
+
+
+def encode_values(port: Port, values: np.ndarray) -> np.ndarray:
+    """
+    Vectorized Port.encode(): returns an (N, registers) array of register values
+    """
+    values = np.asarray(values, dtype=np.uint64)
+    return ((values[:, None] >> get_byte_shifts(port)) & port_defs.DATA_MASK).astype(
+        np.uint8
+    )
+
+
+def decode_registers(port: Port, registers: np.ndarray) -> np.ndarray:
+    """
+    Vectorized Port.decode() of an (N, registers) array of register values
+    """
+    registers = np.asarray(registers, dtype=np.uint64)
+    return np.bitwise_or.reduce(registers << get_byte_shifts(port), axis=1)
@@ -0,0 +1,86 @@
+import numpy as np
+
+from port_tools import port_defs
+from port_tools.units import Misr
+from port_tools.port_manager import PortList
+from .register_arrays import encode_values
+
+WORD_SIZE = port_defs.MISR_WIDTH // port_defs.DATA_WIDTH
+
+
+def fold_registers(registers: np.ndarray) -> np.ndarray:
+    """
+    Folds an (N, registers) array of register values into one signature-wide
+    word per row by XOR-ing its little-endian chunks, as misr.v does
+    """
+    registers = np.asarray(registers, dtype=np.uint8)
+    padding = -registers.shape[1] % WORD_SIZE
+    padded = np.pad(registers, ((0, 0), (0, padding)))
+    words = np.ascontiguousarray(padded).view("<u4").astype(np.uint64)
+    return np.bitwise_xor.reduce(words, axis=1)
+
+
+def _multiply(a: np.ndarray, b: np.ndarray, polynomial: int) -> np.ndarray:
+    """
+    Carry-less product of a and b modulo x^MISR_WIDTH + polynomial
+    """
+    a = np.asarray(a, dtype=np.uint64)
+    b = np.asarray(b, dtype=np.uint64)
+    product = np.zeros(np.broadcast(a, b).shape, dtype=np.uint64)
+    for bit in range(port_defs.MISR_WIDTH):
+        product ^= np.where(
+            (b >> np.uint64(bit)) & np.uint64(1), a << np.uint64(bit), 0
+        )
+    modulus = (1 << port_defs.MISR_WIDTH) | polynomial
+    for bit in range(2 * port_defs.MISR_WIDTH - 2, port_defs.MISR_WIDTH - 1, -1):
+        reduction = np.uint64(modulus << (bit - port_defs.MISR_WIDTH))
+        product ^= np.where((product >> np.uint64(bit)) & np.uint64(1), reduction, 0)
+    return product
+
+
+def _powers_of_x(count: int, polynomial: int) -> np.ndarray:
+    """
+    Returns x^0 .. x^count modulo x^MISR_WIDTH + polynomial, doubling the
+    computed range on every step
+    """
+    powers = np.ones(1, dtype=np.uint64)
+    while len(powers) <= count:
+        step = _multiply(powers[-1], 2, polynomial)
+        powers = np.concatenate([powers, _multiply(powers, step, polynomial)])
+    end = count + 1
+    return powers[:end]
+
+
+def compute_signature(words: np.ndarray, polynomial: int, seed: int) -> int:
+    """
+    Signature of the MISR starting from seed after one clock edge per folded
+    data word
+
+    Each edge computes S' = S * x + d modulo x^MISR_WIDTH + polynomial, so
+    after N edges S = S0 * x^N + sum(d_k * x^(N - 1 - k)), which is evaluated
+    for all words at once.
+    """
+    words = np.asarray(words, dtype=np.uint64)
+    powers = _powers_of_x(len(words), polynomial)
+    signature = int(_multiply(seed, powers[-1], polynomial))
+    if len(words):
+        terms = _multiply(words, powers[-2::-1], polynomial)
+        signature ^= int(np.bitwise_xor.reduce(terms))
+    return signature
+
+
+def golden_signature(port_list: PortList, misr: Misr, outputs: np.ndarray) -> int:
+    """
+    Expected signature of a run from a structured array of output values
+
+    Every row holds the values of the compacted ports (one field each, as
+    returned by vector playback) present before one edge of the MISR clock,
+    so a run of N clock cycles expects N rows, starting from a reset.
+    """
+    missing_names = [name for name in misr.ports if name not in outputs.dtype.names]
+    if missing_names:
+        raise ValueError(f"No expected values for ports {', '.join(missing_names)}")
+    registers = np.hstack(
+        [encode_values(port_list[name], outputs[name]) for name in misr.ports]
+    )
+    return compute_signature(fold_registers(registers), misr.polynomial, misr.seed)
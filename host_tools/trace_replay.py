@@ -0,0 +1,138 @@
+from collections import namedtuple
+from pathlib import Path
+from time import perf_counter
+
+import numpy as np
+
+from usb_interface.trace_recorder import (
+    TRACE_CLOCK,
+    TRACE_HEADER,
+    TRACE_MAGIC,
+    TRACE_READ,
+    get_trace_size,
+)
+from usb_interface.usb_interface import UsbInterface
+
+# matches usb_interface.trace_recorder.TRACE_RECORD
+TRACE_DTYPE = np.dtype(
+    [
+        ("timestamp", "<u8"),
+        ("transfer", "<u4"),
+        ("address", "<u2"),
+        ("operation", "u1"),
+        ("value", "u1"),
+    ]
+)
+MISMATCH_DTYPE = np.dtype(
+    [
+        ("record", np.int64),
+        ("transfer", np.uint32),
+        ("address", np.uint16),
+        ("recorded", np.uint8),
+        ("observed", np.uint8),
+    ]
+)
+# registers per replayed read_set() or write_set()
+DEFAULT_TRANSFER_SIZE = 1 << 12
+
+ReplayReport = namedtuple(
+    "ReplayReport", ["record_count", "transfer_count", "duration", "mismatches"]
+)
+
+
+def load_trace(file_path: Path):
+    """
+    Returns the wall-clock start time in nanoseconds and the records of a
+    trace written by usb_interface.trace_recorder.TraceRecorder, mapped into
+    memory as a structured array
+    """
+    with open(file_path, "rb") as file:
+        magic, start_time = TRACE_HEADER.unpack(file.read(TRACE_HEADER.size))
+    if magic != TRACE_MAGIC:
+        raise ValueError(f"{file_path} is not a register trace")
+    if get_trace_size(file_path) == 0:
+        return start_time, np.empty(0, TRACE_DTYPE)
+    records = np.memmap(
+        file_path, TRACE_DTYPE, "r", TRACE_HEADER.size, (get_trace_size(file_path),)
+    )
+    # records of an untrimmed trace end at the first unused (zeroed) slot
+    unused = np.flatnonzero(records["transfer"] == 0)
+    if unused.size:
+        records = records[: unused[0]]
+    return start_time, records
+
+
+def get_runs(records: np.ndarray, transfer_size: int):
+    """
+    Yields (start, stop) index ranges of consecutive reads or consecutive
+    writes, at most transfer_size records long
+
+    Merging neighbouring transfers of the same kind keeps the order of all
+    register accesses, only the pauses between them are dropped. A run of
+    writes also ends after its clock writes, so that every replayed transfer
+    fires clocks only at its end, like the recorded transfers did.
+    """
+    operations = records["operation"]
+    is_read = operations == TRACE_READ
+    is_clock = operations == TRACE_CLOCK
+    boundaries = (
+        np.flatnonzero((is_read[1:] != is_read[:-1]) | (is_clock[:-1] & ~is_clock[1:]))
+        + 1
+    )
+    starts = np.concatenate(([0], boundaries))
+    stops = np.concatenate((boundaries, [len(records)]))
+    for start, stop in zip(starts.tolist(), stops.tolist()):
+        for chunk_start in range(start, stop, transfer_size):
+            yield chunk_start, min(chunk_start + transfer_size, stop)
+
+
+def _diff_reads(run: np.ndarray, start: int, values) -> np.ndarray:
+    observed = np.asarray(values, dtype=np.uint8)
+    differing = np.flatnonzero(observed != run["value"])
+    mismatches = np.empty(differing.size, dtype=MISMATCH_DTYPE)
+    mismatches["record"] = differing + start
+    mismatches["transfer"] = run["transfer"][differing]
+    mismatches["address"] = run["address"][differing]
+    mismatches["recorded"] = run["value"][differing]
+    mismatches["observed"] = observed[differing]
+    return mismatches
+
+
+def replay_trace(
+    usb_interface: UsbInterface,
+    file_path: Path,
+    transfer_size: int = DEFAULT_TRANSFER_SIZE,
+) -> ReplayReport:
+    """
+    Replays a recorded trace as fast as possible and diffs the observed
+    register reads against the recorded ones
+
+    Writes (clock writes included) are issued with write_set() and reads with
+    read_set(), each covering up to transfer_size registers of a run of
+    consecutive writes or reads. The report holds one MISMATCH_DTYPE entry
+    per register read back with a different value.
+    """
+    _, records = load_trace(file_path)
+    mismatches = []
+    transfer_count = 0
+    start_time = perf_counter()
+    for start, stop in get_runs(records, transfer_size):
+        run = records[start:stop]
+        addresses = run["address"].tolist()
+        transfer_count += 1
+        if run["operation"][0] != TRACE_READ:
+            pairs = list(zip(addresses, run["value"].tolist()))
+            # backends without a result, like the dummy one, return None
+            if usb_interface.write_set(pairs) is False:
+                raise RuntimeError(f"Replaying the write of record {start} failed")
+            continue
+        values = usb_interface.read_set(addresses)
+        if values is None:
+            raise RuntimeError(f"Replaying the read of record {start} failed")
+        mismatches.append(_diff_reads(run, start, values))
+    return ReplayReport(
+        len(records),
+        transfer_count,
+        perf_counter() - start_time,
+        np.concatenate([np.empty(0, MISMATCH_DTYPE)] + mismatches),
+    )
@@ -0,0 +1,192 @@
+from time import sleep
+from typing import List
+
+import numpy as np
+
+from port_tools import port_defs
+from port_tools.port import IoPort, ClockPort
+from port_tools.units import VectorEngine
+from port_tools.port_manager import PortList
+from usb_interface.usb_interface import UsbInterface
+from .register_arrays import get_port_dtype, encode_values, decode_registers
+
+
+def apply_vectors(
+    usb_interface: UsbInterface,
+    port_list: PortList,
+    inputs: np.ndarray,
+    clock: ClockPort,
+    cycles_per_vector: int,
+    observe: List[IoPort],
+) -> np.ndarray:
+    """
+    Applies every row of a structured array to the DUT and samples outputs
+
+    Field names of inputs select the input ports. For each vector, its
+    input registers and the clock count are written with one write_set()
+    call and the observed registers are read with one read_set() call.
+    Register values of all vectors are packed up front, so the loop only
+    issues transfers; the read of a vector has to complete before the next
+    vector may be written. Returns a structured array with one field per
+    observed port. Raises RuntimeError when a transfer fails.
+    """
+    if cycles_per_vector > clock.max_cycles:
+        raise ValueError(
+            f"At most {clock.max_cycles} clock cycles of {clock.name} can be issued per vector"
+        )
+    input_ports = [port_list[name] for name in inputs.dtype.names]
+    input_addresses = [address for port in input_ports for address in port.address]
+    input_registers = np.hstack(
+        [encode_values(port, inputs[port.name]) for port in input_ports]
+    ).tolist()
+    clock_pairs = (
+        list(zip(clock.address, clock.encode(cycles_per_vector)))
+        if cycles_per_vector
+        else []
+    )
+    read_addresses = [address for port in observe for address in port.address]
+
+    registers = []
+    for i, vector in enumerate(input_registers):
+        if (
+            usb_interface.write_set(list(zip(input_addresses, vector)) + clock_pairs)
+            is False
+        ):
+            raise RuntimeError(f"Writing vector {i} failed")
+        values = usb_interface.read_set(read_addresses)
+        if values is None:
+            raise RuntimeError(f"Reading the outputs of vector {i} failed")
+        registers.append(values)
+    vector_count = len(inputs)
+    registers = np.asarray(registers, dtype=np.uint64).reshape(
+        vector_count, len(read_addresses)
+    )
+
+    outputs = np.zeros(
+        vector_count, dtype=[(port.name, get_port_dtype(port)) for port in observe]
+    )
+    column = 0
+    for port in observe:
+        end_column = column + len(port.address)
+        outputs[port.name] = decode_registers(port, registers[:, column:end_column])
+        column = end_column
+    return outputs
+
+
+def run_on_chip(
+    usb_interface: UsbInterface,
+    port_list: PortList,
+    engine: VectorEngine,
+    vectors: np.ndarray,
+    observe: List[IoPort] = None,
+    cycles_per_vector: int = 1,
+    poll_interval: float = 0,
+) -> np.ndarray:
+    """
+    Applies every row of a structured array with the on-chip vector engine
+
+    The stimulus words are written to the stimulus RAM in one block transfer,
+    the sequencer applies them at fabric speed, issuing cycles_per_vector
+    clock cycles each, and the response RAM is read back in one block
+    transfer. Field names of vectors select the input ports, vector inputs
+    of the engine without a field are driven with 0. Returns a structured
+    array with one field per observed port, all engine outputs by default.
+    Raises RuntimeError when a transfer fails.
+    """
+    if len(vectors) > engine.depth:
+        raise ValueError(f"At most {engine.depth} vectors fit into the stimulus RAM")
+    if cycles_per_vector > engine.max_cycles:
+        raise ValueError(
+            f"At most {engine.max_cycles} clock cycles can be issued per vector"
+        )
+    unknown_names = [name for name in vectors.dtype.names if name not in engine.inputs]
+    if observe is None:
+        observe = [port_list[name] for name in engine.outputs]
+    unknown_names += [port.name for port in observe if port.name not in engine.outputs]
+    if unknown_names:
+        raise ValueError(
+            f"Ports {', '.join(unknown_names)} are not connected to the vector engine"
+        )
+
+    vector_count = len(vectors)
+    input_ports = [port_list[name] for name in engine.inputs]
+    stimulus = np.hstack(
+        [
+            (
+                encode_values(port, vectors[port.name])
+                if port.name in vectors.dtype.names
+                else np.zeros((vector_count, len(port.address)), dtype=np.uint8)
+            )
+            for port in input_ports
+        ]
+    )
+    _run_engine(usb_interface, engine, stimulus, cycles_per_vector, poll_interval)
+
+    # rewinding the data registers restarts response reads at the first vector
+    _write_set(usb_interface, [(engine.address, port_defs.VECTOR_RESET)])
+    output_ports = [port_list[name] for name in engine.outputs]
+    response_size = sum(len(port.address) for port in output_ports)
+    data = usb_interface.read_block(
+        engine.response_address, vector_count * response_size, increment=False
+    )
+    if data is None:
+        raise RuntimeError("Reading the response RAM failed")
+    registers = np.frombuffer(data, dtype=np.uint8).reshape(vector_count, -1)
+
+    columns = {}
+    column = 0
+    for port in output_ports:
+        end_column = column + len(port.address)
+        columns[port.name] = (column, end_column)
+        column = end_column
+    outputs = np.zeros(
+        vector_count, dtype=[(port.name, get_port_dtype(port)) for port in observe]
+    )
+    for port in observe:
+        start_column, end_column = columns[port.name]
+        outputs[port.name] = decode_registers(
+            port, registers[:, start_column:end_column]
+        )
+    return outputs
+
+
+def _run_engine(
+    usb_interface: UsbInterface,
+    engine: VectorEngine,
+    stimulus: np.ndarray,
+    cycles_per_vector: int,
+    poll_interval: float,
+) -> None:
+    _write_set(usb_interface, [(engine.address, port_defs.VECTOR_RESET)])
+    if (
+        usb_interface.write_block(
+            engine.stimulus_address, stimulus.tobytes(), increment=False
+        )
+        is False
+    ):
+        raise RuntimeError("Writing the stimulus RAM failed")
+    _write_set(
+        usb_interface, engine.get_start_registers(len(stimulus), cycles_per_vector)
+    )
+    while True:
+        status = usb_interface.read_set([engine.status_address])
+        if status is None:
+            raise RuntimeError("Reading the vector engine status failed")
+        if not status[0] & port_defs.VECTOR_STATUS_ACTIVE:
+            break
+        sleep(poll_interval)
+
+
+def _write_set(usb_interface: UsbInterface, address_value_pairs) -> None:
+    if usb_interface.write_set(address_value_pairs) is False:
+        raise RuntimeError("Writing the vector engine registers failed")
+
+
+def compare(observed: np.ndarray, expected: np.ndarray) -> np.ndarray:
+    """
+    Returns indexes of vectors where any field of expected differs from observed
+    """
+    mismatches = np.zeros(len(expected), dtype=bool)
+    for name in expected.dtype.names:
+        mismatches |= observed[name] != expected[name]
+    return np.flatnonzero(mismatches)
@@ -1,3 +1,5 @@
+from typing import List
+
 from . import port_defs
 
 
@@ -8,6 +10,24 @@ class Port(object):
             raise ValueError("Provided port has no name")
         self.address = [int(addr, 16) for addr in kwargs.get(port_defs.ADDRESS_KEY)]
 
+    def encode(self, value: int) -> List[int]:
+        """
+        Splits value into register bytes, least significant byte first
+
+        Byte order matches the concatenations emitted by VerilogGenerator,
+        where address[0] holds the lowest bits of the port
+        """
+        return [
+            (value >> (port_defs.DATA_WIDTH * i)) & port_defs.DATA_MASK
+            for i in range(len(self.address))
+        ]
+
+    def decode(self, register_values: List[int]) -> int:
+        value = 0
+        for i, register_value in enumerate(register_values):
+            value |= register_value << (port_defs.DATA_WIDTH * i)
+        return value
+
 
 class IoPort(Port):
     def __init__(self, **kwargs) -> None:
@@ -24,8 +44,32 @@ class IoPort(Port):
         if self.direction == port_defs.ALLOWED_DIRECTIONS[2]:
             self.enable_signal_active = kwargs.get(port_defs.INOUT_ENABLE_SIGNAL_ACTIVE)
             self.enable_signal = kwargs.get(port_defs.INOUT_ENABLE_SIGNAL)
+        # registers holding the value latched by the last snapshot, if any
+        self.snapshot_address = [
+            int(addr, 16) for addr in kwargs.get(port_defs.SNAPSHOT_ADDRESS_KEY) or []
+        ]
 
 
 class ClockPort(Port):
     def __init__(self, **kwargs) -> None:
         super().__init__(**kwargs)
+        self.counter_width: int = kwargs.get(port_defs.COUNTER_WIDTH_KEY) or (
+            port_defs.DATA_WIDTH * len(self.address)
+        )
+        busy_address = kwargs.get(port_defs.BUSY_ADDRESS_KEY)
+        self.busy_address = None if busy_address is None else int(busy_address, 16)
+        self.busy_bit: int = kwargs.get(port_defs.BUSY_BIT_KEY)
+        # registers of the free-running divider, if any
+        run_address = kwargs.get(port_defs.RUN_ADDRESS_KEY)
+        self.run_address = None if run_address is None else int(run_address[0], 16)
+        self.divider_address = [
+            int(addr, 16) for addr in kwargs.get(port_defs.DIVIDER_ADDRESS_KEY) or []
+        ]
+        self.cycle_count_address = [
+            int(addr, 16)
+            for addr in kwargs.get(port_defs.CYCLE_COUNT_ADDRESS_KEY) or []
+        ]
+
+    @property
+    def max_cycles(self) -> int:
+        return (1 << self.counter_width) - 1
@@ -7,3 +7,87 @@ INOUT_ENABLE_SIGNAL = "enable_signal"
 INOUT_ENABLE_SIGNAL_ACTIVE = "enable_signal_active"
 # used by AtlysInterface
 ADDRESS_KEY = "address"
+# width of a single interface register
+DATA_WIDTH = 8
+DATA_MASK = (1 << DATA_WIDTH) - 1
+# constant register holding ID of the generated design
+BUILD_ID_KEY = "build_id"
+BUILD_ID_VALUE_KEY = "value"
+BUILD_ID_SIZE = 4
+# clock generator counter and status
+COUNTER_WIDTH_KEY = "counter_width"
+BUSY_ADDRESS_KEY = "busy_address"
+BUSY_BIT_KEY = "busy_bit"
+# burst mode of the interface: ADDR MSB enables auto-increment
+AUTO_INCREMENT_KEY = "auto_increment"
+AUTO_INCREMENT_FLAG = 0x80
+# output snapshot bank: writing its control register latches all outputs
+SNAPSHOT_KEY = "snapshot"
+SNAPSHOT_ADDRESS_KEY = "snapshot_address"
+# change detection: writing its control register latches and clears the
+# bitmap of output registers changed since the previous latch
+CHANGE_DETECTION_KEY = "change_detection"
+CHANGE_BITMAP_ADDRESS_KEY = "bitmap_address"
+CHANGE_REGISTERS_KEY = "registers"
+# wait unit: halts clock generators once an output matches a masked value
+WAIT_UNIT_KEY = "wait_unit"
+WAIT_SELECT_ADDRESS_KEY = "select_address"
+WAIT_MASK_ADDRESS_KEY = "mask_address"
+WAIT_VALUE_ADDRESS_KEY = "value_address"
+WAIT_TIMEOUT_ADDRESS_KEY = "timeout_address"
+WAIT_STATUS_ADDRESS_KEY = "status_address"
+WAIT_DATA_SIZE = 4
+WAIT_TIMEOUT_SIZE = 4
+WAIT_ARM = 0x01
+WAIT_RELEASE = 0x02
+WAIT_STATUS_WAITING = 0x01
+WAIT_STATUS_HIT = 0x02
+WAIT_STATUS_TIMEOUT = 0x04
+# vector engine: stimulus and response block RAMs with an on-chip sequencer
+VECTOR_ENGINE_KEY = "vector_engine"
+VECTOR_DEPTH_KEY = "depth"
+VECTOR_CLOCK_KEY = "clock"
+VECTOR_INPUTS_KEY = "inputs"
+VECTOR_OUTPUTS_KEY = "outputs"
+VECTOR_COUNT_ADDRESS_KEY = "count_address"
+VECTOR_CYCLES_ADDRESS_KEY = "cycles_address"
+VECTOR_STIMULUS_ADDRESS_KEY = "stimulus_address"
+VECTOR_RESPONSE_ADDRESS_KEY = "response_address"
+VECTOR_STATUS_ADDRESS_KEY = "status_address"
+VECTOR_CYCLES_SIZE = 2
+VECTOR_START = 0x01
+VECTOR_RESET = 0x02
+VECTOR_STATUS_ACTIVE = 0x01
+VECTOR_STATUS_DONE = 0x02
+# step group firing several clock generators with a shared count
+STEP_GROUP_KEY = "step_group"
+STEP_GROUP_CLOCKS_KEY = "clocks"
+STEP_GROUP_COUNT_ADDRESS_KEY = "count_address"
+# free-running clock, dividing the main interface clock
+MAIN_CLOCK_HZ_KEY = "main_clock_hz"
+RUN_ADDRESS_KEY = "run_address"
+DIVIDER_ADDRESS_KEY = "divider_address"
+CYCLE_COUNT_ADDRESS_KEY = "cycle_count_address"
+DIVIDER_SIZE = 4
+CYCLE_COUNT_SIZE = 6
+CLOCK_RUN = 0x01
+# signature register (MISR) compacting DUT outputs on every edge of a clock
+MISR_KEY = "misr"
+MISR_CLOCK_KEY = "clock"
+MISR_PORTS_KEY = "ports"
+MISR_SIGNATURE_ADDRESS_KEY = "signature_address"
+MISR_POLYNOMIAL_KEY = "polynomial"
+MISR_SEED_KEY = "seed"
+MISR_WIDTH = 32
+MISR_POLYNOMIAL = 0x04C11DB7
+MISR_SEED = 0xFFFFFFFF
+# register banks, selected by writing the last register of any bank
+BANK_SELECT_KEY = "bank_select"
+BANK_KEY = "bank"
+BANK_SELECT_WIDTH = 8
+# ports placed contiguously by the generator, as they are accessed together
+PORT_GROUPS_KEY = "port_groups"
+# access profile recorded by the host: port names of each transfer and their count
+ACCESS_PROFILE_TRANSFERS_KEY = "transfers"
+ACCESS_PROFILE_PORTS_KEY = "ports"
+ACCESS_PROFILE_COUNT_KEY = "count"
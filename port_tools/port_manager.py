@@ -29,6 +29,12 @@ class PortManager(json.JSONDecoder):
                 self._ports[port_data.get(port_defs.NAME_KEY)] = ClockPort(
                     name=port_data.get(port_defs.NAME_KEY),
                     address=port_data.get(port_defs.ADDRESS_KEY),
+                    counter_width=port_data.get(port_defs.COUNTER_WIDTH_KEY),
+                    busy_address=port_data.get(port_defs.BUSY_ADDRESS_KEY),
+                    busy_bit=port_data.get(port_defs.BUSY_BIT_KEY),
+                    run_address=port_data.get(port_defs.RUN_ADDRESS_KEY),
+                    divider_address=port_data.get(port_defs.DIVIDER_ADDRESS_KEY),
+                    cycle_count_address=port_data.get(port_defs.CYCLE_COUNT_ADDRESS_KEY),
                 )
             else:
                 self._ports[port_data.get(port_defs.NAME_KEY)] = IoPort(
@@ -38,7 +44,8 @@ class PortManager(json.JSONDecoder):
                     direction=port_data.get(port_defs.DIRECTION_KEY),
                     bit_width=port_data.get(port_defs.BIT_WIDTH_KEY),
                     enable_signal=port_data.get(port_defs.INOUT_ENABLE_SIGNAL),
-                    enable_signal_active=port_data.get(port_defs.INOUT_ENABLE_SIGNAL_ACTIVE)
+                    enable_signal_active=port_data.get(port_defs.INOUT_ENABLE_SIGNAL_ACTIVE),
+                    snapshot_address=port_data.get(port_defs.SNAPSHOT_ADDRESS_KEY),
                 )
 
     def get_port_list(self):
@@ -0,0 +1,183 @@
+from typing import List, Tuple
+
+from . import port_defs
+from .port import Port
+
+
+def _encode_registers(addresses: List[int], value: int) -> List[Tuple[int, int]]:
+    """
+    Pairs addresses with the bytes of value, least significant byte first
+    """
+    return [
+        (address, (value >> (port_defs.DATA_WIDTH * i)) & port_defs.DATA_MASK)
+        for i, address in enumerate(addresses)
+    ]
+
+
+class ChangeDetector(object):
+    """
+    Registers of the change detection unit: writing the control register
+    latches the bitmap, whose bit i flags a change of registers[i]
+    """
+
+    def __init__(self, **kwargs) -> None:
+        self.address = int(kwargs.get(port_defs.ADDRESS_KEY)[0], 16)
+        self.bitmap_address = [
+            int(addr, 16) for addr in kwargs.get(port_defs.CHANGE_BITMAP_ADDRESS_KEY)
+        ]
+        self.registers = [
+            int(addr, 16) for addr in kwargs.get(port_defs.CHANGE_REGISTERS_KEY)
+        ]
+
+    def get_changed_registers(self, bitmap: List[int]) -> List[int]:
+        return [
+            address
+            for i, address in enumerate(self.registers)
+            if bitmap[i // port_defs.DATA_WIDTH] >> (i % port_defs.DATA_WIDTH) & 1
+        ]
+
+    def encode_bitmap(self, changed_registers) -> List[int]:
+        bitmap = [0] * len(self.bitmap_address)
+        for i, address in enumerate(self.registers):
+            if address in changed_registers:
+                bitmap[i // port_defs.DATA_WIDTH] |= 1 << (i % port_defs.DATA_WIDTH)
+        return bitmap
+
+
+class WaitUnit(object):
+    """
+    Registers of the wait unit comparing an output port with a masked value
+    """
+
+    def __init__(self, **kwargs) -> None:
+        self.address = int(kwargs.get(port_defs.ADDRESS_KEY)[0], 16)
+        self.select_address = int(kwargs.get(port_defs.WAIT_SELECT_ADDRESS_KEY)[0], 16)
+        self.mask_address = [
+            int(addr, 16) for addr in kwargs.get(port_defs.WAIT_MASK_ADDRESS_KEY)
+        ]
+        self.value_address = [
+            int(addr, 16) for addr in kwargs.get(port_defs.WAIT_VALUE_ADDRESS_KEY)
+        ]
+        self.timeout_address = [
+            int(addr, 16) for addr in kwargs.get(port_defs.WAIT_TIMEOUT_ADDRESS_KEY)
+        ]
+        self.status_address = int(kwargs.get(port_defs.WAIT_STATUS_ADDRESS_KEY)[0], 16)
+
+    def get_arm_registers(
+        self, port: Port, mask: int, value: int, timeout: int
+    ) -> List[Tuple[int, int]]:
+        """
+        Returns address/value pairs arming the unit, the control register last
+        """
+        return (
+            [(self.select_address, port.address[0])]
+            + _encode_registers(self.mask_address, mask)
+            + _encode_registers(self.value_address, value)
+            + _encode_registers(self.timeout_address, timeout)
+            + [(self.address, port_defs.WAIT_ARM)]
+        )
+
+
+class VectorEngine(object):
+    """
+    Registers and port layout of the on-chip stimulus/response vector engine
+    """
+
+    def __init__(self, **kwargs) -> None:
+        self.depth: int = kwargs.get(port_defs.VECTOR_DEPTH_KEY)
+        self.clock: str = kwargs.get(port_defs.VECTOR_CLOCK_KEY)
+        self.inputs: List[str] = kwargs.get(port_defs.VECTOR_INPUTS_KEY)
+        self.outputs: List[str] = kwargs.get(port_defs.VECTOR_OUTPUTS_KEY)
+        self.address = int(kwargs.get(port_defs.ADDRESS_KEY)[0], 16)
+        self.count_address = [
+            int(addr, 16) for addr in kwargs.get(port_defs.VECTOR_COUNT_ADDRESS_KEY)
+        ]
+        self.cycles_address = [
+            int(addr, 16) for addr in kwargs.get(port_defs.VECTOR_CYCLES_ADDRESS_KEY)
+        ]
+        self.stimulus_address = int(
+            kwargs.get(port_defs.VECTOR_STIMULUS_ADDRESS_KEY)[0], 16
+        )
+        self.response_address = int(
+            kwargs.get(port_defs.VECTOR_RESPONSE_ADDRESS_KEY)[0], 16
+        )
+        self.status_address = int(
+            kwargs.get(port_defs.VECTOR_STATUS_ADDRESS_KEY)[0], 16
+        )
+
+    @property
+    def max_cycles(self) -> int:
+        return (1 << (port_defs.DATA_WIDTH * len(self.cycles_address))) - 1
+
+    def get_start_registers(self, count: int, cycles: int) -> List[Tuple[int, int]]:
+        """
+        Returns address/value pairs starting a run, the control register last
+        """
+        return (
+            _encode_registers(self.count_address, count)
+            + _encode_registers(self.cycles_address, cycles)
+            + [(self.address, port_defs.VECTOR_START)]
+        )
+
+
+class StepGroup(object):
+    """
+    Registers of the step group firing several clock generators with a
+    shared count, bit i of the select registers selects clocks[i]
+    """
+
+    def __init__(self, **kwargs) -> None:
+        self.clocks: List[str] = kwargs.get(port_defs.STEP_GROUP_CLOCKS_KEY)
+        self.address = [int(addr, 16) for addr in kwargs.get(port_defs.ADDRESS_KEY)]
+        self.count_address = [
+            int(addr, 16) for addr in kwargs.get(port_defs.STEP_GROUP_COUNT_ADDRESS_KEY)
+        ]
+
+    @property
+    def max_cycles(self) -> int:
+        return (1 << (port_defs.DATA_WIDTH * len(self.count_address))) - 1
+
+    def encode_select(self, clock_names) -> int:
+        return sum(1 << i for i, name in enumerate(self.clocks) if name in clock_names)
+
+    def get_selected_clocks(self, select: int) -> List[str]:
+        return [name for i, name in enumerate(self.clocks) if select >> i & 1]
+
+    def get_step_registers(self, clock_names, cycles: int) -> List[Tuple[int, int]]:
+        """
+        Returns address/value pairs firing the named clocks for cycles cycles,
+        the last select register last
+        """
+        return _encode_registers(self.count_address, cycles) + _encode_registers(
+            self.address, self.encode_select(clock_names)
+        )
+
+
+class Misr(object):
+    """
+    Registers of the signature register (MISR) compacting output ports
+    """
+
+    def __init__(self, **kwargs) -> None:
+        self.clock: str = kwargs.get(port_defs.MISR_CLOCK_KEY)
+        self.ports: List[str] = kwargs.get(port_defs.MISR_PORTS_KEY)
+        self.polynomial = int(kwargs.get(port_defs.MISR_POLYNOMIAL_KEY), 16)
+        self.seed = int(kwargs.get(port_defs.MISR_SEED_KEY), 16)
+        self.address = int(kwargs.get(port_defs.ADDRESS_KEY)[0], 16)
+        self.signature_address = [
+            int(addr, 16) for addr in kwargs.get(port_defs.MISR_SIGNATURE_ADDRESS_KEY)
+        ]
+
+    def next_signature(self, signature: int, registers: List[int]) -> int:
+        """
+        Returns the signature after one clock edge sampling the register
+        values of the compacted ports, in port order
+        """
+        mask = (1 << port_defs.MISR_WIDTH) - 1
+        data = int.from_bytes(bytes(registers), "little")
+        folded = 0
+        while data:
+            folded ^= data & mask
+            data >>= port_defs.MISR_WIDTH
+        feedback = self.polynomial if signature >> (port_defs.MISR_WIDTH - 1) else 0
+        return ((signature << 1) & mask) ^ feedback ^ folded
@@ -0,0 +1,64 @@
+import json
+
+import pytest
+
+from fpga_interface import FpgaInterface
+from generation_tools.port_encoder import PortEncoder
+
+
+def clock_port(name: str, address: int, busy_address: int) -> dict:
+    return {
+        "name": name,
+        "clock_port": True,
+        "bit_width": 1,
+        "direction": "input",
+        "counter_width": 8,
+        "address": [f"{address:x}"],
+        "busy_address": f"{busy_address:x}",
+        "busy_bit": 0,
+    }
+
+
+def io_port(name: str, direction: str, addresses) -> dict:
+    return {
+        "name": name,
+        "clock_port": False,
+        "bit_width": 8 * len(addresses),
+        "direction": direction,
+        "address": [f"{address:x}" for address in addresses],
+    }
+
+
+@pytest.fixture
+def make_fpga(tmp_path):
+    """
+    Returns a function opening a simulated FpgaInterface on the given ports,
+    further keys are added to the JSON configuration
+    """
+
+    def make(ports, shadow_cache: bool = False, **config) -> FpgaInterface:
+        config_path = tmp_path / "config.json"
+        config.update(fpga_interface="simulated", ports=ports)
+        config_path.write_text(json.dumps(config))
+        return FpgaInterface(config_path, shadow_cache=shadow_cache)
+
+    return make
+
+
+@pytest.fixture
+def make_design(tmp_path):
+    """
+    Returns a function opening a simulated FpgaInterface on the register map
+    generated for a Verilog source, keyword arguments are passed to
+    PortEncoder.parse_to_file()
+    """
+
+    def make(source: str, clocks, shadow_cache: bool = False, **kwargs):
+        source_path = tmp_path / "design.v"
+        source_path.write_text(source)
+        PortEncoder().parse_to_file(
+            source_path, clocks, tmp_path, "simulated", **kwargs
+        )
+        return FpgaInterface(tmp_path / "design_config.json", shadow_cache=shadow_cache)
+
+    return make
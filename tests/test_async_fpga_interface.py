@@ -0,0 +1,86 @@
+import asyncio
+import json
+
+import pytest
+
+from async_fpga_interface import AsyncFpgaInterface
+from conftest import clock_port, io_port
+from fpga_interface import FpgaInterface
+
+
+@pytest.fixture
+def fpga(tmp_path):
+    config_path = tmp_path / "config.json"
+    config_path.write_text(
+        json.dumps(
+            {
+                "fpga_interface": "simulated",
+                "ports": [
+                    clock_port("CLK", 0x00, 0x05),
+                    io_port("SW", "input", [0x01]),
+                    io_port("WIDE_IN", "input", [0x02, 0x03]),
+                    io_port("COUNT", "output", [0x00, 0x01]),
+                ],
+            }
+        )
+    )
+    return FpgaInterface(config_path, shadow_cache=True, instrument=True)
+
+
+def run(fpga: FpgaInterface, *operations):
+    """
+    Submits operations(async_fpga) concurrently and returns their results
+    """
+
+    async def submit():
+        async with AsyncFpgaInterface.from_fpga_interface(fpga) as async_fpga:
+            return await asyncio.gather(
+                *(operation(async_fpga) for operation in operations)
+            )
+
+    return asyncio.run(submit())
+
+
+def test_requests_go_through_fpga_interface(fpga):
+    ports = fpga.get_port_list()
+    backend = fpga.get_usb_interface()
+    backend.set_output(ports.COUNT, 0x1234)
+    results = run(
+        fpga,
+        lambda async_fpga: async_fpga.write(ports.SW, 0x5A),
+        lambda async_fpga: async_fpga.read(ports.COUNT),
+        lambda async_fpga: async_fpga.step(ports.CLK, 3),
+    )
+    assert results == [True, 0x1234, True]
+    assert backend.get_input(ports.SW) == 0x5A
+    assert backend.clock_cycles["CLK"] == 3
+    assert fpga.stats()["ports"]["SW.write"] == 1
+    # the shadow cache took the value over, the write is redundant
+    transactions = backend.transactions
+    assert fpga.read(ports.SW) == 0x5A
+    assert fpga.write(ports.SW, 0x5A)
+    assert backend.transactions == transactions
+
+
+def test_writes_get_their_own_result(fpga, monkeypatch):
+    ports = fpga.get_port_list()
+    backend = fpga.get_usb_interface()
+    write_set = backend.write_set
+    calls = []
+
+    def fail_first(address_value_pairs):
+        calls.append(address_value_pairs)
+        return False if len(calls) == 1 else write_set(address_value_pairs)
+
+    monkeypatch.setattr(backend, "write_set", fail_first)
+    results = run(
+        fpga,
+        lambda async_fpga: async_fpga.write(ports.SW, 0x11),
+        lambda async_fpga: async_fpga.read(ports.COUNT),
+        lambda async_fpga: async_fpga.write(ports.WIDE_IN, 0xBEEF),
+    )
+    assert results == [False, 0, True]
+    assert backend.get_input(ports.WIDE_IN) == 0xBEEF
+    # the failed write left the port uncached, so it is written again
+    assert fpga.write(ports.SW, 0x11)
+    assert len(calls) == 3
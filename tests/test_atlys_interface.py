@@ -0,0 +1,261 @@
+from port_tools import port_defs
+from port_tools.port import IoPort
+from usb_interface import atlys_interface
+from usb_interface.atlys_interface import AtlysInterface
+from usb_interface.bank_select import BankSelect
+
+BANK_SIZE = 0x80
+
+
+class _Function(object):
+    """
+    Library function taking the argtypes and restype set by the interface
+    """
+
+    def __init__(self, name: str, function) -> None:
+        self.__name__ = name
+        self._function = function
+
+    def __call__(self, *args):
+        return self._function(*args)
+
+
+class FakeBoard(object):
+    """
+    Digilent manager and DEPP libraries of one board whose registers read
+    back the values written to them
+
+    Registers are keyed by (bank, address); with bank_size, writing the last
+    register of a bank selects the bank, as in interfaces generated with
+    banks. Calls are logged by name, functions in fail return False once.
+    """
+
+    def __init__(self, bank_size: int = None) -> None:
+        self.bank_size = bank_size
+        self.bank = 0
+        self.registers = {}
+        self.calls = []
+        self.fail = set()
+        for name in dir(self):
+            if name.startswith("Dmgr") or name.startswith("Depp"):
+                setattr(self, name, _Function(name, self._logged(name)))
+
+    def _logged(self, name: str):
+        function = getattr(type(self), name).__get__(self)
+
+        def call(*args):
+            self.calls.append(name)
+            if name in self.fail:
+                self.fail.discard(name)
+                return False
+            result = function(*args)
+            return True if result is None else result
+
+        return call
+
+    def get(self, address: int) -> int:
+        return self.registers.get(self._key(address), 0)
+
+    def _key(self, address: int):
+        return self.bank, address
+
+    def _put(self, address: int, value: int) -> None:
+        if self.bank_size is not None and address == self.bank_size - 1:
+            self.bank = value
+        self.registers[self._key(address)] = value
+
+    def _burst(self, address: int, count: int):
+        if address & port_defs.AUTO_INCREMENT_FLAG:
+            start = address & ~port_defs.AUTO_INCREMENT_FLAG
+            return range(start, start + count)
+        return [address] * count
+
+    def DmgrEnumDevices(self, device_count):
+        device_count._obj.value = 1
+
+    def DmgrGetDvc(self, index, device_info):
+        device_info._obj.name = b"Atlys"
+        device_info._obj.connection_string = b"SN:1"
+
+    def DmgrFreeDvcEnum(self):
+        pass
+
+    def DmgrOpen(self, handle, name):
+        handle._obj.value = 1
+
+    def DmgrClose(self, handle):
+        pass
+
+    def DmgrGetLastError(self):
+        return 0
+
+    def DmgrSzFromErc(self, error_code, name, message):
+        pass
+
+    def DeppEnable(self, handle):
+        pass
+
+    def DeppDisable(self, handle):
+        pass
+
+    def DeppPutReg(self, handle, address, value, overlap):
+        self._put(address, value)
+
+    def DeppGetReg(self, handle, address, value, overlap):
+        value._obj.value = self.get(address)
+
+    def DeppPutRegSet(self, handle, pairs, count, overlap):
+        for i in range(count):
+            self._put(pairs[2 * i], pairs[2 * i + 1])
+
+    def DeppGetRegSet(self, handle, addresses, values, count, overlap):
+        for i in range(count):
+            values[i] = self.get(addresses[i])
+
+    def DeppPutRegRepeat(self, handle, address, values, count, overlap):
+        for i, register in enumerate(self._burst(address, count)):
+            self._put(register, values[i])
+
+    def DeppGetRegRepeat(self, handle, address, values, count, overlap):
+        for i, register in enumerate(self._burst(address, count)):
+            values[i] = self.get(register)
+
+
+def open_interface(monkeypatch, board: FakeBoard, **kwargs) -> AtlysInterface:
+    monkeypatch.setattr(atlys_interface.ctypes, "CDLL", lambda path: board)
+    return AtlysInterface(**kwargs)
+
+
+def make_port(name: str, addresses, direction: str = "input") -> IoPort:
+    return IoPort(
+        name=name,
+        address=[f"{address:x}" for address in addresses],
+        direction=direction,
+        bit_width=port_defs.DATA_WIDTH * len(addresses),
+    )
+
+
+def test_failed_bank_switch_is_retried(monkeypatch):
+    board = FakeBoard(BANK_SIZE)
+    board.registers[1, 0x10] = 0x5A
+    fpga = open_interface(monkeypatch, board, bank_select=BankSelect(BANK_SIZE))
+    port = make_port("HIGH", [BANK_SIZE + 0x10], port_defs.ALLOWED_DIRECTIONS[1])
+    board.fail.add("DeppPutReg")
+    assert fpga.read(port) is None
+    assert fpga.read_set(port.address) == [0x5A]
+    assert fpga.read(port) == 0x5A
+
+
+def test_failed_write_set_forgets_bank(monkeypatch):
+    board = FakeBoard(BANK_SIZE)
+    bank_select = BankSelect(BANK_SIZE)
+    fpga = open_interface(monkeypatch, board, bank_select=bank_select)
+    board.fail.add("DeppPutRegSet")
+    assert not fpga.write_set([(BANK_SIZE + 0x10, 1), (0x10, 2)])
+    assert bank_select.bank is None
+    assert fpga.write_set([(BANK_SIZE + 0x10, 3)])
+    assert board.registers[1, 0x10] == 3
+    assert bank_select.bank == 1
+
+
+def test_program_forgets_bank(monkeypatch):
+    board = FakeBoard(BANK_SIZE)
+    bank_select = BankSelect(BANK_SIZE)
+    fpga = open_interface(monkeypatch, board, bank_select=bank_select)
+    assert fpga.write_set([(BANK_SIZE + 0x10, 1)])
+
+    def program_device(bitfile_path):
+        board.bank = 0
+        return True
+
+    monkeypatch.setattr(fpga, "_program_device", program_device)
+    monkeypatch.setattr(atlys_interface, "BOOT_DELAY", 0)
+    assert fpga.program("design.bit")
+    assert bank_select.bank is None
+    assert fpga.write_set([(BANK_SIZE + 0x11, 2)])
+    assert board.registers[1, 0x11] == 2
+
+
+def test_close(monkeypatch):
+    board = FakeBoard()
+    fpga = open_interface(monkeypatch, board)
+    fpga.close()
+    # closing again, e.g. on garbage collection, leaves the closed device alone
+    fpga.close()
+    assert board.calls.count("DmgrClose") == 1
+    assert board.calls.count("DeppDisable") == 1
+
+
+def test_build_id_in_later_bank(monkeypatch):
+    board = FakeBoard(BANK_SIZE)
+    build_id_port = make_port(
+        port_defs.BUILD_ID_KEY,
+        range(BANK_SIZE + 0x29, BANK_SIZE + 0x2D),
+        port_defs.ALLOWED_DIRECTIONS[1],
+    )
+    for i, value in enumerate(build_id_port.encode(0x12345678)):
+        board.registers[1, 0x29 + i] = value
+    fpga = open_interface(
+        monkeypatch,
+        board,
+        build_id=0x12345678,
+        build_id_port=build_id_port,
+        bank_select=BankSelect(BANK_SIZE),
+    )
+    monkeypatch.setattr(fpga, "_program_device", lambda bitfile_path: False)
+    # the loaded build is recognized, so programming is skipped
+    assert fpga.program("design.bit")
+
+
+def test_port_access_transfers(monkeypatch):
+    board = FakeBoard()
+    fpga = open_interface(monkeypatch, board, auto_increment=True)
+    narrow = make_port("NARROW", [0x01])
+    burst = make_port("BURST", [0x02, 0x03])
+    scattered = make_port("SCATTERED", [0x05, 0x04])
+    for port, function in [
+        (narrow, "DeppPutReg"),
+        (burst, "DeppPutRegRepeat"),
+        (scattered, "DeppPutRegSet"),
+    ]:
+        board.calls.clear()
+        assert fpga.write(port, 0x1234)
+        assert board.calls == [function]
+    assert [board.get(address) for address in range(1, 6)] == [
+        0x34,
+        0x34,
+        0x12,
+        0x12,
+        0x34,
+    ]
+
+
+def test_values_beyond_port_are_truncated(monkeypatch):
+    board = FakeBoard()
+    fpga = open_interface(monkeypatch, board, auto_increment=True)
+    for port in [
+        make_port("NARROW", [0x01]),
+        make_port("BURST", [0x02, 0x03]),
+        make_port("SCATTERED", [0x05, 0x04]),
+    ]:
+        assert fpga.write(port, -1)
+        assert fpga.write(port, 0x10000 | 0x5A << 8 * (len(port.address) - 1))
+    assert [board.get(address) for address in range(1, 6)] == [
+        0x5A,
+        0x00,
+        0x5A,
+        0x5A,
+        0x00,
+    ]
+
+
+def test_read_set_bursts_permutations(monkeypatch):
+    board = FakeBoard()
+    board.registers.update({(0, address): address + 0x10 for address in range(8)})
+    fpga = open_interface(monkeypatch, board, auto_increment=True)
+    assert fpga.read_set([3, 1, 2]) == [0x13, 0x11, 0x12]
+    assert board.calls[-1] == "DeppGetRegRepeat"
+    # registers read twice or with gaps are not one burst
+    for addresses in [[1, 1, 2], [1, 3, 4]]:
+        assert fpga.read_set(addresses) == [address + 0x10 for address in addresses]
+        assert board.calls[-1] == "DeppGetRegSet"
@@ -0,0 +1,37 @@
+from conftest import clock_port, io_port
+from usb_interface.bank_select import BankSelect
+
+BANK_SIZE = 0x80
+
+
+def test_group_writes_keeps_program_order():
+    bank_select = BankSelect(BANK_SIZE)
+    pairs = [(0x80, 1), (0x00, 1), (0x81, 2), (0x82, 3), (0x01, 4)]
+    assert bank_select.group_writes(pairs) == [
+        (1, [(0x80, 1)]),
+        (0, [(0x00, 1)]),
+        (1, [(0x81, 2), (0x82, 3)]),
+        (0, [(0x01, 4)]),
+    ]
+
+
+def test_writes_do_not_cross_clock_pulse(make_fpga):
+    fpga = make_fpga(
+        [
+            clock_port("CLK", 0x00, 0x7E),
+            io_port("I_LOW", "input", [0x80]),
+            io_port("I_HIGH", "input", [0x81]),
+        ],
+        bank_select={"address": [f"{BANK_SIZE - 1:x}"]},
+    )
+    ports = fpga.get_port_list()
+    backend = fpga.get_usb_interface()
+    seen = []
+    backend.dut_model = lambda interface, clock, cycles: seen.append(
+        (interface.get_input(ports.I_LOW), interface.get_input(ports.I_HIGH))
+    )
+    backend.write_set([(0x80, 1), (0x00, 1), (0x81, 2)])
+    assert seen == [(1, 0)]
+    assert backend.get_input(ports.I_HIGH) == 2
+    # to bank 1, to bank 0 for the clock, back to bank 1
+    assert backend.bank_select.switches == 3
@@ -0,0 +1,85 @@
+import json
+
+import numpy as np
+import pytest
+
+import board_farm
+from board_farm import BoardFarm
+from conftest import clock_port, io_port
+from fpga_interface import FpgaInterface
+
+
+@pytest.fixture
+def config_path(tmp_path):
+    config_path = tmp_path / "config.json"
+    config = {
+        "fpga_interface": "simulated",
+        "ports": [
+            clock_port("CLK", 0x00, 0x05),
+            io_port("SW", "input", [0x01]),
+            io_port("COUNT", "output", [0x00, 0x01]),
+        ],
+    }
+    config_path.write_text(json.dumps(config))
+    return config_path
+
+
+@pytest.fixture
+def closed(monkeypatch):
+    """
+    Names of the boards closed so far, by device
+    """
+    closed = []
+    close = FpgaInterface.close
+
+    def logged_close(fpga):
+        closed.append(fpga._device)
+        close(fpga)
+
+    monkeypatch.setattr(FpgaInterface, "close", logged_close)
+    return closed
+
+
+@pytest.fixture
+def farm(config_path):
+    with BoardFarm.open(config_path, ["board0", "board1", "board2"]) as farm:
+        for fpga in farm.boards.values():
+            fpga.get_usb_interface().dut_model = echo_model
+        yield farm
+
+
+def echo_model(interface, clock, cycles):
+    ports = interface._port_list
+    interface.set_output(ports.COUNT, interface.get_input(ports.SW) * 2)
+
+
+def test_apply_vectors(farm):
+    inputs = np.zeros(20, dtype=[("SW", "u1")])
+    inputs["SW"] = np.arange(20)
+    outputs = farm.apply_vectors(inputs, "CLK", 1, ["COUNT"], vectors_per_shard=3)
+    assert outputs["COUNT"].tolist() == list(range(0, 40, 2))
+
+
+def test_apply_no_vectors(farm):
+    inputs = np.zeros(0, dtype=[("SW", "u1")])
+    outputs = farm.apply_vectors(inputs, "CLK", 1, ["COUNT"])
+    assert len(outputs) == 0
+    assert outputs.dtype.names == ("COUNT",)
+
+
+def test_close_closes_boards(config_path, closed):
+    with BoardFarm.open(config_path, ["board0", "board1"]):
+        pass
+    assert closed == ["board0", "board1"]
+
+
+def test_failed_open_closes_opened_boards(config_path, closed, monkeypatch):
+    def open_board(json_config_path, device, **kwargs):
+        if device == "board2":
+            raise RuntimeError(f"{device} is not connected")
+        return FpgaInterface(json_config_path, device=device, **kwargs)
+
+    monkeypatch.setattr(board_farm, "FpgaInterface", open_board)
+    with pytest.raises(RuntimeError):
+        BoardFarm.open(config_path, ["board0", "board1", "board2", "board3"])
+    assert closed == ["board0", "board1"]
@@ -0,0 +1,119 @@
+import gc
+import json
+import socket
+
+import pytest
+
+from conftest import clock_port, io_port
+from fpga_broker import DeviceBroker
+from usb_interface.remote_interface import RemoteInterface, encode_message
+
+
+@pytest.fixture
+def backend(make_fpga):
+    fpga = make_fpga(
+        [
+            clock_port("CLK", 0x00, 0x05),
+            io_port("SW", "input", [0x01]),
+            io_port("WIDE_IN", "input", [0x02, 0x03]),
+            io_port("COUNT", "output", [0x00, 0x01]),
+        ]
+    )
+    return fpga.get_usb_interface()
+
+
+@pytest.fixture
+def socket_path(backend, tmp_path):
+    path = tmp_path / "broker.sock"
+    broker = DeviceBroker(backend, path)
+    broker.start()
+    yield path
+    broker.close()
+
+
+def test_round_trips(backend, socket_path):
+    ports = backend._port_list
+    backend.set_output(ports.COUNT, 0xABCD)
+    remote = RemoteInterface(socket_path)
+    try:
+        assert remote.write(ports.WIDE_IN, 0x1234)
+        assert backend.get_input(ports.WIDE_IN) == 0x1234
+        assert remote.read(ports.COUNT) == 0xABCD
+        assert remote.write_clock_cycles(ports.CLK, 3)
+        assert backend.clock_cycles["CLK"] == 3
+        assert bytes(remote.read_block(0x00, 2, increment=False)) == b"\xcd\xcd"
+    finally:
+        remote.close()
+
+
+def test_clients_share_the_backend(backend, socket_path):
+    ports = backend._port_list
+    remotes = [RemoteInterface(socket_path) for _ in range(3)]
+    try:
+        for value, remote in enumerate(remotes):
+            assert remote.write(ports.SW, value + 1)
+            assert backend.get_input(ports.SW) == value + 1
+    finally:
+        for remote in remotes:
+            remote.close()
+
+
+def test_error_replies_keep_request_order(socket_path):
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as connection:
+        connection.connect(str(socket_path))
+        connection.sendall(
+            b"not json\n"
+            + encode_message({"op": "erase", "args": []})
+            + encode_message({"op": "read_set", "args": [0]})
+        )
+        with connection.makefile("rb") as reader:
+            replies = [json.loads(reader.readline()) for _ in range(3)]
+    assert replies[0]["error"].startswith("Malformed request")
+    assert replies[1] == {"error": "Unknown operation erase"}
+    assert replies[2] == {"result": [0]}
+
+
+def test_remote_error(socket_path):
+    remote = RemoteInterface(socket_path)
+    try:
+        with pytest.raises(RuntimeError):
+            remote._request("erase", [])
+    finally:
+        remote.close()
+
+
+@pytest.mark.parametrize(
+    "request_message",
+    [
+        {"op": "read_set"},
+        {"op": "read_set", "args": 5},
+        {"op": "read_set", "args": [0, "1"]},
+        {"op": "write_set", "args": [[1, 2, 3]]},
+        {"op": "write_set", "args": [[1, 256]]},
+        {"op": "write_set", "args": [1, 2]},
+        {"op": "read_block", "args": [0, 2]},
+        {"op": "read_block", "args": [0, -1, True]},
+        {"op": "write_block", "args": [0, "xyz", True]},
+        {"op": "write_block", "args": [0, "00", 1]},
+    ],
+)
+def test_invalid_arguments(socket_path, request_message):
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as connection:
+        connection.settimeout(5)
+        connection.connect(str(socket_path))
+        connection.sendall(
+            encode_message(request_message)
+            + encode_message({"op": "read_set", "args": [0]})
+        )
+        with connection.makefile("rb") as reader:
+            replies = [json.loads(reader.readline()) for _ in range(2)]
+    assert replies[0] == {"error": f"Invalid arguments of {request_message['op']}"}
+    # the scheduler survived the invalid request
+    assert replies[1] == {"result": [0]}
+
+
+@pytest.mark.filterwarnings("error::pytest.PytestUnraisableExceptionWarning")
+def test_failed_connection(tmp_path):
+    with pytest.raises(OSError):
+        RemoteInterface(tmp_path / "missing.sock")
+    gc.collect()
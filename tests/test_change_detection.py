@@ -0,0 +1,78 @@
+import pytest
+
+from port_tools.units import ChangeDetector
+
+SOURCE = """
+module counter (
+    input CLK,
+    input [7:0] LOAD,
+    output [7:0] LOW,
+    output [31:0] COUNT,
+    output DONE
+);
+endmodule
+"""
+
+
+@pytest.fixture
+def fpga(make_design):
+    fpga = make_design(SOURCE, ["CLK"], change_detection=True)
+    # the first poll reads every output in full
+    assert fpga.poll_changes() == {"LOW": 0, "COUNT": 0, "DONE": 0}
+    return fpga
+
+
+def test_unchanged_outputs_are_not_read(fpga):
+    backend = fpga.get_usb_interface()
+    transactions = backend.transactions
+    assert fpga.poll_changes() == {}
+    # the latch write and the bitmap read only
+    assert backend.transactions == transactions + 2
+
+
+def test_changed_port_is_fetched(fpga, monkeypatch):
+    ports = fpga.get_port_list()
+    backend = fpga.get_usb_interface()
+    backend.set_output(ports.COUNT, 0x01000000)
+    read_set = backend.read_set
+    reads = []
+
+    def logged_read_set(addresses):
+        reads.append(addresses)
+        return read_set(addresses)
+
+    monkeypatch.setattr(backend, "read_set", logged_read_set)
+    assert fpga.poll_changes() == {"COUNT": 0x01000000}
+    assert reads[-1] == ports.COUNT.address
+    # the bitmap is cleared by the poll
+    assert fpga.poll_changes() == {}
+
+
+def test_subscribers(fpga):
+    ports = fpga.get_port_list()
+    backend = fpga.get_usb_interface()
+    calls = []
+
+    def callback(port, value):
+        calls.append((port.name, value))
+
+    fpga.subscribe(ports.DONE, callback)
+    backend.set_output(ports.DONE, 1)
+    backend.set_output(ports.LOW, 7)
+    fpga.poll_changes()
+    assert calls == [("DONE", 1)]
+    fpga.unsubscribe(ports.DONE, callback)
+    backend.set_output(ports.DONE, 0)
+    assert fpga.poll_changes() == {"DONE": 0}
+    assert calls == [("DONE", 1)]
+
+
+def test_bitmap_spans_registers():
+    detector = ChangeDetector(
+        address=["20"],
+        bitmap_address=["10", "11"],
+        registers=[f"{address:x}" for address in range(10)],
+    )
+    bitmap = detector.encode_bitmap({1, 8, 9})
+    assert bitmap == [0x02, 0x03]
+    assert detector.get_changed_registers(bitmap) == [1, 8, 9]
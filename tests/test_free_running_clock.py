@@ -0,0 +1,74 @@
+import pytest
+
+from conftest import clock_port
+from host_tools.trace_replay import load_trace
+from usb_interface import simulated_units
+
+MAIN_CLOCK_HZ = 100_000_000
+
+
+@pytest.fixture
+def now(monkeypatch):
+    """
+    Time of the simulated clocks in seconds, advanced by the tests
+    """
+    now = [0.0]
+    monkeypatch.setattr(simulated_units, "perf_counter", lambda: now[0])
+    return now
+
+
+@pytest.fixture
+def fpga(make_fpga, now):
+    port = clock_port("CLK", 0x00, 0x05)
+    port.update(
+        run_address=["20"],
+        divider_address=["21", "22"],
+        cycle_count_address=["20", "21", "22", "23"],
+    )
+    return make_fpga([port], main_clock_hz=MAIN_CLOCK_HZ)
+
+
+@pytest.mark.parametrize(
+    "freq_hz, divider",
+    [(None, 0), (MAIN_CLOCK_HZ, 0), (30_000_000, 3), (25_000_000, 3), (3_000_000, 33)],
+)
+def test_start_rounds_divider_up(fpga, freq_hz, divider):
+    clock = fpga.clock(fpga.get_port_list().CLK)
+    assert clock.start(freq_hz) == MAIN_CLOCK_HZ / (divider + 1)
+    inputs = fpga.get_usb_interface().inputs
+    assert inputs[0x21] | inputs[0x22] << 8 == divider
+
+
+def test_start_rejects_unreachable_frequency(fpga):
+    clock = fpga.clock(fpga.get_port_list().CLK)
+    with pytest.raises(ValueError):
+        clock.start(0)
+    with pytest.raises(ValueError):
+        clock.start(MAIN_CLOCK_HZ / (clock.max_divider + 2))
+    assert not clock.running
+
+
+def test_cycle_count(fpga, now):
+    clock = fpga.clock(fpga.get_port_list().CLK)
+    clock.start(1_000_000)
+    now[0] += 0.001
+    assert clock.cycles == 1000
+    now[0] += 0.002
+    assert clock.stop() == 3000
+    assert not clock.running
+    # stopped, the count holds until the next start restarts it
+    now[0] += 0.001
+    assert clock.cycles == 3000
+    clock.start(1_000_000)
+    now[0] += 0.001
+    assert clock.cycles == 1000
+
+
+def test_recorded(fpga, tmp_path):
+    clock = fpga.clock(fpga.get_port_list().CLK)
+    trace_path = tmp_path / "trace.bin"
+    with fpga.record(trace_path):
+        clock.start()
+        clock.stop()
+    _, records = load_trace(trace_path)
+    assert 0x20 in records["address"].tolist()
@@ -0,0 +1,137 @@
+import re
+
+import pytest
+
+from conftest import clock_port, io_port
+from port_tools.port_manager import PortManager
+from usb_interface.instrumentation import (
+    MAX_LATENCY_BITS,
+    SUB_BUCKET_BITS,
+    InstrumentedInterface,
+    LatencyHistogram,
+    format_prometheus,
+    write_prometheus_textfile,
+)
+from usb_interface.simulated_interface import LatencyModel, SimulatedInterface
+
+# name{labels} value
+SAMPLE_PATTERN = re.compile(r'^[a-z_]+\{([a-z]+="[^"]*",?)*\} [0-9.e+-]+$')
+
+
+@pytest.fixture
+def interface():
+    port_list = PortManager(
+        {
+            "ports": [
+                clock_port("CLK", 0x00, 0x05),
+                io_port("SW", "input", [0x01]),
+                io_port("COUNT", "output", [0x00, 0x01]),
+            ]
+        }
+    ).get_port_list()
+    return InstrumentedInterface(
+        SimulatedInterface(port_list, LatencyModel()), port_list
+    )
+
+
+def test_small_values_have_exact_buckets():
+    for value in range(1 << (SUB_BUCKET_BITS + 1)):
+        index = LatencyHistogram.get_index(value)
+        assert index == value
+        assert LatencyHistogram.get_upper_bound(index) == value
+
+
+def test_bucket_precision():
+    previous_index = 0
+    for exponent in range(SUB_BUCKET_BITS + 1, MAX_LATENCY_BITS):
+        for value in [1 << exponent, (1 << exponent) + 1, (3 << exponent) // 2]:
+            index = LatencyHistogram.get_index(value)
+            bound = LatencyHistogram.get_upper_bound(index)
+            assert value <= bound < value * (1 + 2**-SUB_BUCKET_BITS)
+            # the bucket below ends below the value
+            assert LatencyHistogram.get_upper_bound(index - 1) < value
+            assert index >= previous_index
+            previous_index = index
+    # values beyond the range land in the last bucket
+    histogram = LatencyHistogram()
+    histogram.record(1 << (MAX_LATENCY_BITS + 3))
+    assert histogram.counts[-1] == 1
+
+
+def test_percentiles():
+    histogram = LatencyHistogram()
+    assert histogram.percentile(50) == 0
+    for value in range(1, 101):
+        histogram.record(value * 1000)
+    stats = histogram.to_dict()
+    assert stats["count"] == 100
+    assert stats["min_ns"] == 1000
+    assert stats["max_ns"] == 100000
+    for percent in [50, 90, 99]:
+        expected = percent * 1000
+        assert expected <= stats[f"p{percent}_ns"] < expected * 1.04
+    assert stats["p999_ns"] == 100000
+    buckets = histogram.get_cumulative_buckets()
+    assert buckets[-1][1] == 100
+    assert [count for _, count in buckets] == sorted(count for _, count in buckets)
+
+
+def test_counts_per_operation_and_port(interface):
+    ports = interface.backend._port_list
+    hook_calls = []
+    interface.hooks.append(lambda *args: hook_calls.append(args))
+    interface.write(ports.SW, 3)
+    interface.write_set([(0x01, 4), (0x00, 2)])
+    interface.read_set([0x00, 0x01])
+    stats = interface.stats()
+    assert stats["operations"]["write"]["transactions"] == 1
+    assert stats["operations"]["write_set"]["registers"] == 2
+    assert stats["operations"]["read_set"]["latency"]["count"] == 1
+    assert stats["ports"] == {"SW.write": 2, "CLK.write": 1, "COUNT.read": 2}
+    assert [call[:2] for call in hook_calls] == [
+        ("write", 1),
+        ("write_set", 2),
+        ("read_set", 2),
+    ]
+
+
+def test_prometheus_format(interface):
+    ports = interface.backend._port_list
+    interface.write(ports.SW, 3)
+    interface.read(ports.COUNT)
+    interface.read(ports.COUNT)
+    text = format_prometheus(interface)
+    assert text.endswith("\n")
+    samples = {}
+    for line in text.splitlines():
+        if line.startswith("#"):
+            assert re.match(r"^# (HELP|TYPE) fpga_interface_[a-z_]+ ", line)
+            continue
+        assert SAMPLE_PATTERN.match(line), line
+        name, value = line.rsplit(" ", 1)
+        samples[name] = float(value)
+    assert samples['fpga_interface_transactions_total{operation="read"}'] == 2
+    assert (
+        samples['fpga_interface_port_registers_total{port="COUNT",direction="read"}']
+        == 4
+    )
+    buckets = [
+        value
+        for name, value in samples.items()
+        if name.startswith('fpga_interface_latency_seconds_bucket{operation="read"')
+    ]
+    assert buckets == sorted(buckets)
+    assert buckets[-1] == 2
+    assert (
+        samples['fpga_interface_latency_seconds_bucket{operation="read",le="+Inf"}']
+        == 2
+    )
+    assert samples['fpga_interface_latency_seconds_count{operation="read"}'] == 2
+
+
+def test_write_prometheus_textfile(interface, tmp_path):
+    interface.read_set([0x00])
+    path = tmp_path / "fpga.prom"
+    write_prometheus_textfile(interface, path)
+    assert path.read_text() == format_prometheus(interface)
+    assert [file.name for file in tmp_path.iterdir()] == ["fpga.prom"]
@@ -0,0 +1,127 @@
+import itertools
+
+import numpy as np
+import pytest
+
+from conftest import io_port
+from host_tools import port_capture
+from host_tools.port_capture import PortCapture, get_vcd_identifier
+
+
+def test_vcd_identifiers_are_unique():
+    identifiers = [get_vcd_identifier(i) for i in range(94 * 95 + 1)]
+    assert identifiers[:2] == ["!", '"']
+    assert identifiers[94] == "!!"
+    assert len(set(identifiers)) == len(identifiers)
+    assert all(33 <= ord(c) <= 126 for identifier in identifiers for c in identifier)
+
+
+def test_export_vcd_with_many_ports(make_fpga, tmp_path):
+    fpga = make_fpga([io_port(f"OUT{i}", "output", [i]) for i in range(120)])
+    capture = PortCapture(fpga, list(fpga.get_port_list()), capacity=4)
+    capture.run(sample_count=2)
+    vcd_path = tmp_path / "capture.vcd"
+    capture.export_vcd(vcd_path)
+    variables = [
+        line.split() for line in vcd_path.read_text().splitlines() if line[:4] == "$var"
+    ]
+    assert len({variable[3] for variable in variables}) == 120
+
+
+@pytest.fixture
+def fpga(make_fpga):
+    return make_fpga([io_port("COUNT", "output", [0x00, 0x01])])
+
+
+@pytest.fixture
+def counter(fpga, monkeypatch):
+    """
+    Makes every sample of COUNT read the number of the sample, from 1
+    """
+    backend = fpga.get_usb_interface()
+    count = itertools.count(1)
+
+    def read_set(addresses):
+        return [
+            register
+            for _ in range(len(addresses) // 2)
+            for register in next(count).to_bytes(2, "little")
+        ]
+
+    monkeypatch.setattr(backend, "read_set", read_set)
+
+
+@pytest.fixture
+def clock(fpga, monkeypatch):
+    """
+    Simulated time of the capture loop: every read of the clock takes a
+    microsecond, sleeps and transfers (transfer_time[0] seconds) advance it
+    """
+    now = [0.0]
+    transfer_time = [0.0]
+    backend = fpga.get_usb_interface()
+    read_set = backend.read_set
+
+    def perf_counter():
+        now[0] += 1e-6
+        return now[0]
+
+    def sleep(seconds):
+        now[0] += seconds
+
+    def timed_read_set(addresses):
+        now[0] += transfer_time[0]
+        return read_set(addresses)
+
+    monkeypatch.setattr(port_capture, "perf_counter", perf_counter)
+    monkeypatch.setattr(port_capture, "sleep", sleep)
+    monkeypatch.setattr(backend, "read_set", timed_read_set)
+    return transfer_time
+
+
+def test_ring_buffer_wraps(fpga, counter):
+    capture = PortCapture(fpga, [fpga.get_port_list().COUNT], capacity=4)
+    report = capture.run(sample_count=6)
+    assert report.sample_count == 6
+    assert report.overwritten_samples == 2
+    assert capture.samples()["COUNT"].tolist() == [3, 4, 5, 6]
+    # the overwrites of every run are counted separately
+    assert capture.run(sample_count=3).overwritten_samples == 3
+    samples = capture.samples()
+    assert samples["COUNT"].tolist() == [6, 7, 8, 9]
+    assert (np.diff(samples["timestamp"]) >= 0).all()
+
+
+def test_buffer_mapped_to_file(fpga, counter, tmp_path):
+    file_path = tmp_path / "capture.npy"
+    capture = PortCapture(
+        fpga,
+        [fpga.get_port_list().COUNT],
+        capacity=8,
+        file_path=file_path,
+        samples_per_transfer=2,
+    )
+    assert isinstance(capture.buffer, np.memmap)
+    capture.run(sample_count=6)
+    capture.flush()
+    stored = np.load(file_path)
+    assert stored.dtype.names == ("timestamp", "COUNT")
+    assert stored["COUNT"].tolist() == [1, 2, 3, 4, 5, 6, 0, 0]
+
+
+def test_rate_pacing(fpga, clock):
+    capture = PortCapture(fpga, [fpga.get_port_list().COUNT])
+    report = capture.run(duration=0.0095, rate_hz=1000)
+    assert report.sample_count == 10
+    assert report.dropped_samples == 0
+    assert np.allclose(np.diff(capture.samples()["timestamp"]), 0.001, atol=1e-4)
+
+
+def test_rate_pacing_drops_missed_slots(fpga, clock):
+    # every transfer of two samples takes just over two sampling slots
+    clock[0] = 0.0041
+    capture = PortCapture(fpga, [fpga.get_port_list().COUNT], samples_per_transfer=2)
+    report = capture.run(duration=0.0199, rate_hz=1000)
+    assert report.sample_count == 5 * 2
+    # so the slot following each of the first four transfers is missed
+    assert report.dropped_samples == 4 * 2
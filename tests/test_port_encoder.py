@@ -0,0 +1,95 @@
+from generation_tools.port_encoder import PortEncoder, load_port_groups
+from host_tools.access_profile import AccessProfile
+from port_tools import port_defs
+
+SOURCE = """
+module dut (
+    input CLK,
+    input [7:0] A,
+    input [31:0] WIDE,
+    input [15:0] B,
+    output [7:0] X,
+    output [23:0] Y
+);
+endmodule
+"""
+
+
+def parse(tmp_path, port_groups=()):
+    source_path = tmp_path / "dut.v"
+    source_path.write_text(SOURCE)
+    encoder = PortEncoder()
+    encoder.port_groups = [list(group) for group in port_groups]
+    encoder.parse(source_path, ["CLK"])
+    return encoder
+
+
+def get_addresses(encoder: PortEncoder) -> dict:
+    return {
+        port["name"]: [int(address, 16) for address in port["address"]]
+        for port in encoder.get_encoded_port_list()
+    }
+
+
+def test_declaration_order_without_groups(tmp_path):
+    encoder = parse(tmp_path)
+    assert get_addresses(encoder) == {
+        "CLK": [0],
+        "A": [1],
+        "WIDE": [2, 3, 4, 5],
+        "B": [6, 7],
+        "X": [0],
+        "Y": [1, 2, 3],
+    }
+    assert port_defs.PORT_GROUPS_KEY not in encoder.json_body
+
+
+def test_groups_are_packed_and_aligned(tmp_path, capsys):
+    encoder = parse(tmp_path, [["A", "WIDE", "B", "MISSING"]])
+    assert "MISSING" in capsys.readouterr().out
+    # widest first from an aligned start, so every port of the group is aligned
+    assert get_addresses(encoder) == {
+        "WIDE": [0, 1, 2, 3],
+        "B": [4, 5],
+        "A": [6],
+        "CLK": [7],
+        "X": [0],
+        # ungrouped ports are aligned as well
+        "Y": [4, 5, 6],
+    }
+    assert encoder.json_body[port_defs.PORT_GROUPS_KEY] == [["A", "WIDE", "B"]]
+
+
+def test_port_of_two_groups_stays_in_first(tmp_path):
+    encoder = parse(tmp_path, [["A", "B"], ["B", "WIDE"]])
+    addresses = get_addresses(encoder)
+    assert addresses["B"] == [0, 1]
+    assert addresses["A"] == [2]
+    assert addresses["WIDE"] == [4, 5, 6, 7]
+    assert encoder.json_body[port_defs.PORT_GROUPS_KEY] == [["A", "B"], ["WIDE"]]
+
+
+def test_ports_do_not_straddle_banks():
+    encoder = PortEncoder()
+    encoder.bank_size = 8
+    assert encoder._allocate_input_addresses(5) == ["0", "1", "2", "3", "4"]
+    # would cover the bank select register 7, so the port starts the next bank
+    assert encoder._allocate_input_addresses(3) == ["8", "9", "a"]
+    # wider than a bank, only the bank select registers are skipped
+    assert encoder._allocate_input_addresses(9) == [
+        f"{address:x}" for address in [11, 12, 13, 14, 16, 17, 18, 19, 20]
+    ]
+
+
+def test_load_port_groups(tmp_path):
+    profile = AccessProfile()
+    for _ in range(3):
+        profile.record(["A", "B", "A"])
+    profile.record(["B", "X"])
+    for _ in range(5):
+        profile.record(["WIDE"])
+    profile.record(["X", "Y", "CLK"])
+    profile_path = tmp_path / "profile.json"
+    profile.save(profile_path)
+    # single ports and ports claimed by more frequent transfers form no group
+    assert load_port_groups(profile_path) == [["A", "B"], ["X", "Y", "CLK"]]
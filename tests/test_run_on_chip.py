@@ -0,0 +1,111 @@
+import numpy as np
+import pytest
+
+SOURCE = """
+module adder (
+    input CLK,
+    input [7:0] A,
+    input [7:0] B,
+    input EN,
+    output [15:0] SUM,
+    output [7:0] OTHER
+);
+endmodule
+"""
+
+
+def adder_model(interface, clock, cycles):
+    ports = interface._port_list
+    interface.set_output(
+        ports.SUM, interface.get_input(ports.A) + interface.get_input(ports.B)
+    )
+
+
+@pytest.fixture
+def fpga(make_design):
+    fpga = make_design(
+        SOURCE,
+        ["CLK"],
+        vector_engine={
+            "depth": 8,
+            "clock": None,
+            "inputs": ["A", "B"],
+            "outputs": None,
+        },
+    )
+    fpga.get_usb_interface().dut_model = adder_model
+    return fpga
+
+
+def test_run_on_chip(fpga, monkeypatch):
+    ports = fpga.get_port_list()
+    backend = fpga.get_usb_interface()
+    fpga.write(ports.A, 0x11)
+    blocks = []
+    write_block = backend.write_block
+
+    def logged_write_block(start, data, increment=True):
+        blocks.append(len(data))
+        return write_block(start, data, increment)
+
+    monkeypatch.setattr(backend, "write_block", logged_write_block)
+    vectors = np.array(
+        [(1, 2), (200, 100), (255, 255)], dtype=[("A", "u1"), ("B", "u1")]
+    )
+    outputs = fpga.run_on_chip(vectors, cycles_per_vector=2)
+    assert outputs.dtype.names == ("SUM", "OTHER")
+    assert outputs["SUM"].tolist() == [3, 300, 510]
+    # the stimulus of all vectors is written in one block
+    assert blocks == [6]
+    assert backend.clock_cycles["CLK"] == 6
+    # the host-written inputs are driven again after the run
+    assert backend.get_input(ports.A) == 0x11
+
+
+def test_missing_inputs_are_driven_with_zero(fpga):
+    ports = fpga.get_port_list()
+    vectors = np.array([(5,), (6,)], dtype=[("B", "u1")])
+    outputs = fpga.run_on_chip(vectors, observe=[ports.SUM])
+    assert outputs.dtype.names == ("SUM",)
+    assert outputs["SUM"].tolist() == [5, 6]
+
+
+@pytest.mark.parametrize(
+    "vectors, observe, cycles",
+    [
+        (np.zeros(9, dtype=[("A", "u1")]), None, 1),
+        (np.zeros(1, dtype=[("EN", "u1")]), None, 1),
+        (np.zeros(1, dtype=[("A", "u1")]), ["A"], 1),
+        (np.zeros(1, dtype=[("A", "u1")]), None, 1 << 16),
+    ],
+)
+def test_invalid_runs(fpga, vectors, observe, cycles):
+    ports = fpga.get_port_list()
+    if observe is not None:
+        observe = [ports[name] for name in observe]
+    with pytest.raises(ValueError):
+        fpga.run_on_chip(vectors, observe, cycles)
+
+
+def test_needs_vector_engine(make_design):
+    fpga = make_design(SOURCE, ["CLK"])
+    with pytest.raises(ValueError):
+        fpga.run_on_chip(np.zeros(1, dtype=[("A", "u1")]))
+
+
+@pytest.mark.parametrize(
+    "method, result",
+    [
+        ("write_set", False),
+        ("write_block", False),
+        ("read_set", None),
+        ("read_block", None),
+    ],
+)
+def test_run_on_chip_raises_on_failed_transfer(fpga, monkeypatch, method, result):
+    monkeypatch.setattr(
+        fpga.get_usb_interface(), method, lambda *args, **kwargs: result
+    )
+    vectors = np.array([(1, 2)], dtype=[("A", "u1"), ("B", "u1")])
+    with pytest.raises(RuntimeError):
+        fpga.run_on_chip(vectors)
@@ -0,0 +1,101 @@
+import numpy as np
+import pytest
+
+from host_tools.signature import golden_signature
+from port_tools.units import Misr
+
+SOURCE = """
+module lfsr (
+    input CLK,
+    input [7:0] SEED,
+    output [39:0] STATE,
+    output [7:0] TAP
+);
+endmodule
+"""
+
+
+def make_outputs(count: int, seed: int = 1) -> np.ndarray:
+    generator = np.random.default_rng(seed)
+    outputs = np.zeros(count, dtype=[("STATE", "u8"), ("TAP", "u1")])
+    outputs["STATE"] = generator.integers(0, 1 << 40, count, dtype=np.uint64)
+    outputs["TAP"] = generator.integers(0, 1 << 8, count, dtype=np.uint8)
+    return outputs
+
+
+def reference_signature(ports, misr: Misr, outputs: np.ndarray) -> int:
+    signature = misr.seed
+    for row in outputs:
+        registers = [
+            register
+            for name in misr.ports
+            for register in ports[name].encode(int(row[name]))
+        ]
+        signature = misr.next_signature(signature, registers)
+    return signature
+
+
+@pytest.fixture
+def fpga(make_design):
+    return make_design(SOURCE, ["CLK"], misr={"ports": None, "clock": None})
+
+
+@pytest.mark.parametrize("count", [0, 1, 2, 37, 256])
+def test_golden_signature_matches_reference_model(fpga, count):
+    ports = fpga.get_port_list()
+    misr = fpga._get_design_misr()
+    outputs = make_outputs(count)
+    # 6 registers per edge, folded into the 32-bit signature
+    assert golden_signature(ports, misr, outputs) == reference_signature(
+        ports, misr, outputs
+    )
+
+
+def test_next_signature_feedback():
+    misr = Misr(
+        clock="CLK",
+        ports=["TAP"],
+        polynomial="04c11db7",
+        seed="80000000",
+        address=["0"],
+        signature_address=["0", "1", "2", "3"],
+    )
+    assert misr.next_signature(0x80000000, [0]) == 0x04C11DB7
+    assert misr.next_signature(0x00000001, [0x10]) == 0x00000012
+    # data wider than the signature is folded by XOR
+    assert misr.next_signature(0, [1, 0, 0, 0, 1]) == 0
+
+
+def test_hardware_signature_matches_golden(fpga):
+    ports = fpga.get_port_list()
+    backend = fpga.get_usb_interface()
+    outputs = make_outputs(20)
+    cycle = [0]
+
+    def set_outputs(row):
+        for name in ["STATE", "TAP"]:
+            backend.set_output(ports[name], int(row[name]))
+
+    def dut_model(interface, clock, cycles):
+        cycle[0] += cycles
+        if cycle[0] < len(outputs):
+            set_outputs(outputs[cycle[0]])
+
+    set_outputs(outputs[0])
+    backend.dut_model = dut_model
+    assert fpga.reset_signature()
+    assert fpga.write_clock_cycles(ports.CLK, len(outputs))
+    assert fpga.read_signature() == fpga.golden_signature(outputs)
+    assert fpga.read_signature() != fpga.golden_signature(outputs[:-1])
+
+
+def test_golden_signature_needs_all_ports(fpga):
+    outputs = make_outputs(3)[["STATE"]]
+    with pytest.raises(ValueError):
+        fpga.golden_signature(outputs)
+
+
+def test_design_without_misr(make_design):
+    fpga = make_design(SOURCE, ["CLK"])
+    with pytest.raises(ValueError):
+        fpga.read_signature()
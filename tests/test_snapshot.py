@@ -0,0 +1,46 @@
+import pytest
+
+SOURCE = """
+module counter (
+    input CLK,
+    input [7:0] LOAD,
+    output [7:0] LOW,
+    output [31:0] COUNT,
+    output DONE
+);
+endmodule
+"""
+
+
+@pytest.fixture
+def fpga(make_design):
+    return make_design(SOURCE, ["CLK"], snapshot=True)
+
+
+def test_snapshot_decodes_all_outputs(fpga):
+    ports = fpga.get_port_list()
+    backend = fpga.get_usb_interface()
+    backend.set_output(ports.LOW, 0x5A)
+    backend.set_output(ports.COUNT, 0x12345678)
+    backend.set_output(ports.DONE, 1)
+    transactions = backend.transactions
+    assert fpga.snapshot() == {"LOW": 0x5A, "COUNT": 0x12345678, "DONE": 1}
+    # one latch write, one read of all copies
+    assert backend.transactions == transactions + 2
+
+
+def test_snapshot_registers_hold_latched_values(fpga):
+    ports = fpga.get_port_list()
+    backend = fpga.get_usb_interface()
+    backend.set_output(ports.COUNT, 0x000000FF)
+    assert fpga.snapshot()["COUNT"] == 0x000000FF
+    # the DUT carries on, the frozen copy does not tear
+    backend.set_output(ports.COUNT, 0x00000100)
+    assert ports.COUNT.decode(backend.read_set(ports.COUNT.snapshot_address)) == 0xFF
+    assert fpga.snapshot()["COUNT"] == 0x100
+
+
+def test_snapshot_needs_bank(make_design):
+    fpga = make_design(SOURCE, ["CLK"])
+    with pytest.raises(ValueError):
+        fpga.snapshot()
@@ -0,0 +1,93 @@
+import pytest
+
+SOURCE = """
+module domains (
+    input CLK_A,
+    input CLK_B,
+    input CLK_C,
+    output [7:0] STATE
+);
+endmodule
+"""
+
+
+@pytest.fixture
+def fpga(make_design):
+    return make_design(
+        SOURCE,
+        ["CLK_A", "CLK_B", "CLK_C"],
+        clock_counter_width=16,
+        step_group=["CLK_A", "CLK_B"],
+    )
+
+
+@pytest.fixture
+def written(fpga, monkeypatch):
+    """
+    Address/value pairs of every write_set() call of the backend
+    """
+    backend = fpga.get_usb_interface()
+    write_set = backend.write_set
+    written = []
+
+    def logged_write_set(address_value_pairs):
+        written.append(address_value_pairs)
+        return write_set(address_value_pairs)
+
+    monkeypatch.setattr(backend, "write_set", logged_write_set)
+    return written
+
+
+def test_equal_counts_fire_together(fpga, written):
+    ports = fpga.get_port_list()
+    group = fpga._step_group
+    assert fpga.step({ports.CLK_A: 300, ports.CLK_B: 300})
+    # one transfer: the shared count, then the select register firing both clocks
+    assert written == [group.get_step_registers(["CLK_A", "CLK_B"], 300)]
+    assert written[0][-1] == (group.address[-1], 0b11)
+    assert fpga.get_usb_interface().clock_cycles == {
+        "CLK_A": 300,
+        "CLK_B": 300,
+        "CLK_C": 0,
+    }
+
+
+def test_distinct_counts_and_ungrouped_clocks(fpga, written):
+    ports = fpga.get_port_list()
+    group = fpga._step_group
+    assert fpga.step({ports.CLK_A: 2, ports.CLK_B: 5, ports.CLK_C: 7})
+    # still one transfer, the ungrouped clock written as by write_clock_cycles()
+    assert written == [
+        list(zip(ports.CLK_C.address, ports.CLK_C.encode(7)))
+        + group.get_step_registers(["CLK_A"], 2)
+        + group.get_step_registers(["CLK_B"], 5)
+    ]
+    assert fpga.get_usb_interface().clock_cycles == {"CLK_A": 2, "CLK_B": 5, "CLK_C": 7}
+
+
+def test_zero_counts_are_skipped(fpga, written):
+    ports = fpga.get_port_list()
+    assert fpga.step({ports.CLK_A: 0, ports.CLK_C: 0})
+    assert written == []
+    assert fpga.step({ports.CLK_A: 0, ports.CLK_B: 1})
+    assert written == [fpga._step_group.get_step_registers(["CLK_B"], 1)]
+
+
+def test_count_limit(fpga, written):
+    ports = fpga.get_port_list()
+    # the grouped count register is as wide as the clock counters
+    with pytest.raises(ValueError):
+        fpga.step({ports.CLK_A: 1 << 16})
+    with pytest.raises(ValueError):
+        fpga.step({ports.CLK_C: 1 << 16})
+    assert written == []
+
+
+def test_without_step_group(make_design):
+    fpga = make_design(SOURCE, ["CLK_A", "CLK_B", "CLK_C"])
+    ports = fpga.get_port_list()
+    backend = fpga.get_usb_interface()
+    transactions = backend.transactions
+    assert fpga.step({ports.CLK_A: 3, ports.CLK_B: 3})
+    assert backend.transactions == transactions + 1
+    assert backend.clock_cycles == {"CLK_A": 3, "CLK_B": 3, "CLK_C": 0}
@@ -0,0 +1,60 @@
+import numpy as np
+
+from conftest import clock_port, io_port
+from host_tools.trace_replay import get_runs, load_trace, replay_trace
+from usb_interface.trace_recorder import TRACE_CLOCK, TRACE_WRITE
+from usb_interface.usb_interface import UsbInterface
+
+
+def make_ports():
+    return [
+        clock_port("CLK", 0x00, 0x05),
+        io_port("SW", "input", [0x01]),
+        io_port("COUNT", "output", [0x00, 0x01]),
+    ]
+
+
+def test_clock_writes_end_runs(make_fpga, tmp_path):
+    fpga = make_fpga(make_ports())
+    ports = fpga.get_port_list()
+    trace_path = tmp_path / "trace.bin"
+    inputs = np.array([(1,), (2,)], dtype=[("SW", "u1")])
+    with fpga.record(trace_path):
+        fpga.apply_vectors(inputs, ports.CLK, 1, [])
+    _, records = load_trace(trace_path)
+    assert records["operation"].tolist() == [
+        TRACE_WRITE,
+        TRACE_CLOCK,
+        TRACE_WRITE,
+        TRACE_CLOCK,
+    ]
+    # the empty reads of the vectors are not recorded
+    assert list(get_runs(records, 16)) == [(0, 2), (2, 4)]
+
+
+def test_replay(make_fpga, tmp_path):
+    fpga = make_fpga(make_ports())
+    ports = fpga.get_port_list()
+    backend = fpga.get_usb_interface()
+    trace_path = tmp_path / "trace.bin"
+    backend.set_output(ports.COUNT, 0x0102)
+    with fpga.record(trace_path):
+        fpga.write(ports.SW, 3)
+        fpga.write_clock_cycles(ports.CLK, 2)
+        fpga.read(ports.COUNT)
+    backend.set_output(ports.COUNT, 0x0103)
+    report = fpga.replay(trace_path)
+    assert report.record_count == 4
+    assert report.transfer_count == 2
+    assert backend.clock_cycles["CLK"] == 4
+    assert report.mismatches["address"].tolist() == [0x00]
+    assert report.mismatches["observed"].tolist() == [0x03]
+
+
+def test_replay_on_backend_without_results(make_fpga, tmp_path):
+    fpga = make_fpga(make_ports())
+    trace_path = tmp_path / "trace.bin"
+    with fpga.record(trace_path):
+        fpga.write(fpga.get_port_list().SW, 3)
+    report = replay_trace(UsbInterface(), trace_path)
+    assert report.record_count == 1
@@ -0,0 +1,100 @@
+import pytest
+
+from conftest import clock_port, io_port
+
+
+@pytest.fixture
+def fpga(make_fpga):
+    return make_fpga(
+        [
+            clock_port("CLK", 0x00, 0x05),
+            io_port("SW", "input", [0x01]),
+            io_port("WIDE_IN", "input", [0x02, 0x03]),
+            io_port("COUNT", "output", [0x00, 0x01]),
+        ],
+        shadow_cache=True,
+    )
+
+
+def test_flush_coalesces_runs(fpga):
+    ports = fpga.get_port_list()
+    backend = fpga.get_usb_interface()
+    backend.set_output(ports.COUNT, 0x1234)
+    transaction = fpga.transaction()
+    transaction.write(ports.SW, 0x5A)
+    transaction.write(ports.WIDE_IN, 0xBEEF)
+    count = transaction.read(ports.COUNT)
+    transaction.write_clock_cycles(ports.CLK, 3)
+    assert len(transaction) == 3
+    assert not count.done()
+    assert transaction.flush()
+    assert backend.transactions == 3
+    assert count.value == 0x1234
+    assert backend.get_input(ports.WIDE_IN) == 0xBEEF
+    assert backend.clock_cycles["CLK"] == 3
+
+
+def test_flush_updates_cache(fpga):
+    ports = fpga.get_port_list()
+    with fpga.batch() as batch:
+        batch.write(ports.SW, 0x5A)
+        # queued values are served before the flush
+        assert batch.read(ports.SW).value == 0x5A
+    assert fpga.read(ports.SW) == 0x5A
+    transactions = fpga.get_usb_interface().transactions
+    assert fpga.write(ports.SW, 0x5A)
+    assert fpga.get_usb_interface().transactions == transactions
+
+
+def test_redundant_pending_writes_are_counted(fpga):
+    ports = fpga.get_port_list()
+    fpga.write(ports.SW, 0x11)
+    transaction = fpga.transaction()
+    # dropped against the cached value, then against the queued one
+    transaction.write(ports.SW, 0x11)
+    transaction.write(ports.SW, 0x22)
+    assert transaction.write(ports.SW, 0x22).success
+    assert len(transaction) == 1
+    assert fpga.cache_stats()["dropped_writes"] == 2
+    # the write of the cached value undoes the queued one, so it is kept
+    transaction.write(ports.SW, 0x11)
+    assert fpga.cache_stats()["dropped_writes"] == 2
+    assert transaction.flush()
+    assert fpga.get_usb_interface().get_input(ports.SW) == 0x11
+
+
+def test_abort_keeps_cache(fpga):
+    ports = fpga.get_port_list()
+    backend = fpga.get_usb_interface()
+    fpga.write(ports.SW, 0x11)
+    with pytest.raises(RuntimeError):
+        with fpga.batch() as batch:
+            batch.write(ports.SW, 0x22)
+            raise RuntimeError("abort")
+    assert backend.get_input(ports.SW) == 0x11
+    assert fpga.read(ports.SW) == 0x11
+    # the write the aborted batch dropped is not redundant
+    fpga.write(ports.SW, 0x22)
+    assert backend.get_input(ports.SW) == 0x22
+
+
+def test_failed_flush_invalidates_written_ports(fpga):
+    ports = fpga.get_port_list()
+    backend = fpga.get_usb_interface()
+    fpga.write(ports.SW, 0x11)
+    backend.write_set = lambda address_value_pairs: False
+    transaction = fpga.transaction()
+    transaction.write(ports.SW, 0x22)
+    assert not transaction.flush()
+    assert fpga.cache_stats()["entries"] == 0
+
+
+def test_write_masked_needs_known_value(fpga):
+    ports = fpga.get_port_list()
+    backend = fpga.get_usb_interface()
+    with pytest.raises(ValueError):
+        fpga.write_masked(ports.SW, 0x0F, 0x0F)
+    fpga.write_masked(ports.SW, 0x0F, 0x0F, base=0xA0)
+    assert backend.get_input(ports.SW) == 0xAF
+    fpga.write_masked(ports.SW, 0x50, 0xF0)
+    assert backend.get_input(ports.SW) == 0x5F
@@ -0,0 +1,74 @@
+import numpy as np
+import pytest
+
+from conftest import clock_port, io_port
+
+
+@pytest.fixture
+def fpga(make_fpga):
+    return make_fpga(
+        [
+            clock_port("CLK", 0x00, 0x05),
+            io_port("SW", "input", [0x01]),
+            io_port("WIDE_IN", "input", [0x02, 0x03]),
+            io_port("COUNT", "output", [0x00, 0x01]),
+        ],
+        shadow_cache=True,
+    )
+
+
+def echo_model(interface, clock, cycles):
+    ports = interface._port_list
+    interface.set_output(ports.COUNT, interface.get_input(ports.WIDE_IN))
+
+
+def test_apply_vectors(fpga):
+    ports = fpga.get_port_list()
+    fpga.get_usb_interface().dut_model = echo_model
+    inputs = np.array([(1, 0x100), (2, 0x200)], dtype=[("SW", "u1"), ("WIDE_IN", "u2")])
+    outputs = fpga.apply_vectors(inputs, ports.CLK, 1, [ports.COUNT])
+    assert outputs["COUNT"].tolist() == [0x100, 0x200]
+    assert fpga.get_usb_interface().clock_cycles["CLK"] == 2
+
+
+def test_apply_vectors_without_observed_ports(fpga):
+    ports = fpga.get_port_list()
+    inputs = np.array([(1,), (2,)], dtype=[("SW", "u1")])
+    outputs = fpga.apply_vectors(inputs, ports.CLK, 1, [])
+    assert len(outputs) == 2
+    assert fpga.get_usb_interface().get_input(ports.SW) == 2
+
+
+def test_cache_after_apply_vectors(fpga):
+    ports = fpga.get_port_list()
+    backend = fpga.get_usb_interface()
+    fpga.write(ports.SW, 7)
+    inputs = np.array([(1,), (2,)], dtype=[("SW", "u1")])
+    fpga.apply_vectors(inputs, ports.CLK, 1, [])
+    fpga.write(ports.SW, 7)
+    assert backend.get_input(ports.SW) == 7
+
+
+def test_cache_after_replay(fpga, tmp_path):
+    ports = fpga.get_port_list()
+    backend = fpga.get_usb_interface()
+    trace_path = tmp_path / "trace.bin"
+    with fpga.record(trace_path):
+        fpga.write(ports.SW, 3)
+    fpga.write(ports.SW, 7)
+    report = fpga.replay(trace_path)
+    assert report.record_count == 1
+    assert backend.get_input(ports.SW) == 3
+    fpga.write(ports.SW, 7)
+    assert backend.get_input(ports.SW) == 7
+
+
+@pytest.mark.parametrize("method, result", [("write_set", False), ("read_set", None)])
+def test_apply_vectors_raises_on_failed_transfer(fpga, monkeypatch, method, result):
+    ports = fpga.get_port_list()
+    monkeypatch.setattr(
+        fpga.get_usb_interface(), method, lambda *args, **kwargs: result
+    )
+    inputs = np.array([(1,), (2,)], dtype=[("SW", "u1")])
+    with pytest.raises(RuntimeError):
+        fpga.apply_vectors(inputs, ports.CLK, 1, [ports.COUNT])
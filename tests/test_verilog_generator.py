@@ -0,0 +1,212 @@
+import json
+from pathlib import Path
+
+import pytest
+
+from generation_tools.port_encoder import PortEncoder
+from generation_tools.verilog_generator import VerilogGenerator
+
+# HDL templates and interfaces are located relative to the repository root
+REPO_PATH = Path(__file__).resolve().parent.parent
+
+SOURCE = """
+module dut (
+    input CLK_A,
+    input [7:0] SW,
+    input [15:0] WIDE_IN,
+    output [7:0] LED,
+    output [23:0] COUNT
+);
+endmodule
+"""
+
+
+@pytest.fixture
+def generate(tmp_path, monkeypatch):
+    """
+    Returns a function generating the JSON config and top module of a
+    source, keyword arguments are passed to PortEncoder.parse_to_file()
+    """
+    monkeypatch.chdir(REPO_PATH)
+
+    def generate(source: str = SOURCE, clocks=("CLK_A",), **kwargs):
+        source_path = tmp_path / "dut.v"
+        source_path.write_text(source)
+        config_path = tmp_path / "dut_config.json"
+        PortEncoder().parse_to_file(
+            source_path, list(clocks), tmp_path, "atlys", **kwargs
+        )
+        VerilogGenerator().create_top_module(
+            "atlys", source_path, config_path, tmp_path
+        )
+        config = json.loads(config_path.read_text())
+        ports = {port["name"]: port for port in config["ports"]}
+        return config, ports, (tmp_path / "top_dut.v").read_text()
+
+    return generate
+
+
+def registers(mux: str, addresses) -> str:
+    """
+    Concatenation of the mux registers of a port, most significant first
+    """
+    return ", ".join(f"{mux}[{int(address, 16)}]" for address in reversed(addresses))
+
+
+def test_dut_wired_to_allocated_registers(generate):
+    config, ports, top = generate(port_groups=[["SW", "WIDE_IN"]])
+    assert ports["WIDE_IN"]["address"] == ["0", "1"]
+    assert ports["SW"]["address"] == ["2"]
+    assert ".SW(inputs[2])" in top
+    assert (
+        f"assign WIDE_IN_WIRE = {{{registers('inputs', ports['WIDE_IN']['address'])}}};"
+        in top
+    )
+    assert (
+        f"assign {{{registers('outputs', ports['COUNT']['address'])}}} = COUNT_WIRE;"
+        in top
+    )
+    assert f".LED(outputs[{int(ports['LED']['address'][0], 16)}])" in top
+
+
+def test_clock_registers_compare_their_address(generate):
+    _, ports, top = generate(port_groups=[["SW", "WIDE_IN"]])
+    clock = ports["CLK_A"]
+    address = int(clock["address"][-1], 16)
+    busy_address = int(clock["busy_address"], 16)
+    assert f"CLK_A_GEN_WR <= WR_STB && ADDR == 8'h{address:x};" in top
+    assert f".CNT({{inputs[{address}]}})" in top
+    assert f"assign outputs[{busy_address}] = " in top
+    # the register muxes end at the highest allocated address
+    input_top = max(
+        int(address, 16)
+        for port in ports.values()
+        if port["direction"] == "input"
+        for address in port["address"]
+    )
+    assert f"reg [7:0] inputs [{input_top}:0];" in top
+    assert f"wire [7:0] outputs [{busy_address}:0];" in top
+
+
+def test_snapshot_bank_wiring(generate):
+    config, ports, top = generate(snapshot=True)
+    address = int(config["snapshot"]["address"][0], 16)
+    assert f"if (WR_STB && ADDR == 8'h{address:x}) begin" in top
+    outputs = [port for port in ports.values() if port["direction"] == "output"]
+    for port in outputs:
+        for source, copy in zip(port["address"], port["snapshot_address"]):
+            index = int(source, 16)
+            assert f"OUTPUT_SNAPSHOT[{index}] <= outputs[{index}];" in top
+            assert f"assign outputs[{int(copy, 16)}] = OUTPUT_SNAPSHOT[{index}];" in top
+
+
+def test_change_detector_wiring(generate):
+    config, _, top = generate(change_detection=True)
+    detection = config["change_detection"]
+    address = int(detection["address"][0], 16)
+    assert f"if (WR_STB && ADDR == 8'h{address:x}) begin" in top
+    for i, register in enumerate(detection["registers"]):
+        index = int(register, 16)
+        assert (
+            f"assign CHANGE_NEW[{i}] = |(outputs[{index}] ^ CHANGE_PREV[{i}]);" in top
+        )
+        assert f"CHANGE_PREV[{i}] <= outputs[{index}];" in top
+    for i, bitmap_address in enumerate(detection["bitmap_address"]):
+        assert (
+            f"assign outputs[{int(bitmap_address, 16)}] = CHANGE_LATCHED[{8 * i + 7}:{8 * i}];"
+            in top
+        )
+
+
+def test_vector_engine_wiring(generate):
+    config, ports, top = generate(
+        vector_engine={
+            "depth": 8,
+            "clock": None,
+            "inputs": ["SW", "WIDE_IN"],
+            "outputs": ["COUNT"],
+        }
+    )
+    engine = config["vector_engine"]
+    address = int(engine["address"][0], 16)
+    assert f".START(WR_STB && ADDR == 8'h{address:x} && DATA_RX[0])," in top
+    assert (
+        f".STIM_WR(WR_STB && ADDR == 8'h{int(engine['stimulus_address'][0], 16):x}),"
+        in top
+    )
+    assert (
+        f".RESP_RD(RD_STB && ADDR == 8'h{int(engine['response_address'][0], 16):x}),"
+        in top
+    )
+    assert f".DATA_OUT(outputs[{int(engine['response_address'][0], 16)}])," in top
+    # stimulus words drive the inputs in engine order while a run is active
+    assert (
+        "assign SW_WIRE = VEC_ACTIVE ? VEC_STIMULUS[7:0] : {inputs[%d]};"
+        % int(ports["SW"]["address"][0], 16)
+        in top
+    )
+    assert (
+        f"assign WIDE_IN_WIRE = VEC_ACTIVE ? VEC_STIMULUS[23:8] : {{{registers('inputs', ports['WIDE_IN']['address'])}}};"
+        in top
+    )
+    assert (
+        f"assign VEC_RESPONSE = {{{registers('outputs', ports['COUNT']['address'])}}};"
+        in top
+    )
+    assert "assign CLK_A_WIRE = CLK_A_GEN_CLK | (VEC_CLK_EN ? CLK : 1'b0);" in top
+
+
+def test_misr_wiring(generate):
+    config, ports, top = generate(misr={"ports": ["LED", "COUNT"], "clock": None})
+    misr = config["misr"]
+    address = int(misr["address"][0], 16)
+    assert f"MISR_RESET <= WR_STB && ADDR == 8'h{address:x};" in top
+    assert ".CLK(CLK_A_WIRE)," in top
+    assert ".DATA_WIDTH(32)," in top
+    # port order, least significant register of the first port lowest
+    data = registers("outputs", ports["LED"]["address"] + ports["COUNT"]["address"])
+    assert f".DATA({{{data}}})," in top
+    assert (
+        f"assign {{{registers('outputs', misr['signature_address'])}}} = MISR_SIGNATURE;"
+        in top
+    )
+
+
+def test_step_group_wiring(generate):
+    source = SOURCE.replace("input CLK_A,", "input CLK_A,\n    input CLK_B,")
+    config, ports, top = generate(
+        source, ["CLK_A", "CLK_B"], step_group=["CLK_B", "CLK_A"]
+    )
+    group = config["step_group"]
+    select_address = int(group["address"][-1], 16)
+    assert f"STEP_TRG <= WR_STB && ADDR == 8'h{select_address:x};" in top
+    assert (
+        f"wire [7:0] STEP_COUNT = {{inputs[{int(group['count_address'][0], 16)}]}};"
+        in top
+    )
+    # bit i of the select register fires clocks[i]
+    for bit, name in enumerate(group["clocks"]):
+        assert (
+            f"assign {name}_GEN_TRG = {name}_GEN_WR || (STEP_TRG && STEP_SELECT[{bit}]);"
+            in top
+        )
+        address = int(ports[name]["address"][-1], 16)
+        assert f".CNT(STEP_TRG ? STEP_COUNT : {{inputs[{address}]}})," in top
+
+
+def test_bank_select_wiring(generate):
+    # 128 registers of WIDE_IN overflow the first bank of a burst interface
+    source = SOURCE.replace("input [15:0] WIDE_IN", "input [1023:0] WIDE_IN")
+    config, ports, top = generate(source, auto_increment=True)
+    assert config["bank_select"]["address"] == ["7f"]
+    addresses = [int(address, 16) for address in ports["WIDE_IN"]["address"]]
+    assert 0x7F not in addresses and max(addresses) > 0x7F
+    # the bank register is written in every bank, at the address within it
+    assert "if (WR_STB && ADDR[6:0] == 7'h7f)\n        BANK <= DATA_RX;" in top
+    assert "wire [14:0] BANK_ADDR = {BANK, ADDR[6:0]};" in top
+    # everything else compares and indexes the banked address
+    clock_address = int(ports["CLK_A"]["address"][-1], 16)
+    assert f"CLK_A_GEN_WR <= WR_STB && BANK_ADDR == 15'h{clock_address:x};" in top
+    assert "inputs[BANK_ADDR] <= DATA_RX;" in top
+    assert "assign DATA_TX = outputs[BANK_ADDR];" in top
+    assert f"reg [7:0] inputs [{max(addresses)}:0];" in top
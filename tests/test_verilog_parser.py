@@ -0,0 +1,117 @@
+import json
+
+import pytest
+
+from generation_tools import verilog_parser
+from generation_tools.verilog_parser import VerilogPort, hash_file, parse_module
+
+ANSI_SOURCE = """
+`timescale 1ns / 1ps
+/* module decoy(input [99:0] X); */
+module alu #(
+    parameter WIDTH = 12,
+    parameter DEPTH = WIDTH * 2 + (1 << 2), // 28
+    parameter [7:0] MODE = 8'h0f
+) (
+    input wire CLK,
+    input wire signed [WIDTH-1:0] A,
+                                  B,
+    /* inputs end here,
+       output [3:0] NOT_A_PORT, */
+    output reg [DEPTH - 1 : 0] RESULT,
+    output logic [$clog2(DEPTH):0] INDEX,
+    inout [WIDTH/4-1:0] BUS
+);
+    localparam HIDDEN = 3;
+    input_buffer buffer (.input_data(A));
+endmodule
+"""
+
+NON_ANSI_SOURCE = """
+module fifo (clk, data_in, data_out, level, sda);
+    parameter W = 8;
+    localparam D = W << 1;
+    input clk;
+    input [W-1:0] data_in;
+    output reg [W - 1:0] data_out;
+    output [$clog2(D):0] level;
+    inout sda;
+    wire [D-1:0] internal;
+
+    function [3:0] count;
+        input [D-1:0] value;
+        count = 0;
+    endfunction
+endmodule
+"""
+
+
+def parse(tmp_path, source: str, cache_dir=None):
+    source_path = tmp_path / "source.v"
+    source_path.write_text(source)
+    return parse_module(source_path, cache_dir)
+
+
+def test_multi_line_ansi_header(tmp_path):
+    module = parse(tmp_path, ANSI_SOURCE)
+    assert module.name == "alu"
+    assert module.parameters == {"WIDTH": 12, "DEPTH": 28, "MODE": 0x0F}
+    assert module.ports == [
+        VerilogPort("CLK", "input", 1, False),
+        VerilogPort("A", "input", 12, True),
+        VerilogPort("B", "input", 12, True),
+        VerilogPort("RESULT", "output", 28, False),
+        VerilogPort("INDEX", "output", 6, False),
+        VerilogPort("BUS", "inout", 3, False),
+    ]
+
+
+def test_non_ansi_header(tmp_path):
+    module = parse(tmp_path, NON_ANSI_SOURCE)
+    assert module.name == "fifo"
+    assert module.parameters == {"W": 8, "D": 16}
+    # header order, declarations inside the function are not ports
+    assert module.ports == [
+        VerilogPort("clk", "input", 1, False),
+        VerilogPort("data_in", "input", 8, False),
+        VerilogPort("data_out", "output", 8, False),
+        VerilogPort("level", "output", 5, False),
+        VerilogPort("sda", "inout", 1, False),
+    ]
+
+
+def test_syntax_error_reports_line(tmp_path):
+    with pytest.raises(ValueError, match=r"source.v:3:"):
+        parse(tmp_path, "module broken (\n    input [3:0] A,\n    input [3:] B\n);\n")
+
+
+def test_parse_cache(tmp_path, monkeypatch):
+    cache_dir = tmp_path / "cache"
+    module = parse(tmp_path, ANSI_SOURCE, cache_dir)
+    source_path = tmp_path / "source.v"
+    cache_path = cache_dir / f"{hash_file(source_path)}.json"
+    assert cache_path.exists()
+
+    def parse_again(self, file_path):
+        raise AssertionError("cached source parsed again")
+
+    with monkeypatch.context() as patch:
+        patch.setattr(verilog_parser.VerilogParser, "parse", parse_again)
+        assert parse_module(source_path, cache_dir) == module
+    # a changed source gets its own entry
+    assert parse(tmp_path, NON_ANSI_SOURCE, cache_dir).name == "fifo"
+    assert len(list(cache_dir.iterdir())) == 2
+
+
+@pytest.mark.parametrize("entry", ["{", '{"version": 0}', "[]"])
+def test_unusable_cache_entries_are_replaced(tmp_path, entry):
+    cache_dir = tmp_path / "cache"
+    cache_dir.mkdir()
+    source_path = tmp_path / "source.v"
+    source_path.write_text(NON_ANSI_SOURCE)
+    cache_path = cache_dir / f"{hash_file(source_path)}.json"
+    cache_path.write_text(entry)
+    assert parse_module(source_path, cache_dir).name == "fifo"
+    cached = json.loads(cache_path.read_text())
+    assert cached["version"] == verilog_parser.PARSE_CACHE_VERSION
+    assert cached["name"] == "fifo"
@@ -0,0 +1,62 @@
+import pytest
+
+from conftest import clock_port, io_port
+from port_tools import port_defs
+
+
+@pytest.fixture
+def fpga(make_fpga):
+    return make_fpga(
+        [
+            clock_port("CLK", 0x00, 0x05),
+            io_port("COUNT", "output", [0x00, 0x01]),
+        ],
+        wait_unit={
+            "select_address": ["10"],
+            "mask_address": ["11", "12", "13", "14"],
+            "value_address": ["15", "16", "17", "18"],
+            "timeout_address": ["19", "1a", "1b", "1c"],
+            "address": ["1d"],
+            "status_address": ["10"],
+        },
+    )
+
+
+def read_status(fpga) -> int:
+    return fpga.get_usb_interface().read_set([0x10])[0]
+
+
+def test_hit_halts_clocks(fpga):
+    ports = fpga.get_port_list()
+    backend = fpga.get_usb_interface()
+    backend.set_output(ports.COUNT, 0x0105)
+    assert fpga.wait_for(ports.COUNT, 0xFF, 0x05, clock=ports.CLK, cycles=3)
+    assert read_status(fpga) == port_defs.WAIT_STATUS_HIT
+    # the DUT is held in the matching state until the clocks are resumed
+    assert fpga.resume_clocks()
+    assert read_status(fpga) == 0
+
+
+def test_unit_timeout(fpga):
+    ports = fpga.get_port_list()
+    assert not fpga.wait_for(
+        ports.COUNT, 0xFF, 0x05, timeout=2, clock=ports.CLK, cycles=5
+    )
+    assert read_status(fpga) == port_defs.WAIT_STATUS_TIMEOUT
+
+
+def test_host_timeout_releases_unit(fpga):
+    ports = fpga.get_port_list()
+    assert not fpga.wait_for(ports.COUNT, 0xFF, 0x05, host_timeout=0.01)
+    # released, so a later match can't halt the clocks
+    assert not read_status(fpga) & port_defs.WAIT_STATUS_WAITING
+
+
+@pytest.mark.parametrize(
+    "mask, value, timeout",
+    [(1 << 32, 0, None), (0xFF, 1 << 32, None), (0xFF, -1, None), (0xFF, 0, 1 << 32)],
+)
+def test_out_of_range_arguments(fpga, mask, value, timeout):
+    ports = fpga.get_port_list()
+    with pytest.raises(ValueError):
+        fpga.wait_for(ports.COUNT, mask, value, timeout=timeout)
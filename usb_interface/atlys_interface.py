@@ -2,11 +2,15 @@ import logging
 import ctypes
 import os
 import subprocess
+from collections import namedtuple
 from re import search
 from sys import stdout
-from time import sleep
+from time import monotonic, sleep
+from typing import List, Tuple
 
+from port_tools import port_defs
 from port_tools.port import IoPort, ClockPort
+from .bank_select import BankSelect
 from .usb_interface import UsbInterface
 
 DMGR_DLL_PATH = os.path.join(os.path.dirname(__file__), "..\\lib64\\dmgr.dll")
@@ -22,6 +26,10 @@ DEVICE_NAME = "Atlys"
 JTAG_PROGRAM_EXE_PATH = os.path.join(
     os.path.dirname(__file__), "..\\binaries\\djtgcfg.exe"
 )
+# boot wait after programming a design without build ID register
+BOOT_DELAY = 5
+BOOT_TIMEOUT = 10
+BOOT_POLL_INTERVAL = 0.01
 
 
 class DVT(ctypes.Structure):
@@ -31,71 +39,189 @@ class DVT(ctypes.Structure):
     ]
 
 
+DeviceInfo = namedtuple("DeviceInfo", ["name", "connection_string"])
+
+
+def _load_dmgr_lib():
+    dmgr_lib = ctypes.CDLL(str(DMGR_DLL_PATH))
+    dmgr_lib.DmgrEnumDevices.argtypes = [ctypes.POINTER(ctypes.c_int)]
+    dmgr_lib.DmgrEnumDevices.restype = ctypes.c_bool
+    dmgr_lib.DmgrGetDvc.argtypes = [ctypes.c_int, ctypes.POINTER(DVT)]
+    dmgr_lib.DmgrGetDvc.restype = ctypes.c_bool
+    dmgr_lib.DmgrFreeDvcEnum.argtypes = None
+    dmgr_lib.DmgrOpen.argtypes = [
+        ctypes.POINTER(ctypes.c_uint32),
+        ctypes.c_char_p,
+    ]
+    dmgr_lib.DmgrOpen.restype = ctypes.c_bool
+    dmgr_lib.DmgrClose.argtypes = [ctypes.c_uint32]
+    dmgr_lib.DmgrGetLastError.argtypes = None
+    dmgr_lib.DmgrGetLastError.restype = ctypes.c_int
+    dmgr_lib.DmgrSzFromErc.argtypes = [
+        ctypes.c_int,
+        ctypes.c_char_p,
+        ctypes.c_char_p,
+    ]
+    dmgr_lib.DmgrSzFromErc.restype = ctypes.c_bool
+    return dmgr_lib
+
+
+def enumerate_devices(dmgr_lib=None) -> List[DeviceInfo]:
+    """
+    Returns the name and connection string (e.g. "SN:210011A1B2C3") of every
+    connected Digilent device, in enumeration order
+    """
+    dmgr_lib = dmgr_lib or _load_dmgr_lib()
+    device_num = ctypes.c_int()
+    if not dmgr_lib.DmgrEnumDevices(ctypes.byref(device_num)):
+        return []
+    devices = []
+    for device in range(device_num.value):
+        device_info = DVT()
+        if dmgr_lib.DmgrGetDvc(ctypes.c_int(device), ctypes.byref(device_info)):
+            devices.append(
+                DeviceInfo(
+                    device_info.name.decode(), device_info.connection_string.decode()
+                )
+            )
+    dmgr_lib.DmgrFreeDvcEnum()
+    return devices
+
+
+class _PortAccess(object):
+    """
+    Precompiled register addresses and reusable ctypes buffers of a port
+    """
+
+    __slots__ = (
+        "count",
+        "bank",
+        "address",
+        "burst_address",
+        "addresses",
+        "values",
+        "pairs",
+    )
+
+    def __init__(
+        self, addresses: List[int], auto_increment: bool, bank: int = None
+    ) -> None:
+        self.count = len(addresses)
+        # bank of all registers (addresses within it) on a banked interface
+        self.bank = bank
+        self.address = addresses[0]
+        # consecutive registers of a wide port can be accessed in one burst
+        self.burst_address = None
+        if auto_increment and self.count > 1 and _is_consecutive(addresses):
+            self.burst_address = self.address | port_defs.AUTO_INCREMENT_FLAG
+        self.addresses = (ctypes.c_ubyte * self.count)(*addresses)
+        self.values = (ctypes.c_ubyte * self.count)()
+        self.pairs = (ctypes.c_ubyte * (2 * self.count))()
+        self.pairs[0::2] = addresses
+
+
+def _is_consecutive(addresses: List[int]) -> bool:
+    return all(address == addresses[0] + i for i, address in enumerate(addresses))
+
+
 class AtlysInterface(UsbInterface):
-    def __init__(self, bitfile_path=None) -> None:
+    def __init__(
+        self,
+        bitfile_path=None,
+        build_id: int = None,
+        build_id_port: IoPort = None,
+        auto_increment: bool = False,
+        bank_select: BankSelect = None,
+        device: str = DEVICE_NAME,
+    ) -> None:
         super().__init__()
-        self.dmgr_lib = ctypes.CDLL(str(DMGR_DLL_PATH))
+        # device name, or connection string / serial ("SN:...") of one of several boards
+        self.device = device
+        self.dmgr_lib = _load_dmgr_lib()
         self.djtg_lib = ctypes.CDLL(str(DJTG_DLL_PATH))
         self.dstm_lib = ctypes.CDLL(str(DSTM_DLL_PATH))
         self.depp_lib = ctypes.CDLL(str(DEPP_DLL_PATH))
         self.logger, self.err_logger = self._setup_loggers()
         self.interface_handle = ctypes.c_uint32(0)
+        self._read_buffer = ctypes.c_ubyte(0)
+        self._read_buffer_ref = ctypes.byref(self._read_buffer)
+        self._port_access = {}
+        self._build_id = build_id
+        self._build_id_port = build_id_port
+        self._auto_increment = auto_increment
+        self._bank_select = bank_select
 
         self._define_lib_function_params()
         if self._is_connected():
-            device = ctypes.create_string_buffer(
-                size=len(DEVICE_NAME), init=DEVICE_NAME.encode()
-            )
+            self._open()
             if bitfile_path is not None:
-                self._program_device(bitfile_path)
-            self._call_func(
-                self.dmgr_lib.DmgrOpen, ctypes.byref(self.interface_handle), device
-            )
-            self._call_func(self.depp_lib.DeppEnable, self.interface_handle)
+                self.program(bitfile_path)
 
     def __del__(self):
+        self._close()
+
+    def close(self) -> None:
+        self._close()
+
+    def program(self, bitfile_path) -> bool:
+        """
+        Programs the bitfile unless the device already runs its build, then
+        waits for the FPGA to boot
+        """
+        if self._is_build_loaded():
+            self.logger.info(
+                f"{self.device} device already runs build {self._build_id:08x}, skipping programming"
+            )
+            return True
+        self._close()
+        programmed = self._program_device(bitfile_path)
+        if self._bank_select is not None:
+            # configuration clears the bank register
+            self._bank_select.reset()
+        self._open()
+        if programmed:
+            self._wait_for_boot()
+        return programmed
+
+    def _open(self):
+        self._call_func(
+            self.dmgr_lib.DmgrOpen,
+            ctypes.byref(self.interface_handle),
+            self.device.encode(),
+        )
+        self._call_func(self.depp_lib.DeppEnable, self.interface_handle)
+
+    def _close(self):
+        # the handle is cleared once closed, so closing again does nothing
+        if not self.interface_handle.value:
+            return
         self.depp_lib.DeppDisable(self.interface_handle)
         self.dmgr_lib.DmgrClose(self.interface_handle)
-        self.dmgr_lib.DmgrFreeDvcEnum()
+        self.interface_handle.value = 0
 
     def _setup_loggers(self):
         logger = logging.getLogger("AtlysLog")
-        format = logging.Formatter(
-            "[%(levelname)s] AtlysInterface::%(funcName)s(): %(message)s"
-        )
-        handler = logging.StreamHandler(stdout)
-        handler.setFormatter(format)
-        logger.addHandler(handler)
-        logger.setLevel(logging.DEBUG)
         err_logger = logging.getLogger("AtlysErrLog")
-        err_format = logging.Formatter("[%(levelname)s] AtlysInterface::%(message)s")
-        err_handler = logging.StreamHandler(stdout)
-        err_handler.setFormatter(err_format)
-        err_logger.addHandler(err_handler)
-        err_logger.setLevel(logging.ERROR)
+        # loggers are process-wide, further instances reuse their handlers
+        if not logger.handlers:
+            format = logging.Formatter(
+                "[%(levelname)s] AtlysInterface::%(funcName)s(): %(message)s"
+            )
+            handler = logging.StreamHandler(stdout)
+            handler.setFormatter(format)
+            logger.addHandler(handler)
+            logger.setLevel(logging.INFO)
+        if not err_logger.handlers:
+            err_format = logging.Formatter(
+                "[%(levelname)s] AtlysInterface::%(message)s"
+            )
+            err_handler = logging.StreamHandler(stdout)
+            err_handler.setFormatter(err_format)
+            err_logger.addHandler(err_handler)
+            err_logger.setLevel(logging.ERROR)
         return logger, err_logger
 
     def _define_lib_function_params(self):
-        # Dmgr
-        self.dmgr_lib.DmgrEnumDevices.argtypes = [ctypes.POINTER(ctypes.c_int)]
-        self.dmgr_lib.DmgrEnumDevices.restype = ctypes.c_bool
-        self.dmgr_lib.DmgrGetDvc.argtypes = [ctypes.c_int, ctypes.POINTER(DVT)]
-        self.dmgr_lib.DmgrGetDvc.restype = ctypes.c_bool
-        self.dmgr_lib.DmgrOpen.argtypes = [
-            ctypes.POINTER(ctypes.c_uint32),
-            ctypes.c_char_p,
-        ]
-        self.dmgr_lib.DmgrOpen.restype = ctypes.c_bool
-        self.dmgr_lib.DmgrClose.argtypes = [ctypes.c_uint32]
-        self.dmgr_lib.DmgrGetLastError.argtypes = None
-        self.dmgr_lib.DmgrGetLastError.restype = ctypes.c_int
-        self.dmgr_lib.DmgrSzFromErc.argtypes = [
-            ctypes.c_int,
-            ctypes.c_char_p,
-            ctypes.c_char_p,
-        ]
-        self.dmgr_lib.DmgrSzFromErc.restype = ctypes.c_bool
-
         # Depp
         self.depp_lib.DeppEnable.restype = ctypes.c_bool
         self.depp_lib.DeppPutReg.argtypes = [
@@ -112,6 +238,37 @@ class AtlysInterface(UsbInterface):
             ctypes.c_bool,
         ]
         self.depp_lib.DeppGetReg.restype = ctypes.c_bool
+        self.depp_lib.DeppPutRegSet.argtypes = [
+            ctypes.c_uint32,
+            ctypes.POINTER(ctypes.c_ubyte),
+            ctypes.c_uint32,
+            ctypes.c_bool,
+        ]
+        self.depp_lib.DeppPutRegSet.restype = ctypes.c_bool
+        self.depp_lib.DeppGetRegSet.argtypes = [
+            ctypes.c_uint32,
+            ctypes.POINTER(ctypes.c_ubyte),
+            ctypes.POINTER(ctypes.c_ubyte),
+            ctypes.c_uint32,
+            ctypes.c_bool,
+        ]
+        self.depp_lib.DeppGetRegSet.restype = ctypes.c_bool
+        self.depp_lib.DeppPutRegRepeat.argtypes = [
+            ctypes.c_uint32,
+            ctypes.c_ubyte,
+            ctypes.POINTER(ctypes.c_ubyte),
+            ctypes.c_uint32,
+            ctypes.c_bool,
+        ]
+        self.depp_lib.DeppPutRegRepeat.restype = ctypes.c_bool
+        self.depp_lib.DeppGetRegRepeat.argtypes = [
+            ctypes.c_uint32,
+            ctypes.c_ubyte,
+            ctypes.POINTER(ctypes.c_ubyte),
+            ctypes.c_uint32,
+            ctypes.c_bool,
+        ]
+        self.depp_lib.DeppGetRegRepeat.restype = ctypes.c_bool
 
     def _call_func(self, func, *args) -> bool:
         """
@@ -131,78 +288,314 @@ class AtlysInterface(UsbInterface):
         return True
 
     def _is_connected(self) -> bool:
-        device_num = ctypes.c_int()
-        success = self.dmgr_lib.DmgrEnumDevices(ctypes.byref(device_num))
-        if success:
-            if device_num.value:
+        devices = enumerate_devices(self.dmgr_lib)
+        self.logger.debug(
+            f"Found {len(devices)} Digilent device" + ("s" if len(devices) != 1 else "")
+        )
+        for device_info in devices:
+            if self.device in device_info:
                 self.logger.debug(
-                    f"Found {device_num.value} Digilent device"
-                    + ("s" if device_num.value > 1 else "")
+                    f"Found {device_info.name} device {device_info.connection_string}"
                 )
-                for device in range(device_num.value):
-                    device_info = DVT()
-                    self.dmgr_lib.DmgrGetDvc(
-                        ctypes.c_int(device), ctypes.byref(device_info)
-                    )
-                    if device_info.name.decode() == DEVICE_NAME:
-                        self.logger.debug("Found Atlys device")
-                    return True
-            self.logger.info("No Atlys device found")
-        else:
-            self.logger.debug("Error enumerating device")
+                return True
+        self.logger.info(f"No {self.device} device found")
         return False
 
-    def _program_device(self, bitfile_path):
-        delay_after_prog = 5
+    def _program_device(self, bitfile_path) -> bool:
         res = subprocess.run(
-            f"{JTAG_PROGRAM_EXE_PATH} -d {str(DEVICE_NAME)} init", capture_output=True
+            f"{JTAG_PROGRAM_EXE_PATH} -d {self.device} init", capture_output=True
         )
         device_id = search(r"(?<=Device )[0-9]+", str(res.stdout))
-        self.logger.info(f"Attempting to program {DEVICE_NAME} device...")
+        self.logger.info(f"Attempting to program {self.device} device...")
         res = subprocess.run(
-            f"{JTAG_PROGRAM_EXE_PATH} -d {str(DEVICE_NAME)} -i {device_id[0]} "
+            f"{JTAG_PROGRAM_EXE_PATH} -d {self.device} -i {device_id[0]} "
             + f"prog -f {bitfile_path}",
             stdout=subprocess.DEVNULL,
         )
         if res.returncode != 0:
             self.logger.error(
-                f"Programming {DEVICE_NAME} device failed. Error code: {res.returncode}"
+                f"Programming {self.device} device failed. Error code: {res.returncode}"
             )
-            return
+            return False
         self.logger.info("Programming succeeded.")
-        self.logger.info(f"Waiting {delay_after_prog} seconds to let FPGA boot up...")
-        sleep(delay_after_prog)  # wait a bit for FPGA to start up
+        return True
+
+    def _read_build_id(self) -> int:
+        """
+        Reads the build ID register without logging errors, returns None
+        when the FPGA does not answer
+        """
+        port = self._build_id_port
+        access = self._port_access.get(port) or self._compile_port(port)
+        if access is None:
+            # spread over several banks, errors of a booting FPGA are logged then
+            values = self.read_set(port.address)
+            return None if values is None else port.decode(values)
+        if access.bank is not None:
+            # the build ID is allocated last, so it may be in any bank
+            switch = self._bank_select.select(access.bank)
+            if switch and not self.depp_lib.DeppPutReg(
+                self.interface_handle, *switch[0], False
+            ):
+                self._bank_select.reset()
+                return None
+            self._bank_select.commit(switch)
+        if not self.depp_lib.DeppGetRegSet(
+            self.interface_handle, access.addresses, access.values, access.count, False
+        ):
+            return None
+        return int.from_bytes(access.values, "little")
+
+    def _is_build_loaded(self) -> bool:
+        if self._build_id is None or self._build_id_port is None:
+            return False
+        return self._read_build_id() == self._build_id
+
+    def _wait_for_boot(self):
+        if self._build_id is None or self._build_id_port is None:
+            self.logger.info(
+                f"Waiting {BOOT_DELAY} seconds to let FPGA boot up (no build ID)..."
+            )
+            sleep(BOOT_DELAY)
+            return
+        deadline = monotonic() + BOOT_TIMEOUT
+        while not self._is_build_loaded():
+            if monotonic() > deadline:
+                self.logger.error(
+                    f"{self.device} device did not report build {self._build_id:08x} "
+                    + f"within {BOOT_TIMEOUT} seconds"
+                )
+                return
+            sleep(BOOT_POLL_INTERVAL)
+        self.logger.info(f"{self.device} device runs build {self._build_id:08x}")
 
     def _write(self, address: int, value: int) -> bool:
-        no_overlap = ctypes.c_bool(False)
-        c_address = ctypes.c_ubyte(address)
-        c_value = ctypes.c_ubyte(value)
         return self._call_func(
-            self.depp_lib.DeppPutReg,
-            self.interface_handle,
-            c_address,
-            c_value,
-            no_overlap,
+            self.depp_lib.DeppPutReg, self.interface_handle, address, value, False
         )
 
     def write(self, port: IoPort, value: int) -> bool:
-        return self._write(port.address, value)
+        access = self._port_access.get(port) or self._compile_port(port)
+        if access is None:
+            return self.write_set(list(zip(port.address, port.encode(value))))
+        if not self._select_bank(access.bank):
+            return False
+        if access.count == 1:
+            return self._write(access.address, value & port_defs.DATA_MASK)
+        # bits beyond the port are dropped, as by write_set()
+        if access.burst_address is not None:
+            access.values[:] = port.encode(value)
+            return self._call_func(
+                self.depp_lib.DeppPutRegRepeat,
+                self.interface_handle,
+                access.burst_address,
+                access.values,
+                access.count,
+                False,
+            )
+        access.pairs[1::2] = port.encode(value)
+        return self._call_func(
+            self.depp_lib.DeppPutRegSet,
+            self.interface_handle,
+            access.pairs,
+            access.count,
+            False,
+        )
 
     def _read(self, address: int) -> int:
-        no_overlap = ctypes.c_bool(False)
-        c_address = ctypes.c_ubyte(address)
-        c_readValue = ctypes.c_ubyte(0)
         self._call_func(
             self.depp_lib.DeppGetReg,
             self.interface_handle,
-            c_address,
-            ctypes.byref(c_readValue),
-            no_overlap,
+            address,
+            self._read_buffer_ref,
+            False,
         )
-        return int(c_readValue.value)
+        return self._read_buffer.value
 
     def read(self, port: IoPort) -> int:
-        return self._read(port.address)
+        access = self._port_access.get(port) or self._compile_port(port)
+        if access is None:
+            values = self.read_set(port.address)
+            return None if values is None else port.decode(values)
+        if not self._select_bank(access.bank):
+            return None
+        if access.count == 1:
+            return self._read(access.address)
+        if access.burst_address is not None:
+            self._call_func(
+                self.depp_lib.DeppGetRegRepeat,
+                self.interface_handle,
+                access.burst_address,
+                access.values,
+                access.count,
+                False,
+            )
+        else:
+            self._call_func(
+                self.depp_lib.DeppGetRegSet,
+                self.interface_handle,
+                access.addresses,
+                access.values,
+                access.count,
+                False,
+            )
+        return int.from_bytes(access.values, "little")
+
+    def _compile_port(self, port: IoPort) -> "_PortAccess":
+        """
+        Returns the access of a port, None for ports spread over several banks
+        """
+        if self._bank_select is None:
+            access = _PortAccess(port.address, self._auto_increment)
+        else:
+            banks, offsets = zip(*map(self._bank_select.split, port.address))
+            if len(set(banks)) > 1:
+                return None
+            access = _PortAccess(list(offsets), self._auto_increment, banks[0])
+        self._port_access[port] = access
+        return access
+
+    def _select_bank(self, bank: int) -> bool:
+        if self._bank_select is None:
+            return True
+        switch = self._bank_select.select(bank)
+        if not switch:
+            return True
+        if not self._write(*switch[0]):
+            # the bank register may or may not have been written
+            self._bank_select.reset()
+            return False
+        self._bank_select.commit(switch)
+        return True
 
     def write_clock_cycles(self, port: ClockPort, cycles: int) -> bool:
-        return self._write(port, cycles)
+        return self.write(port, cycles)
+
+    def read_set(self, addresses: List[int]) -> List[int]:
+        if self._bank_select is None:
+            return self._read_bank_set(addresses)
+        # one transfer per bank, plus one per bank switch
+        values = [0] * len(addresses)
+        for bank, positions in self._bank_select.group_reads(addresses):
+            if not self._select_bank(bank):
+                return None
+            offsets = [addresses[i] % self._bank_select.bank_size for i in positions]
+            for i, value in zip(positions, self._read_bank_set(offsets)):
+                values[i] = value
+        return values
+
+    def _read_bank_set(self, addresses: List[int]) -> List[int]:
+        count = len(addresses)
+        if self._auto_increment and count > 1:
+            # every register of the range is read once, so any permutation of it is one burst
+            first = min(addresses)
+            if max(addresses) - first == count - 1 and len(set(addresses)) == count:
+                block = self._read_block(first, count)
+                return [block[address - first] for address in addresses]
+        c_addresses = (ctypes.c_ubyte * count)(*addresses)
+        c_values = (ctypes.c_ubyte * count)()
+        self._call_func(
+            self.depp_lib.DeppGetRegSet,
+            self.interface_handle,
+            c_addresses,
+            c_values,
+            count,
+            False,
+        )
+        return list(c_values)
+
+    def write_set(self, address_value_pairs: List[Tuple[int, int]]) -> bool:
+        if self._bank_select is None:
+            return self._write_bank_set(address_value_pairs)
+        bank_pairs = self._bank_select.get_bank_pairs(address_value_pairs)
+        if not self._write_bank_set(bank_pairs):
+            self._bank_select.reset()
+            return False
+        self._bank_select.commit(bank_pairs)
+        return True
+
+    def _write_bank_set(self, address_value_pairs: List[Tuple[int, int]]) -> bool:
+        count = len(address_value_pairs)
+        addresses = [address for address, _ in address_value_pairs]
+        if self._auto_increment and count > 1 and _is_consecutive(addresses):
+            return self._write_block(
+                addresses[0], bytes(value for _, value in address_value_pairs)
+            )
+        c_pairs = (ctypes.c_ubyte * (2 * count))()
+        c_pairs[0::2] = [address for address, _ in address_value_pairs]
+        c_pairs[1::2] = [value for _, value in address_value_pairs]
+        return self._call_func(
+            self.depp_lib.DeppPutRegSet,
+            self.interface_handle,
+            c_pairs,
+            count,
+            False,
+        )
+
+    def _get_block_address(self, start: int, increment: bool) -> int:
+        if not increment:
+            return start
+        if not self._auto_increment:
+            raise ValueError(
+                "Auto-increment block transfers require an interface generated with --burst"
+            )
+        return start | port_defs.AUTO_INCREMENT_FLAG
+
+    def read_block(
+        self, start: int, count: int, increment: bool = True, out=None
+    ) -> memoryview:
+        """
+        Reads count registers from start on (or count times the start register
+        when increment is False) into out, a writable buffer, or a new bytearray
+        """
+        start = self._select_block_bank(start, count, increment)
+        if start is None:
+            return None
+        return self._read_block(start, count, increment, out)
+
+    def write_block(self, start: int, data, increment: bool = True) -> bool:
+        start = self._select_block_bank(start, len(data), increment)
+        if start is None:
+            return False
+        return self._write_block(start, data, increment)
+
+    def _select_block_bank(self, start: int, count: int, increment: bool) -> int:
+        """
+        Selects the bank of a block transfer and returns its start within
+        it, None if the switch failed
+        """
+        if self._bank_select is None:
+            return start
+        self._bank_select.check_block(start, count, increment)
+        bank, offset = self._bank_select.split(start)
+        return offset if self._select_bank(bank) else None
+
+    def _read_block(
+        self, start: int, count: int, increment: bool = True, out=None
+    ) -> memoryview:
+        address = self._get_block_address(start, increment)
+        if out is None:
+            out = bytearray(count)
+        c_values = (ctypes.c_ubyte * count).from_buffer(out)
+        self._call_func(
+            self.depp_lib.DeppGetRegRepeat,
+            self.interface_handle,
+            address,
+            c_values,
+            count,
+            False,
+        )
+        return memoryview(out)[:count]
+
+    def _write_block(self, start: int, data, increment: bool = True) -> bool:
+        address = self._get_block_address(start, increment)
+        count = len(data)
+        c_values = (ctypes.c_ubyte * count).from_buffer_copy(data)
+        return self._call_func(
+            self.depp_lib.DeppPutRegRepeat,
+            self.interface_handle,
+            address,
+            c_values,
+            count,
+            False,
+        )
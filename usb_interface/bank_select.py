@@ -0,0 +1,99 @@
+from typing import List, Tuple
+
+
+class BankSelect(object):
+    """
+    Current bank of an interface whose register map is split into banks
+
+    Addresses are linear: bank * bank_size plus the address within the bank.
+    The last register of every bank selects the bank of all other registers,
+    so a switch is one extra register write that can share the transfer of
+    the writes following it. Reads of a set are grouped per bank, starting
+    with the current one; writes keep their program order, with a switch at
+    every bank change, so no write moves across a clock or control register
+    written between them.
+    """
+
+    def __init__(self, bank_size: int) -> None:
+        self.bank_size = bank_size
+        self.select_address = bank_size - 1
+        # unknown until the first switch, the board may keep a bank selected by another session
+        self.bank = None
+        self.switches = 0
+
+    def split(self, address: int) -> Tuple[int, int]:
+        return divmod(address, self.bank_size)
+
+    def select(self, bank: int) -> List[Tuple[int, int]]:
+        """
+        Returns the address/value pair switching to bank, if it isn't current;
+        the switch counts once written, see commit()
+        """
+        if bank == self.bank:
+            return []
+        return [(self.select_address, bank)]
+
+    def commit(self, written_pairs: List[Tuple[int, int]]) -> None:
+        """
+        Tracks the bank switches among address/value pairs written successfully
+        """
+        for address, value in written_pairs:
+            if address == self.select_address:
+                self.bank = value
+                self.switches += 1
+
+    def reset(self) -> None:
+        """
+        Forgets the current bank, after a failed transfer or reprogramming
+        """
+        self.bank = None
+
+    def group_reads(self, addresses: List[int]) -> List[Tuple[int, List[int]]]:
+        """
+        Returns (bank, positions in addresses) pairs, the current bank first
+        """
+        positions = {}
+        for i, address in enumerate(addresses):
+            positions.setdefault(address // self.bank_size, []).append(i)
+        banks = sorted(positions, key=lambda bank: (bank != self.bank, bank))
+        return [(bank, positions[bank]) for bank in banks]
+
+    def group_writes(
+        self, address_value_pairs: List[Tuple[int, int]]
+    ) -> List[Tuple[int, List[Tuple[int, int]]]]:
+        """
+        Returns (bank, address/value pairs) pairs of consecutive writes to the
+        same bank, in write order
+        """
+        groups = []
+        for address, value in address_value_pairs:
+            bank = address // self.bank_size
+            if not groups or groups[-1][0] != bank:
+                groups.append((bank, []))
+            groups[-1][1].append((address, value))
+        return groups
+
+    def get_bank_pairs(
+        self, address_value_pairs: List[Tuple[int, int]]
+    ) -> List[Tuple[int, int]]:
+        """
+        Returns the pairs with addresses within their bank, preceded by the
+        bank switches they need, for one transfer
+        """
+        bank = self.bank
+        bank_pairs = []
+        for group_bank, pairs in self.group_writes(address_value_pairs):
+            if group_bank != bank:
+                bank_pairs.append((self.select_address, group_bank))
+                bank = group_bank
+            bank_pairs.extend(
+                (address % self.bank_size, value) for address, value in pairs
+            )
+        return bank_pairs
+
+    def check_block(self, start: int, count: int, increment: bool) -> None:
+        offset = start % self.bank_size
+        if increment and offset + count > self.select_address:
+            raise ValueError(
+                f"Block of {count} registers from {start:x} on crosses a register bank boundary"
+            )
@@ -0,0 +1,88 @@
+from typing import Callable, Optional
+
+from port_tools import port_defs
+from port_tools.port import ClockPort
+from .usb_interface import UsbInterface
+
+
+class FreeRunningClock(object):
+    """
+    Control of the programmable divider running a clock port continuously
+
+    The clock runs at main_clock_hz / (divider + 1) from start() until
+    stop(), the wait unit pauses it like the clock generators. Its cycle
+    count restarts with every start() and is latched by every write of the
+    run register, so it reads back coherently.
+
+    get_usb_interface is called for every access, so the transfers go
+    through the current interface, e.g. while FpgaInterface.record() runs.
+    """
+
+    def __init__(
+        self,
+        get_usb_interface: Callable[[], UsbInterface],
+        port: ClockPort,
+        main_clock_hz: int,
+    ) -> None:
+        if port.run_address is None:
+            raise ValueError(
+                f"Clock port {port.name} has no free-running divider, generate it with --free_running"
+            )
+        self.port = port
+        self.main_clock_hz = main_clock_hz
+        self.frequency: Optional[float] = None
+        self.running = False
+        self._get_usb_interface = get_usb_interface
+
+    @property
+    def max_divider(self) -> int:
+        return (1 << (port_defs.DATA_WIDTH * len(self.port.divider_address))) - 1
+
+    def start(self, freq_hz: float = None) -> float:
+        """
+        Starts the clock at the closest frequency not above freq_hz (the main
+        clock frequency by default) and returns that frequency
+        """
+        divider = 0
+        if freq_hz is not None:
+            if freq_hz <= 0:
+                raise ValueError("Clock frequency must be positive")
+            divider = max(-(-self.main_clock_hz // freq_hz) - 1, 0)
+        if divider > self.max_divider:
+            raise ValueError(
+                f"Lowest frequency of {self.port.name} is {self.main_clock_hz / (self.max_divider + 1)} Hz"
+            )
+        divider = int(divider)
+        address_value_pairs = list(
+            zip(
+                self.port.divider_address,
+                divider.to_bytes(len(self.port.divider_address), "little"),
+            )
+        )
+        address_value_pairs.append((self.port.run_address, port_defs.CLOCK_RUN))
+        if self._get_usb_interface().write_set(address_value_pairs) is False:
+            return None
+        self.running = True
+        self.frequency = self.main_clock_hz / (divider + 1)
+        return self.frequency
+
+    def stop(self) -> int:
+        """
+        Stops the clock and returns the number of cycles run since start()
+        """
+        self._get_usb_interface().write_set([(self.port.run_address, 0)])
+        self.running = False
+        return self._read_cycles()
+
+    @property
+    def cycles(self) -> int:
+        """
+        Cycles run since start(), latched by rewriting the run register
+        """
+        run = port_defs.CLOCK_RUN if self.running else 0
+        self._get_usb_interface().write_set([(self.port.run_address, run)])
+        return self._read_cycles()
+
+    def _read_cycles(self) -> int:
+        values = self._get_usb_interface().read_set(self.port.cycle_count_address)
+        return None if values is None else int.from_bytes(bytes(values), "little")
@@ -0,0 +1,295 @@
+import os
+from time import perf_counter_ns
+from typing import Callable, Dict, List, Tuple
+
+from port_tools import port_defs
+from port_tools.port import IoPort, ClockPort
+from port_tools.port_manager import PortList
+from .usb_interface import UsbInterface
+
+# latency histograms keep 2^SUB_BUCKET_BITS buckets per power of two (~3 % precision)
+SUB_BUCKET_BITS = 5
+# ... up to 2^MAX_LATENCY_BITS ns (about 18 minutes), larger values land in the last bucket
+MAX_LATENCY_BITS = 40
+PROMETHEUS_PREFIX = "fpga_interface"
+
+
+class LatencyHistogram(object):
+    """
+    HDR-style histogram of latencies in nanoseconds with a fixed memory size
+
+    Small values are counted exactly; above, every power of two is split into
+    2^SUB_BUCKET_BITS equal buckets, so the relative error of a reported value
+    stays below 2^-SUB_BUCKET_BITS.
+    """
+
+    __slots__ = ("counts", "count", "total", "min", "max")
+
+    def __init__(self) -> None:
+        self.counts = [0] * (
+            (MAX_LATENCY_BITS - SUB_BUCKET_BITS + 1) << SUB_BUCKET_BITS
+        )
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = 0
+
+    @staticmethod
+    def get_index(value: int) -> int:
+        # values below 2^(SUB_BUCKET_BITS + 1) have a bucket each
+        exponent = max(value.bit_length() - SUB_BUCKET_BITS - 1, 0)
+        index = (exponent << SUB_BUCKET_BITS) + (value >> exponent)
+        return min(
+            index, ((MAX_LATENCY_BITS - SUB_BUCKET_BITS + 1) << SUB_BUCKET_BITS) - 1
+        )
+
+    @staticmethod
+    def get_upper_bound(index: int) -> int:
+        """
+        Returns the largest value counted in bucket index
+        """
+        exponent = max((index >> SUB_BUCKET_BITS) - 1, 0)
+        mantissa = index - (exponent << SUB_BUCKET_BITS)
+        return ((mantissa + 1) << exponent) - 1
+
+    def record(self, value: int) -> None:
+        self.counts[self.get_index(value)] += 1
+        self.count += 1
+        self.total += value
+        if self.min is None or value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+
+    def percentile(self, percent: float) -> int:
+        """
+        Returns the upper bound of the bucket holding the given percentile
+        """
+        if not self.count:
+            return 0
+        rank = max(percent / 100 * self.count, 1)
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                return min(self.get_upper_bound(index), self.max)
+        return self.max
+
+    def get_cumulative_buckets(self) -> List[Tuple[int, int]]:
+        """
+        Returns (upper bound, count of values up to it) pairs at every power
+        of two up to the largest recorded value
+        """
+        buckets = []
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if (index + 1) % (1 << SUB_BUCKET_BITS) == 0:
+                buckets.append((self.get_upper_bound(index), seen))
+                if seen == self.count:
+                    break
+        return buckets
+
+    def to_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "total_ns": self.total,
+            "min_ns": self.min or 0,
+            "max_ns": self.max,
+            "p50_ns": self.percentile(50),
+            "p90_ns": self.percentile(90),
+            "p99_ns": self.percentile(99),
+            "p999_ns": self.percentile(99.9),
+        }
+
+
+class InstrumentedInterface(UsbInterface):
+    """
+    Wrapper of a UsbInterface backend counting transactions and registers
+    per operation and per port and recording a latency histogram per operation
+
+    Registers of read_set() and write_set() are attributed to the ports
+    owning their addresses when a port list is given. Every hook is called
+    after each operation as hook(operation, registers, elapsed_ns), e.g. to
+    feed a profiler. Instrumentation costs nothing once the wrapper is
+    removed, see FpgaInterface(instrument=...).
+    """
+
+    def __init__(self, backend: UsbInterface, port_list: PortList = None) -> None:
+        super().__init__()
+        self.backend = backend
+        self.hooks: List[Callable[[str, int, int], None]] = []
+        self._read_ports = {}
+        self._write_ports = {}
+        for port in (port_list or {}).values():
+            direction = getattr(port, "direction", port_defs.ALLOWED_DIRECTIONS[0])
+            if direction != port_defs.ALLOWED_DIRECTIONS[1]:
+                self._write_ports.update(dict.fromkeys(port.address, port.name))
+            if direction != port_defs.ALLOWED_DIRECTIONS[0]:
+                self._read_ports.update(dict.fromkeys(port.address, port.name))
+        self.reset()
+
+    def reset(self) -> None:
+        self.transactions: Dict[str, int] = {}
+        self.registers: Dict[str, int] = {}
+        self.port_registers: Dict[Tuple[str, str], int] = {}
+        self.latency: Dict[str, LatencyHistogram] = {}
+
+    def read(self, port: IoPort) -> int:
+        start = perf_counter_ns()
+        value = self.backend.read(port)
+        self._record("read", start, len(port.address))
+        self._count_port("read", port.name, len(port.address))
+        return value
+
+    def write(self, port: IoPort, value: int) -> bool:
+        start = perf_counter_ns()
+        result = self.backend.write(port, value)
+        self._record("write", start, len(port.address))
+        self._count_port("write", port.name, len(port.address))
+        return result
+
+    def write_clock_cycles(self, port: ClockPort, cycles: int) -> bool:
+        start = perf_counter_ns()
+        result = self.backend.write_clock_cycles(port, cycles)
+        self._record("write_clock_cycles", start, len(port.address))
+        self._count_port("write", port.name, len(port.address))
+        return result
+
+    def read_set(self, addresses: List[int]) -> List[int]:
+        start = perf_counter_ns()
+        values = self.backend.read_set(addresses)
+        self._record("read_set", start, len(addresses))
+        self._count_addresses("read", self._read_ports, addresses)
+        return values
+
+    def write_set(self, address_value_pairs: List[Tuple[int, int]]) -> bool:
+        start = perf_counter_ns()
+        result = self.backend.write_set(address_value_pairs)
+        self._record("write_set", start, len(address_value_pairs))
+        self._count_addresses(
+            "write", self._write_ports, [address for address, _ in address_value_pairs]
+        )
+        return result
+
+    def read_block(
+        self, start: int, count: int, increment: bool = True, out=None
+    ) -> memoryview:
+        start_time = perf_counter_ns()
+        data = self.backend.read_block(start, count, increment, out)
+        self._record("read_block", start_time, count)
+        return data
+
+    def write_block(self, start: int, data, increment: bool = True) -> bool:
+        start_time = perf_counter_ns()
+        result = self.backend.write_block(start, data, increment)
+        self._record("write_block", start_time, len(data))
+        return result
+
+    def stats(self) -> dict:
+        """
+        Returns a snapshot of all counters, latencies in nanoseconds
+        """
+        return {
+            "operations": {
+                operation: {
+                    "transactions": count,
+                    "registers": self.registers[operation],
+                    "latency": self.latency[operation].to_dict(),
+                }
+                for operation, count in self.transactions.items()
+            },
+            "ports": {
+                f"{name}.{direction}": registers
+                for (name, direction), registers in self.port_registers.items()
+            },
+        }
+
+    def _record(self, operation: str, start: int, registers: int) -> None:
+        elapsed = perf_counter_ns() - start
+        histogram = self.latency.get(operation)
+        if histogram is None:
+            histogram = self.latency[operation] = LatencyHistogram()
+            self.transactions[operation] = 0
+            self.registers[operation] = 0
+        histogram.record(elapsed)
+        self.transactions[operation] += 1
+        self.registers[operation] += registers
+        for hook in self.hooks:
+            hook(operation, registers, elapsed)
+
+    def _count_port(self, direction: str, name: str, registers: int) -> None:
+        key = (name, direction)
+        self.port_registers[key] = self.port_registers.get(key, 0) + registers
+
+    def _count_addresses(
+        self, direction: str, ports: Dict[int, str], addresses: List[int]
+    ) -> None:
+        for address in addresses:
+            name = ports.get(address)
+            if name is not None:
+                self._count_port(direction, name, 1)
+
+
+def _format_labels(**labels) -> str:
+    return ",".join(
+        f'{key}="{str(value).replace(chr(34), chr(39))}"'
+        for key, value in labels.items()
+    )
+
+
+def format_prometheus(interface: InstrumentedInterface) -> str:
+    """
+    Returns the counters and latency histograms in Prometheus text format
+    """
+    prefix = PROMETHEUS_PREFIX
+    lines = [
+        f"# HELP {prefix}_transactions_total USB transactions per operation",
+        f"# TYPE {prefix}_transactions_total counter",
+    ]
+    for operation, count in interface.transactions.items():
+        lines.append(
+            f"{prefix}_transactions_total{{{_format_labels(operation=operation)}}} {count}"
+        )
+    lines += [
+        f"# HELP {prefix}_registers_total Registers transferred per operation",
+        f"# TYPE {prefix}_registers_total counter",
+    ]
+    for operation, count in interface.registers.items():
+        lines.append(
+            f"{prefix}_registers_total{{{_format_labels(operation=operation)}}} {count}"
+        )
+    lines += [
+        f"# HELP {prefix}_port_registers_total Registers transferred per port",
+        f"# TYPE {prefix}_port_registers_total counter",
+    ]
+    for (name, direction), count in interface.port_registers.items():
+        labels = _format_labels(port=name, direction=direction)
+        lines.append(f"{prefix}_port_registers_total{{{labels}}} {count}")
+    lines += [
+        f"# HELP {prefix}_latency_seconds Latency of operations",
+        f"# TYPE {prefix}_latency_seconds histogram",
+    ]
+    for operation, histogram in interface.latency.items():
+        for bound, count in histogram.get_cumulative_buckets():
+            labels = _format_labels(operation=operation, le=bound / 1e9)
+            lines.append(f"{prefix}_latency_seconds_bucket{{{labels}}} {count}")
+        labels = _format_labels(operation=operation, le="+Inf")
+        lines.append(f"{prefix}_latency_seconds_bucket{{{labels}}} {histogram.count}")
+        labels = _format_labels(operation=operation)
+        lines.append(
+            f"{prefix}_latency_seconds_sum{{{labels}}} {histogram.total / 1e9}"
+        )
+        lines.append(f"{prefix}_latency_seconds_count{{{labels}}} {histogram.count}")
+    return "\n".join(lines) + "\n"
+
+
+def write_prometheus_textfile(interface: InstrumentedInterface, path) -> None:
+    """
+    Writes the metrics for the node exporter textfile collector, replacing
+    the file atomically so that it is never scraped half-written
+    """
+    temporary_path = f"{path}.{os.getpid()}.tmp"
+    with open(temporary_path, "wt") as file:
+        file.write(format_prometheus(interface))
+    os.replace(temporary_path, path)
@@ -0,0 +1,94 @@
+import json
+import socket
+from threading import Lock
+from typing import List, Tuple
+
+from port_tools.port import IoPort, ClockPort
+from .usb_interface import UsbInterface
+
+DEFAULT_BROKER_SOCKET_PATH = "/tmp/python-fpga-broker.sock"
+# request operations understood by the broker
+READ_SET_OP = "read_set"
+WRITE_SET_OP = "write_set"
+READ_BLOCK_OP = "read_block"
+WRITE_BLOCK_OP = "write_block"
+
+
+def encode_message(message: dict) -> bytes:
+    return json.dumps(message, separators=(",", ":")).encode() + b"\n"
+
+
+class RemoteInterface(UsbInterface):
+    """
+    Client of a device broker (fpga_broker.py) sharing one board between processes
+
+    Port operations are sent to the broker as register-level read_set and
+    write_set requests, one newline-delimited JSON message each. Block
+    transfers are forwarded as read_block and write_block requests with the
+    data hex-encoded.
+    """
+
+    # set once connected, close() may run for an instance whose connect() failed
+    _socket = None
+    _reader = None
+
+    def __init__(self, socket_path: str = DEFAULT_BROKER_SOCKET_PATH) -> None:
+        super().__init__()
+        connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            connection.connect(str(socket_path))
+        except OSError:
+            connection.close()
+            raise
+        self._socket = connection
+        self._reader = connection.makefile("rb")
+        self._lock = Lock()
+
+    def __del__(self):
+        self.close()
+
+    def close(self) -> None:
+        if self._reader is not None:
+            self._reader.close()
+        if self._socket is not None:
+            self._socket.close()
+
+    def read(self, port: IoPort) -> int:
+        values = self.read_set(port.address)
+        return None if values is None else port.decode(values)
+
+    def write(self, port: IoPort, value: int) -> bool:
+        return self.write_set(list(zip(port.address, port.encode(value))))
+
+    def write_clock_cycles(self, port: ClockPort, cycles: int) -> bool:
+        return self.write(port, cycles)
+
+    def read_set(self, addresses: List[int]) -> List[int]:
+        return self._request(READ_SET_OP, list(addresses))
+
+    def write_set(self, address_value_pairs: List[Tuple[int, int]]) -> bool:
+        return self._request(WRITE_SET_OP, [list(pair) for pair in address_value_pairs])
+
+    def read_block(
+        self, start: int, count: int, increment: bool = True, out=None
+    ) -> memoryview:
+        data = bytes.fromhex(self._request(READ_BLOCK_OP, [start, count, increment]))
+        if out is None:
+            out = bytearray(count)
+        view = memoryview(out)[:count]
+        view[:] = data
+        return view
+
+    def write_block(self, start: int, data, increment: bool = True) -> bool:
+        return self._request(WRITE_BLOCK_OP, [start, bytes(data).hex(), increment])
+
+    def _request(self, op: str, args):
+        with self._lock:
+            self._socket.sendall(encode_message({"op": op, "args": args}))
+            line = self._reader.readline()
+        if not line:
+            raise ConnectionError("Device broker closed the connection")
+        response = json.loads(line)
+        if "error" in response:
+            raise RuntimeError(f"Device broker: {response['error']}")
+        return response["result"]
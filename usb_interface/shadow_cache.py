@@ -0,0 +1,63 @@
+from typing import Optional
+
+from port_tools import port_defs
+from port_tools.port import Port, IoPort
+
+
+class ShadowCache(object):
+    """
+    Write-through host copy of registers that only the host drives
+
+    Values of DUT input ports are known from what was last written to them,
+    so they can be served locally and unchanged writes can be dropped.
+    Entries are keyed by the first register address of a port and are only
+    created by writes - a read miss never caches what the hardware returns.
+    """
+
+    def __init__(self) -> None:
+        self._values = {}
+        self.hits = 0
+        self.misses = 0
+        self.dropped_writes = 0
+
+    @staticmethod
+    def is_cacheable(port: Port) -> bool:
+        return (
+            isinstance(port, IoPort)
+            and port.direction == port_defs.ALLOWED_DIRECTIONS[0]
+        )
+
+    def get(self, port: IoPort) -> Optional[int]:
+        value = self._values.get(port.address[0])
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    def update(self, port: IoPort, value: int) -> None:
+        self._values[port.address[0]] = value
+
+    def is_redundant(self, port: IoPort, value: int, current: int = None) -> bool:
+        # current is the value the port will hold before the write, e.g. one
+        # queued in a transaction, the cached value by default
+        if current is None:
+            current = self._values.get(port.address[0])
+        if current == value:
+            self.dropped_writes += 1
+            return True
+        return False
+
+    def invalidate(self, port: Optional[IoPort] = None) -> None:
+        if port is None:
+            self._values.clear()
+        else:
+            self._values.pop(port.address[0], None)
+
+    def stats(self) -> dict:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "dropped_writes": self.dropped_writes,
+            "entries": len(self._values),
+        }
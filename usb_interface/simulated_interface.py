@@ -0,0 +1,276 @@
+from time import sleep
+from typing import Callable, List, Optional, Tuple
+
+from port_tools import port_defs
+from port_tools.port import IoPort, ClockPort
+from port_tools.port_manager import PortList
+from port_tools.units import ChangeDetector, Misr, StepGroup, VectorEngine, WaitUnit
+from .bank_select import BankSelect
+from .simulated_units import (
+    ChangeDetectorModel,
+    FreeRunningModel,
+    MisrModel,
+    SnapshotModel,
+    StepGroupModel,
+    VectorEngineModel,
+    WaitUnitModel,
+)
+from .usb_interface import UsbInterface
+
+
+class LatencyModel(object):
+    """
+    Cost of a USB transfer: a fixed part per transaction plus a part per transferred byte
+    """
+
+    def __init__(self, per_transaction: float = 0.0, per_byte: float = 0.0) -> None:
+        self.per_transaction = per_transaction
+        self.per_byte = per_byte
+
+    def __call__(self, transactions: int, registers: int) -> float:
+        return transactions * self.per_transaction + registers * self.per_byte
+
+
+class SimulatedInterface(UsbInterface):
+    """
+    In-process model of the register file of a generated top module
+
+    Writes land in the input mux and reads come from the output mux, as in
+    top_template.txt. Writing the last register of a clock port emits as
+    many pulses as its counter registers hold. Pulses are instantaneous, so
+    clock busy bits always read 0; they are counted per clock and passed to
+    an optional DUT model:
+    dut_model(interface, clock_port, cycles), which may update outputs with
+    set_output(). Inout ports read back the host-driven value while their
+    enable signal is active, like inout_writer does. The build ID register,
+    when given, holds its constant value. The snapshot bank, change
+    detector, wait unit, vector engine, MISR, step group and free-running
+    clocks are modelled in simulated_units.py. On a banked
+    register map, registers keep their linear addresses and bank switches
+    are charged like on hardware: one register written in the transfer of
+    the writes following it, or one more transfer ahead of reads.
+    Block transfers follow the auto-increment burst mode of interfaces
+    generated with --burst. program() only clears the input registers.
+
+    Every transfer is charged to `elapsed` using the latency model (any
+    callable taking transaction and register counts and returning seconds);
+    with real_time=True the interface also sleeps for that long.
+    """
+
+    def __init__(
+        self,
+        port_list: PortList,
+        latency_model: Callable[[int, int], float] = None,
+        dut_model: Callable[["SimulatedInterface", ClockPort, int], None] = None,
+        real_time: bool = False,
+        build_id: int = None,
+        build_id_port: IoPort = None,
+        auto_increment: bool = False,
+        snapshot_port: IoPort = None,
+        change_detector: ChangeDetector = None,
+        wait_unit: WaitUnit = None,
+        vector_engine: VectorEngine = None,
+        misr: Misr = None,
+        step_group: StepGroup = None,
+        main_clock_hz: int = None,
+        bank_select: BankSelect = None,
+    ) -> None:
+        super().__init__()
+        self.latency_model = latency_model or LatencyModel()
+        self.dut_model = dut_model
+        self.real_time = real_time
+        self.auto_increment = auto_increment
+        self.bank_select = bank_select
+        self.inputs = {}
+        self.outputs = {}
+        self.clock_cycles = {}
+        self.elapsed = 0.0
+        self.transactions = 0
+        self.registers_transferred = 0
+        self._clock_ports = {}
+        self._inout_ports = {}
+        self._port_list = port_list
+        for port in port_list:
+            if isinstance(port, ClockPort):
+                self._clock_ports[port.address[-1]] = port
+                self.clock_cycles[port.name] = 0
+            elif port.direction == port_defs.ALLOWED_DIRECTIONS[2]:
+                for address in port.address:
+                    self._inout_ports[address] = port
+        # writing a control register triggers its handler with the written value
+        self._control_registers = {}
+        # reading a data register returns the next value of its handler
+        self._data_registers = {}
+        self._changes = None
+        if change_detector is not None:
+            self._changes = ChangeDetectorModel(self, change_detector)
+            self._control_registers[change_detector.address] = self._changes.latch
+        self._wait = None
+        if wait_unit is not None:
+            self._wait = WaitUnitModel(self, wait_unit, port_list)
+            self._control_registers[wait_unit.address] = self._wait.control
+        self._misr = None
+        if misr is not None:
+            self._misr = MisrModel(self, misr, port_list)
+            self._control_registers[misr.address] = self._misr.reset
+        self._init_units(snapshot_port, vector_engine, step_group, main_clock_hz)
+        if build_id_port is not None:
+            self.set_output(build_id_port, build_id)
+
+    def _init_units(
+        self,
+        snapshot_port: Optional[IoPort],
+        vector_engine: Optional[VectorEngine],
+        step_group: Optional[StepGroup],
+        main_clock_hz: Optional[int],
+    ) -> None:
+        port_list = self._port_list
+        if snapshot_port is not None:
+            snapshot = SnapshotModel(self, port_list)
+            self._control_registers[snapshot_port.address[0]] = snapshot.latch
+        if vector_engine is not None:
+            vectors = VectorEngineModel(self, vector_engine, port_list)
+            self._control_registers[vector_engine.address] = vectors.control
+            self._control_registers[vector_engine.stimulus_address] = (
+                vectors.write_stimulus
+            )
+            self._data_registers[vector_engine.response_address] = vectors.read_response
+        if step_group is not None:
+            group = StepGroupModel(self, step_group, port_list)
+            self._control_registers[step_group.address[-1]] = group.fire
+        self._free_running = FreeRunningModel(
+            self, port_list, main_clock_hz, self._wait
+        )
+        self._control_registers.update(self._free_running.controls)
+
+    def program(self, bitfile_path) -> bool:
+        # configuring the FPGA clears the registers written by the host
+        self.inputs.clear()
+        if self.bank_select is not None:
+            self.bank_select.reset()
+        return True
+
+    def set_output(self, port: IoPort, value: int) -> None:
+        for address, register_value in zip(port.address, port.encode(value)):
+            if (
+                self._changes is not None
+                and self.outputs.get(address, 0) != register_value
+            ):
+                self._changes.changed_registers.add(address)
+            self.outputs[address] = register_value
+
+    def get_input(self, port: IoPort) -> int:
+        return port.decode([self.inputs.get(address, 0) for address in port.address])
+
+    def read(self, port: IoPort) -> int:
+        return port.decode(self.read_set(port.address))
+
+    def write(self, port: IoPort, value: int) -> bool:
+        return self.write_set(list(zip(port.address, port.encode(value))))
+
+    def write_clock_cycles(self, port: ClockPort, cycles: int) -> bool:
+        return self.write(port, cycles)
+
+    def read_set(self, addresses: List[int]) -> List[int]:
+        if self.bank_select is None:
+            self._account(len(addresses))
+        else:
+            for bank, positions in self.bank_select.group_reads(addresses):
+                switch = self.bank_select.select(bank)
+                if switch:
+                    self._account(1)
+                    self.bank_select.commit(switch)
+                self._account(len(positions))
+        return [
+            self._data_registers.get(address, self.read_register)(address)
+            for address in addresses
+        ]
+
+    def write_set(self, address_value_pairs: List[Tuple[int, int]]) -> bool:
+        if self.bank_select is None:
+            self._account(len(address_value_pairs))
+        else:
+            # registers keep their linear addresses, only the switches are charged
+            bank_pairs = self.bank_select.get_bank_pairs(address_value_pairs)
+            self._account(len(bank_pairs))
+            self.bank_select.commit(bank_pairs)
+        for address, value in address_value_pairs:
+            self._write_register(address, value)
+        return True
+
+    def read_block(
+        self, start: int, count: int, increment: bool = True, out=None
+    ) -> memoryview:
+        addresses = self._get_block_addresses(start, count, increment)
+        if out is None:
+            out = bytearray(count)
+        view = memoryview(out)[:count]
+        view[:] = bytes(self.read_set(addresses))
+        return view
+
+    def write_block(self, start: int, data, increment: bool = True) -> bool:
+        addresses = self._get_block_addresses(start, len(data), increment)
+        return self.write_set(list(zip(addresses, bytes(data))))
+
+    def _get_block_addresses(
+        self, start: int, count: int, increment: bool
+    ) -> List[int]:
+        if self.bank_select is not None:
+            self.bank_select.check_block(start, count, increment)
+        if not increment:
+            return [start] * count
+        if not self.auto_increment:
+            raise ValueError(
+                "Auto-increment block transfers require an interface generated with --burst"
+            )
+        return list(range(start, start + count))
+
+    def read_register(self, address: int) -> int:
+        inout_port = self._inout_ports.get(address)
+        if inout_port is not None and self._is_inout_driven(inout_port):
+            return self.inputs.get(address, 0)
+        return self.outputs.get(address, 0)
+
+    def _write_register(self, address: int, value: int) -> None:
+        self.inputs[address] = value & port_defs.DATA_MASK
+        clock_port = self._clock_ports.get(address)
+        if clock_port is not None:
+            self.pulse(clock_port, self.get_input(clock_port))
+        control_handler = self._control_registers.get(address)
+        if control_handler is not None:
+            control_handler(value)
+
+    def pulse(self, port: ClockPort, cycles: int) -> None:
+        wait = self._wait
+        while cycles > 0 and not (wait is not None and wait.is_halted):
+            # pulses are issued one by one while the wait unit compares after each
+            waiting = wait is not None and wait.is_waiting
+            # the MISR samples outputs on every edge, so its clock is stepped cycle by cycle
+            misr_clock = self._misr is not None and self._misr.is_clock(port)
+            step = 1 if waiting or misr_clock else cycles
+            self.clock_cycles[port.name] += step
+            if misr_clock:
+                self._misr.update(port)
+            if self.dut_model is not None:
+                self.dut_model(self, port, step)
+            cycles -= step
+            if wait is not None:
+                wait.update(step)
+        if cycles > 0:
+            wait.halt(port, cycles)
+
+    def _is_inout_driven(self, port: IoPort) -> bool:
+        enable_port: Optional[IoPort] = self._port_list.get(port.enable_signal)
+        if enable_port is None:
+            return False
+        enable_level = self.outputs.get(enable_port.address[0], 0) & 1
+        return enable_level == int(port.enable_signal_active or 0)
+
+    def _account(self, registers: int) -> None:
+        self._free_running.advance()
+        self.transactions += 1
+        self.registers_transferred += registers
+        latency = self.latency_model(1, registers)
+        self.elapsed += latency
+        if self.real_time and latency > 0:
+            sleep(latency)
@@ -0,0 +1,300 @@
+from functools import partial
+from time import perf_counter
+from typing import Dict, List, Optional
+
+from port_tools import port_defs
+from port_tools.port import IoPort, ClockPort
+from port_tools.port_manager import PortList
+from port_tools.units import ChangeDetector, Misr, StepGroup, VectorEngine, WaitUnit
+
+
+def _get_value(registers: Dict[int, int], addresses: List[int]) -> int:
+    return int.from_bytes(
+        bytes(registers.get(address, 0) for address in addresses), "little"
+    )
+
+
+class SnapshotModel(object):
+    """
+    Snapshot bank: writing its control register copies every output into
+    its snapshot registers
+    """
+
+    def __init__(self, interface, port_list: PortList) -> None:
+        self._interface = interface
+        self._registers = [
+            pair
+            for port in port_list
+            if isinstance(port, IoPort)
+            for pair in zip(port.address, port.snapshot_address)
+        ]
+
+    def latch(self, value: int) -> None:
+        for source, snapshot in self._registers:
+            self._interface.outputs[snapshot] = self._interface.read_register(source)
+
+
+class ChangeDetectorModel(object):
+    """
+    Change detection unit: registers changed by set_output() are flagged in
+    the bitmap latched by writing its control register
+    """
+
+    def __init__(self, interface, detector: ChangeDetector) -> None:
+        self._interface = interface
+        self._detector = detector
+        self.changed_registers = set()
+
+    def latch(self, value: int) -> None:
+        bitmap = self._detector.encode_bitmap(self.changed_registers)
+        self.changed_registers.clear()
+        self._interface.outputs.update(zip(self._detector.bitmap_address, bitmap))
+
+
+class WaitUnitModel(object):
+    """
+    Wait unit: checked after every pulse once armed, it halts the clocks on
+    a match; its timeout counts pulses instead of interface clock cycles
+    """
+
+    def __init__(self, interface, unit: WaitUnit, port_list: PortList) -> None:
+        self._interface = interface
+        self._unit = unit
+        self.status = 0
+        self._timeout = 0
+        # cycles issued while halted, pulsed once released
+        self._halted_cycles = {}
+        # registers compared when the unit selects a port, by its first address
+        self._data_registers = {}
+        for port in port_list:
+            if (
+                isinstance(port, IoPort)
+                and port.direction != port_defs.ALLOWED_DIRECTIONS[0]
+            ):
+                self._data_registers.setdefault(
+                    port.address[0], port.address[: port_defs.WAIT_DATA_SIZE]
+                )
+
+    @property
+    def is_waiting(self) -> bool:
+        return bool(self.status & port_defs.WAIT_STATUS_WAITING)
+
+    @property
+    def is_halted(self) -> bool:
+        return bool(self.status & port_defs.WAIT_STATUS_HIT)
+
+    def control(self, value: int) -> None:
+        inputs = self._interface.inputs
+        if value & port_defs.WAIT_ARM:
+            self._timeout = _get_value(inputs, self._unit.timeout_address)
+            self._set_status(port_defs.WAIT_STATUS_WAITING)
+            self.update(0)
+        elif value & port_defs.WAIT_RELEASE:
+            self._set_status(self.status & port_defs.WAIT_STATUS_TIMEOUT)
+            halted_cycles, self._halted_cycles = self._halted_cycles, {}
+            for port, cycles in halted_cycles.items():
+                self._interface.pulse(port, cycles)
+
+    def halt(self, port: ClockPort, cycles: int) -> None:
+        self._halted_cycles[port] = self._halted_cycles.get(port, 0) + cycles
+
+    def update(self, cycles: int) -> None:
+        if not self.is_waiting:
+            return
+        if self._is_match():
+            self._set_status(port_defs.WAIT_STATUS_HIT)
+        elif self._timeout:
+            self._timeout = max(self._timeout - cycles, 0)
+            if self._timeout == 0:
+                self._set_status(port_defs.WAIT_STATUS_TIMEOUT)
+
+    def _set_status(self, status: int) -> None:
+        self.status = status
+        self._interface.outputs[self._unit.status_address] = status
+
+    def _is_match(self) -> bool:
+        unit = self._unit
+        inputs = self._interface.inputs
+        data_registers = self._data_registers.get(
+            inputs.get(unit.select_address, 0), []
+        )
+        data = int.from_bytes(
+            bytes(self._interface.read_register(address) for address in data_registers),
+            "little",
+        )
+        mask = _get_value(inputs, unit.mask_address)
+        value = _get_value(inputs, unit.value_address)
+        return data & mask == value & mask
+
+
+class VectorEngineModel(object):
+    """
+    Vector engine: applies its stimulus words to the input registers for the
+    duration of a run and restores the host-written values afterwards
+    """
+
+    def __init__(self, interface, engine: VectorEngine, port_list: PortList) -> None:
+        self._interface = interface
+        self._engine = engine
+        self._clock = port_list[engine.clock]
+        self._input_registers = [
+            address for name in engine.inputs for address in port_list[name].address
+        ]
+        self._output_registers = [
+            address for name in engine.outputs for address in port_list[name].address
+        ]
+        self._stimulus = bytearray(engine.depth * len(self._input_registers))
+        self._responses = bytearray(engine.depth * len(self._output_registers))
+        self._stimulus_position = 0
+        self._response_position = 0
+
+    def control(self, value: int) -> None:
+        if value & port_defs.VECTOR_RESET:
+            self._stimulus_position = 0
+            self._response_position = 0
+        if value & port_defs.VECTOR_START:
+            self._run()
+
+    def write_stimulus(self, value: int) -> None:
+        if self._stimulus_position < len(self._stimulus):
+            self._stimulus[self._stimulus_position] = value
+            self._stimulus_position += 1
+
+    def read_response(self, address: int) -> int:
+        if self._response_position >= len(self._responses):
+            return 0
+        value = self._responses[self._response_position]
+        self._response_position += 1
+        return value
+
+    def _run(self) -> None:
+        engine = self._engine
+        interface = self._interface
+        count = _get_value(interface.inputs, engine.count_address)
+        cycles = _get_value(interface.inputs, engine.cycles_address)
+        input_registers = self._input_registers
+        output_registers = self._output_registers
+        host_inputs = [interface.inputs.get(address, 0) for address in input_registers]
+        for i in range(min(count, engine.depth)):
+            start = i * len(input_registers)
+            end = start + len(input_registers)
+            interface.inputs.update(zip(input_registers, self._stimulus[start:end]))
+            interface.pulse(self._clock, cycles)
+            start = i * len(output_registers)
+            end = start + len(output_registers)
+            self._responses[start:end] = bytes(
+                interface.read_register(address) for address in output_registers
+            )
+        interface.inputs.update(zip(input_registers, host_inputs))
+        interface.outputs[engine.status_address] = port_defs.VECTOR_STATUS_DONE
+
+
+class MisrModel(object):
+    """
+    Signature register: compacts the outputs present before each pulse of its clock
+    """
+
+    def __init__(self, interface, misr: Misr, port_list: PortList) -> None:
+        self._interface = interface
+        self._misr = misr
+        self._data_registers = [
+            address for name in misr.ports for address in port_list[name].address
+        ]
+        self.reset(1)
+
+    def is_clock(self, port: ClockPort) -> bool:
+        return port.name == self._misr.clock
+
+    def reset(self, value: int) -> None:
+        self._set_signature(self._misr.seed)
+
+    def update(self, port: ClockPort) -> None:
+        if not self.is_clock(port):
+            return
+        signature = _get_value(self._interface.outputs, self._misr.signature_address)
+        registers = [
+            self._interface.read_register(address) for address in self._data_registers
+        ]
+        self._set_signature(self._misr.next_signature(signature, registers))
+
+    def _set_signature(self, signature: int) -> None:
+        signature_address = self._misr.signature_address
+        self._interface.outputs.update(
+            zip(signature_address, signature.to_bytes(len(signature_address), "little"))
+        )
+
+
+class StepGroupModel(object):
+    """
+    Step group: writing the last select register pulses the selected clocks
+    one after another, in group order
+    """
+
+    def __init__(self, interface, group: StepGroup, port_list: PortList) -> None:
+        self._interface = interface
+        self._group = group
+        self._port_list = port_list
+
+    def fire(self, value: int) -> None:
+        inputs = self._interface.inputs
+        select = _get_value(inputs, self._group.address)
+        cycles = _get_value(inputs, self._group.count_address)
+        for name in self._group.get_selected_clocks(select):
+            self._interface.pulse(self._port_list[name], cycles)
+
+
+class FreeRunningModel(object):
+    """
+    Free-running clock dividers: running clocks advance by the wall-clock
+    time elapsed at the start of every transfer
+    """
+
+    def __init__(
+        self,
+        interface,
+        port_list: PortList,
+        main_clock_hz: Optional[int],
+        wait: Optional[WaitUnitModel] = None,
+    ) -> None:
+        self._interface = interface
+        self._port_list = port_list
+        self._main_clock_hz = main_clock_hz
+        self._wait = wait
+        # running clocks with the time of their last pulse and their frequency
+        self._running = {}
+        self.cycles = {}
+        self.controls = {
+            port.run_address: partial(self.control, port)
+            for port in port_list
+            if isinstance(port, ClockPort) and port.run_address is not None
+        }
+
+    def control(self, port: ClockPort, value: int) -> None:
+        if not value & port_defs.CLOCK_RUN:
+            self._running.pop(port.name, None)
+        else:
+            divider = _get_value(self._interface.inputs, port.divider_address)
+            frequency = self._main_clock_hz / (divider + 1)
+            if port.name not in self._running:
+                # the cycle count restarts with every start
+                self._running[port.name] = [perf_counter(), frequency]
+                self.cycles[port.name] = 0
+            self._running[port.name][1] = frequency
+        cycles = self.cycles.get(port.name, 0)
+        self._interface.outputs.update(
+            zip(
+                port.cycle_count_address,
+                cycles.to_bytes(len(port.cycle_count_address), "little"),
+            )
+        )
+
+    def advance(self) -> None:
+        now = perf_counter()
+        for name, clock in self._running.items():
+            last_time, frequency = clock
+            cycles = int((now - last_time) * frequency)
+            clock[0] = last_time + cycles / frequency
+            # cycles elapsed while the wait unit halts the clocks are lost
+            if cycles and not (self._wait is not None and self._wait.is_halted):
+                self.cycles[name] += cycles
+                self._interface.pulse(self._port_list[name], cycles)
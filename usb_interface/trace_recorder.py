@@ -0,0 +1,143 @@
+import mmap
+import os
+import struct
+from time import perf_counter_ns, time_ns
+from typing import Iterable, List, Tuple
+
+from port_tools.port import IoPort, ClockPort
+from .usb_interface import UsbInterface
+
+TRACE_MAGIC = b"FPGATRC1"
+# magic and wall-clock start time in nanoseconds
+TRACE_HEADER = struct.Struct("<8sQ")
+# timestamp (ns since start), transfer number (from 1 on), address, operation, value
+TRACE_RECORD = struct.Struct("<QIHBB")
+TRACE_READ = 0
+TRACE_WRITE = 1
+TRACE_CLOCK = 2
+# records added to the file whenever the mapped part is full
+TRACE_GROWTH = 1 << 16
+
+
+class TraceRecorder(UsbInterface):
+    """
+    Wrapper of a UsbInterface backend appending every register access to a
+    binary trace file, see host_tools.trace_replay for reading and replaying it
+
+    Each register written or read is one fixed-size TRACE_RECORD holding the
+    written or observed value; records of one backend call share a transfer
+    number. Writes of clock_addresses, the registers firing clock pulses,
+    are recorded as TRACE_CLOCK whichever call issued them. The file is
+    memory-mapped and grown by TRACE_GROWTH records at a
+    time, close() trims it to the records written. A trace left untrimmed by
+    a crash ends with zeroed records, which readers skip.
+    """
+
+    def __init__(
+        self, backend: UsbInterface, path, clock_addresses: Iterable[int] = ()
+    ) -> None:
+        super().__init__()
+        self.backend = backend
+        self.path = path
+        self.clock_addresses = frozenset(clock_addresses)
+        self.records = 0
+        self._transfer = 0
+        self._start = perf_counter_ns()
+        self._file = open(path, "w+b")
+        self._file.write(TRACE_HEADER.pack(TRACE_MAGIC, time_ns()))
+        self._capacity = 0
+        self._map = None
+        self._grow()
+
+    def close(self) -> None:
+        if self._file.closed:
+            return
+        self._map.flush()
+        self._map.close()
+        self._file.truncate(TRACE_HEADER.size + self.records * TRACE_RECORD.size)
+        self._file.close()
+
+    def __enter__(self) -> "TraceRecorder":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def read(self, port: IoPort) -> int:
+        value = self.backend.read(port)
+        if value is not None:
+            self._append(TRACE_READ, zip(port.address, port.encode(value)))
+        return value
+
+    def write(self, port: IoPort, value: int) -> bool:
+        self._append(TRACE_WRITE, zip(port.address, port.encode(value)))
+        return self.backend.write(port, value)
+
+    def write_clock_cycles(self, port: ClockPort, cycles: int) -> bool:
+        self._append(TRACE_CLOCK, zip(port.address, port.encode(cycles)))
+        return self.backend.write_clock_cycles(port, cycles)
+
+    def read_set(self, addresses: List[int]) -> List[int]:
+        values = self.backend.read_set(addresses)
+        if values is not None:
+            self._append(TRACE_READ, zip(addresses, values))
+        return values
+
+    def write_set(self, address_value_pairs: List[Tuple[int, int]]) -> bool:
+        self._append(TRACE_WRITE, address_value_pairs)
+        return self.backend.write_set(address_value_pairs)
+
+    def read_block(
+        self, start: int, count: int, increment: bool = True, out=None
+    ) -> memoryview:
+        data = self.backend.read_block(start, count, increment, out)
+        if data is not None:
+            self._append(
+                TRACE_READ, zip(_get_block_addresses(start, count, increment), data)
+            )
+        return data
+
+    def write_block(self, start: int, data, increment: bool = True) -> bool:
+        addresses = _get_block_addresses(start, len(data), increment)
+        self._append(TRACE_WRITE, zip(addresses, bytes(data)))
+        return self.backend.write_block(start, data, increment)
+
+    def _append(self, operation: int, address_value_pairs) -> None:
+        self._transfer += 1
+        timestamp = perf_counter_ns() - self._start
+        for address, value in address_value_pairs:
+            if self.records == self._capacity:
+                self._grow()
+            offset = TRACE_HEADER.size + self.records * TRACE_RECORD.size
+            record_operation = operation
+            if operation == TRACE_WRITE and address in self.clock_addresses:
+                record_operation = TRACE_CLOCK
+            TRACE_RECORD.pack_into(
+                self._map,
+                offset,
+                timestamp,
+                self._transfer,
+                address,
+                record_operation,
+                value,
+            )
+            self.records += 1
+
+    def _grow(self) -> None:
+        if self._map is not None:
+            self._map.close()
+        self._capacity += TRACE_GROWTH
+        size = TRACE_HEADER.size + self._capacity * TRACE_RECORD.size
+        self._file.truncate(size)
+        self._map = mmap.mmap(self._file.fileno(), size)
+
+
+def _get_block_addresses(start: int, count: int, increment: bool) -> range:
+    return range(start, start + count) if increment else [start] * count
+
+
+def get_trace_size(path) -> int:
+    """
+    Returns the number of record slots of a trace file
+    """
+    return (os.path.getsize(path) - TRACE_HEADER.size) // TRACE_RECORD.size
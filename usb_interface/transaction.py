@@ -0,0 +1,189 @@
+from typing import Optional
+
+from port_tools.port import IoPort, ClockPort
+from .shadow_cache import ShadowCache
+from .usb_interface import UsbInterface
+
+_READ = "read"
+_WRITE = "write"
+
+
+class ReadResult(object):
+    """
+    Handle for a read queued in a Transaction, resolved when it is flushed
+    """
+
+    def __init__(self, port: IoPort) -> None:
+        self.port = port
+        self._value: Optional[int] = None
+        self._done = False
+
+    def done(self) -> bool:
+        return self._done
+
+    @property
+    def value(self) -> int:
+        if not self._done:
+            raise RuntimeError(
+                f"Read of port {self.port.name} is pending, flush its transaction first"
+            )
+        return self._value
+
+    def _resolve(self, value: Optional[int]) -> None:
+        self._value = value
+        self._done = True
+
+
+class WriteResult(object):
+    """
+    Handle for a write queued in a Transaction, resolved when it is flushed
+    """
+
+    def __init__(self, port) -> None:
+        self.port = port
+        self._success: Optional[bool] = None
+        self._done = False
+
+    def done(self) -> bool:
+        return self._done
+
+    @property
+    def success(self) -> bool:
+        if not self._done:
+            raise RuntimeError(
+                f"Write of port {self.port.name} is pending, flush its transaction first"
+            )
+        return self._success
+
+    def _resolve(self, success: bool) -> None:
+        self._success = success
+        self._done = True
+
+
+class Transaction(object):
+    """
+    Queue of port operations executed with as few USB transfers as possible
+
+    Consecutive writes are coalesced into one write_set() call and consecutive
+    reads into one read_set() call, so the relative order of reads and writes
+    is preserved while a run of N registers costs a single round trip.
+    Reads and writes return handles resolved by flush(), a write with the
+    success of the write_set() call that carried it.
+
+    With a ShadowCache, reads of host-driven ports resolve immediately and
+    writes that do not change them are not queued at all. Queued values are
+    taken over by the cache only once their write_set() succeeded, so an
+    aborted or failed transaction leaves it consistent with the hardware.
+
+    With an access profile, names of the ports of every flush are recorded.
+    """
+
+    def __init__(
+        self,
+        usb_interface: UsbInterface,
+        shadow_cache: ShadowCache = None,
+        access_profile=None,
+    ) -> None:
+        self._usb_interface = usb_interface
+        self._shadow_cache = shadow_cache
+        self._access_profile = access_profile
+        self._runs = []
+        self._port_names = []
+        # values of cached ports queued but not flushed yet, by first register address
+        self._pending = {}
+
+    def __len__(self) -> int:
+        return len(self._runs)
+
+    def read(self, port: IoPort) -> ReadResult:
+        self._port_names.append(port.name)
+        result = ReadResult(port)
+        if self._is_cached(port):
+            value = self._pending.get(port.address[0])
+            if value is None:
+                value = self._shadow_cache.get(port)
+            if value is not None:
+                result._resolve(value)
+                return result
+        run = self._get_run(_READ)
+        run[2].append((result, len(run[1]), len(run[1]) + len(port.address)))
+        run[1].extend(port.address)
+        return result
+
+    def write(self, port: IoPort, value: int) -> WriteResult:
+        self._port_names.append(port.name)
+        result = WriteResult(port)
+        cached = self._is_cached(port)
+        if cached:
+            if self._is_redundant(port, value):
+                result._resolve(True)
+                return result
+            self._pending[port.address[0]] = value
+        # a write run keeps the cache updates to apply once it is written
+        self._queue_write(result, port, value, cached)
+        return result
+
+    def write_clock_cycles(self, port: ClockPort, cycles: int) -> WriteResult:
+        self._port_names.append(port.name)
+        result = WriteResult(port)
+        self._queue_write(result, port, cycles, False)
+        return result
+
+    def flush(self) -> bool:
+        runs, self._runs = self._runs, []
+        port_names, self._port_names = self._port_names, []
+        self._pending.clear()
+        if self._access_profile is not None:
+            self._access_profile.record(port_names)
+        success = True
+        for kind, registers, results in runs:
+            if kind == _WRITE:
+                written = self._usb_interface.write_set(registers) is not False
+                self._resolve_writes(results, written)
+                success = written and success
+            else:
+                values = self._usb_interface.read_set(registers)
+                for result, start, end in results:
+                    if values is None:
+                        result._resolve(None)
+                    else:
+                        result._resolve(result.port.decode(values[start:end]))
+        return success
+
+    def abort(self) -> None:
+        """
+        Drops the queued operations, their reads and writes stay pending
+        """
+        self._runs = []
+        self._port_names = []
+        self._pending.clear()
+
+    def _resolve_writes(self, results, written: bool) -> None:
+        for result, value, cached in results:
+            result._resolve(written)
+            port = result.port
+            if not cached:
+                continue
+            if written:
+                self._shadow_cache.update(port, value)
+            else:
+                # registers of a failed write may or may not have been written
+                self._shadow_cache.invalidate(port)
+
+    def _is_redundant(self, port: IoPort, value: int) -> bool:
+        return self._shadow_cache.is_redundant(
+            port, value, self._pending.get(port.address[0])
+        )
+
+    def _is_cached(self, port: IoPort) -> bool:
+        return self._shadow_cache is not None and self._shadow_cache.is_cacheable(port)
+
+    def _queue_write(self, result: WriteResult, port, value: int, cached: bool) -> None:
+        run = self._get_run(_WRITE)
+        run[2].append((result, value, cached))
+        run[1].extend(zip(port.address, port.encode(value)))
+
+    def _get_run(self, kind: str):
+        if not self._runs or self._runs[-1][0] != kind:
+            self._runs.append((kind, [], []))
+        return self._runs[-1]
@@ -1,3 +1,5 @@
+from typing import List, Tuple
+
 from port_tools.port import IoPort, ClockPort
 
 
@@ -5,6 +7,12 @@ class UsbInterface(object):
     def __init__(self) -> None:
         pass
 
+    def program(self, bitfile_path) -> bool:
+        pass
+
+    def close(self) -> None:
+        pass
+
     def read(self, port: IoPort) -> int:
         pass
 
@@ -13,3 +21,17 @@ class UsbInterface(object):
 
     def write_clock_cycles(self, port: ClockPort, cycles: int) -> bool:
         pass
+
+    def read_set(self, addresses: List[int]) -> List[int]:
+        pass
+
+    def write_set(self, address_value_pairs: List[Tuple[int, int]]) -> bool:
+        pass
+
+    def read_block(
+        self, start: int, count: int, increment: bool = True, out=None
+    ) -> memoryview:
+        pass
+
+    def write_block(self, start: int, data, increment: bool = True) -> bool:
+        pass